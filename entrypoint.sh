@@ -10,6 +10,10 @@ echo "postgresdb is up - running migrations and collectstatic"
 cd src
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
+# derived data that migrations do not fill in for existing rows
+python manage.py rebuild_search_vectors
+python manage.py rebuild_course_facets
+python manage.py rebuild_application_counters
 python manage.py collectstatic --noinput
 
 echo "Starting Gunicorn"
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AdvsearchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'advsearch'
+
+    def ready(self):
+        from . import signals
+        from utils import shared_cache_check
+        checks.register(shared_cache_check("Stored recommendations", 'advsearch.E001'))
@@ -0,0 +1,170 @@
+"""
+Course filtering and facet counts.
+
+`filter_courses` narrows a course queryset with the filter API parameters.
+Facet counts are then computed over that one filtered id set, either live
+(one GROUP BY per dimension) or, when `COURSE_FACET_TABLE` is enabled, from
+the materialized `CourseFacet` rows with a single GROUP BY for all of them.
+Those rows are kept in step by the signals in `advsearch.signals` and filled
+for existing courses by `rebuild_course_facets`, which runs at deploy.
+"""
+from collections import defaultdict
+from django.conf import settings
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Value, When
+from django.db.models.functions import TruncMonth
+from course.models import Course, Batch
+from preference.models import Tag
+from .models import CourseFacet
+import constants
+
+TAG_FACETS = {tag_type.value: tag_type.value.lower() for tag_type in Tag.Types}
+ID_FACETS = {'education_level', 'interest', 'location', *TAG_FACETS.values()}
+FACETS = ('mode', 'fee', 'education_level', *TAG_FACETS.values(), 'interest', 'location', 'commencement')
+
+
+def fee_bucket(amount: int) -> int:
+    return max(bucket for bucket in constants.FEE_FACET_BUCKETS if bucket <= amount)
+
+
+def month(date) -> str:
+    return date.strftime('%Y-%m')
+
+
+def filter_courses(queryset, filters: dict):
+    """Apply validated `CourseFilterSerializer` data to a course queryset."""
+    if filters.get('mode'):
+        queryset = queryset.filter(mode__in=filters['mode'])
+    if filters.get('fee_min') is not None:
+        queryset = queryset.filter(fee_amount__gte=filters['fee_min'])
+    if filters.get('fee_max') is not None:
+        queryset = queryset.filter(fee_amount__lte=filters['fee_max'])
+    if filters.get('education_level'):
+        queryset = queryset.filter(min_education_level_id__in=filters['education_level'])
+
+    # tags of the same type are alternatives, different types must all match
+    for facet in TAG_FACETS.values():
+        if filters.get(facet):
+            tagged = Course.tags.through.objects.filter(tag_id__in=filters[facet])
+            queryset = queryset.filter(id__in=tagged.values('course_id'))
+    if filters.get('interest'):
+        interested = Course.relevant_interests.through.objects.filter(interest_id__in=filters['interest'])
+        queryset = queryset.filter(id__in=interested.values('course_id'))
+
+    # location and commencement window have to hold for the same batch
+    batch_filters = {}
+    if filters.get('location'):
+        batch_filters['location_id__in'] = filters['location']
+    if filters.get('commencement_after'):
+        batch_filters['commencement_date__gte'] = filters['commencement_after']
+    if filters.get('commencement_before'):
+        batch_filters['commencement_date__lte'] = filters['commencement_before']
+    if batch_filters:
+        queryset = queryset.filter(Exists(Batch.objects.filter(course=OuterRef('pk'), **batch_filters)))
+
+    return queryset
+
+
+def format_counts(counts: dict) -> dict:
+    facets = {}
+    for facet in FACETS:
+        values = counts.get(facet, {})
+        facets[facet] = [
+            {'value': int(value) if facet in ID_FACETS else value, 'count': count}
+            for value, count in sorted(values.items(), key=lambda item: (-item[1], str(item[0])))
+        ]
+    return facets
+
+
+class MaterializedFacetCounter:
+    def count(self, course_ids) -> dict:
+        rows = CourseFacet.objects.filter(course_id__in=course_ids).values('facet', 'value').annotate(
+            count=Count('course_id', distinct=True),
+        ).order_by()
+
+        counts = defaultdict(dict)
+        for row in rows:
+            counts[row['facet']][row['value']] = row['count']
+        return format_counts(counts)
+
+
+class LiveFacetCounter:
+    def count(self, course_ids) -> dict:
+        courses = Course.objects.filter(id__in=course_ids).order_by()
+        batches = Batch.objects.filter(course_id__in=course_ids).order_by()
+        counts = defaultdict(dict)
+
+        for row in courses.values('mode').annotate(count=Count('id')):
+            counts['mode'][row['mode']] = row['count']
+
+        fee = Case(
+            *[When(fee_amount__gte=bucket, then=Value(bucket)) for bucket in sorted(constants.FEE_FACET_BUCKETS, reverse=True)],
+            output_field=IntegerField(),
+        )
+        for row in courses.annotate(fee_bucket=fee).values('fee_bucket').annotate(count=Count('id')):
+            counts['fee'][str(row['fee_bucket'])] = row['count']
+
+        for row in courses.values('min_education_level_id').annotate(count=Count('id')):
+            counts['education_level'][row['min_education_level_id']] = row['count']
+
+        tags = Course.tags.through.objects.filter(course_id__in=course_ids).order_by()
+        for row in tags.values('tag_id', 'tag__type').annotate(count=Count('course_id', distinct=True)):
+            counts[TAG_FACETS[row['tag__type']]][row['tag_id']] = row['count']
+
+        interests = Course.relevant_interests.through.objects.filter(course_id__in=course_ids).order_by()
+        for row in interests.values('interest_id').annotate(count=Count('course_id', distinct=True)):
+            counts['interest'][row['interest_id']] = row['count']
+
+        for row in batches.exclude(location=None).values('location_id').annotate(count=Count('course_id', distinct=True)):
+            counts['location'][row['location_id']] = row['count']
+
+        commencement = batches.exclude(commencement_date=None).annotate(month=TruncMonth('commencement_date'))
+        for row in commencement.values('month').annotate(count=Count('course_id', distinct=True)):
+            counts['commencement'][month(row['month'])] = row['count']
+
+        return format_counts(counts)
+
+
+def count_facets(course_ids) -> dict:
+    """Facet counts for the courses in `course_ids` (a list or an id subquery)."""
+    if settings.COURSE_FACET_TABLE:
+        return MaterializedFacetCounter().count(course_ids)
+    return LiveFacetCounter().count(course_ids)
+
+
+def refresh_course_facets(course_ids):
+    """Rewrite the materialized facet rows of `course_ids`."""
+    course_ids = list(course_ids)
+    rows = set()
+
+    for course_id, mode, fee_amount, education_level_id in Course.objects.filter(id__in=course_ids).values_list('id', 'mode', 'fee_amount', 'min_education_level_id'):
+        rows.add((course_id, 'mode', mode))
+        rows.add((course_id, 'fee', str(fee_bucket(fee_amount))))
+        rows.add((course_id, 'education_level', str(education_level_id)))
+
+    for course_id, tag_id, tag_type in Course.tags.through.objects.filter(course_id__in=course_ids).values_list('course_id', 'tag_id', 'tag__type'):
+        rows.add((course_id, TAG_FACETS[tag_type], str(tag_id)))
+
+    for course_id, interest_id in Course.relevant_interests.through.objects.filter(course_id__in=course_ids).values_list('course_id', 'interest_id'):
+        rows.add((course_id, 'interest', str(interest_id)))
+
+    for course_id, location_id, commencement_date in Batch.objects.filter(course_id__in=course_ids).values_list('course_id', 'location_id', 'commencement_date'):
+        if location_id is not None:
+            rows.add((course_id, 'location', str(location_id)))
+        if commencement_date is not None:
+            rows.add((course_id, 'commencement', month(commencement_date)))
+
+    CourseFacet.objects.filter(course_id__in=course_ids).delete()
+    CourseFacet.objects.bulk_create([
+        CourseFacet(course_id=course_id, facet=facet, value=value) for course_id, facet, value in rows
+    ])
+
+
+def retag_facets(tag):
+    """Move the facet rows of `tag` under the facet of its current type."""
+    facet = TAG_FACETS[tag.type]
+    CourseFacet.objects.filter(facet__in=TAG_FACETS.values(), value=str(tag.pk)).exclude(facet=facet).update(facet=facet)
+
+
+def forget_facet_value(facets, value):
+    """Drop the facet rows of a deleted tag / interest, whose links are removed without `m2m_changed`."""
+    CourseFacet.objects.filter(facet__in=list(facets), value=str(value)).delete()
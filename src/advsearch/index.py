@@ -0,0 +1,412 @@
+"""
+In-process inverted index used to score course recommendations.
+
+Every course gets a dense position. For each tag, interest and education
+level the index keeps a bitset (a Python int) with the positions of the
+courses linked to it, plus an array mapping positions back to course ids.
+
+Scoring a student adds the bitsets of their tags / interests / level into a
+bit-sliced score (one int per score bit), so the weighted sum is a handful of
+word-parallel AND / XOR operations over all courses at once. The top k are
+then read off the score planes from the most significant bit down, and only
+the courses tied at the cut-off are ranked individually.
+
+The index lives in a snapshot file that every gunicorn worker maps with
+`mmap`; a worker only materializes the few bitsets a request needs. Writers
+update the snapshot under a file lock and atomically replace it, readers
+notice the new file on their next lookup. Course changes are queued and
+written together once `RECOMMENDATION_INDEX_DEBOUNCE` has passed, and an
+update that leaves every posting as it was does not rewrite the file at all.
+"""
+import atexit
+import fcntl
+import heapq
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from django.conf import settings
+from django.db import connections
+from course.models import Course
+from .recommender import tie_break_key
+import constants
+
+TAG = 0
+INTEREST = 1
+LEVEL = 2
+
+MAGIC = b'CIDX'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sIQII')    # magic, format version, generation, course count, entry count
+ENTRY = struct.Struct('<BqQI')       # kind, key, offset, length
+REMOVED = -1
+
+logger = logging.getLogger(__name__)
+
+
+def iter_positions(bits: int):
+    """Yield the positions of the set bits in `bits`, lowest first."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield byte_index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def add_weighted(planes: list, bits: int, weight: int):
+    """Add `weight` to the bit-sliced score of every position set in `bits`."""
+    level = 0
+    while weight:
+        if weight & 1:
+            carry = bits
+            i = level
+            while carry:
+                if i == len(planes):
+                    planes.append(0)
+                plane = planes[i]
+                planes[i] = plane ^ carry
+                carry = plane & carry
+                i += 1
+        weight >>= 1
+        level += 1
+
+
+def score_at(planes: list, position: int) -> int:
+    return sum(((plane >> position) & 1) << i for i, plane in enumerate(planes))
+
+
+def top_positions(planes: list, candidates: int, k: int):
+    """
+    Split `candidates` into positions that are certainly in the top `k` and the
+    positions tied at the cut-off score, walking the score planes from the most
+    significant bit down.
+    """
+    above = 0
+    tied = candidates
+    for plane in reversed(planes):
+        with_bit = above | (tied & plane)
+        count = with_bit.bit_count()
+        if count > k:
+            tied &= plane
+        else:
+            above = with_bit
+            tied &= ~plane
+            if count == k:
+                tied = 0
+                break
+    return above, tied
+
+
+class CourseIndex:
+    """Mutable form of the index, used to build and update snapshots."""
+
+    def __init__(self, course_ids=None, postings=None, generation=0):
+        self.course_ids = course_ids if course_ids is not None else array('q')
+        self.postings = postings if postings is not None else {}
+        self.positions = {course_id: position for position, course_id in enumerate(self.course_ids) if course_id != REMOVED}
+        self.generation = generation
+
+    @classmethod
+    def from_db(cls):
+        index = cls()
+        for course_id, education_level_id in Course.objects.order_by('id').values_list('id', 'min_education_level_id'):
+            position = index.position_for(course_id)
+            index.set_bit(LEVEL, education_level_id, position)
+        for course_id, tag_id in Course.tags.through.objects.values_list('course_id', 'tag_id'):
+            index.set_bit(TAG, tag_id, index.positions[course_id])
+        for course_id, interest_id in Course.relevant_interests.through.objects.values_list('course_id', 'interest_id'):
+            index.set_bit(INTEREST, interest_id, index.positions[course_id])
+        return index
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        postings = {key: snapshot.bitset(*key) for key in snapshot.entries}
+        return cls(array('q', snapshot.course_ids), postings, snapshot.generation)
+
+    def position_for(self, course_id: int) -> int:
+        if course_id not in self.positions:
+            self.positions[course_id] = len(self.course_ids)
+            self.course_ids.append(course_id)
+        return self.positions[course_id]
+
+    def set_bit(self, kind: int, key, position: int):
+        if key is None:
+            return
+        self.postings[(kind, key)] = self.postings.get((kind, key), 0) | (1 << position)
+
+    def clear_course(self, course_id: int):
+        position = self.positions.get(course_id)
+        if position is None:
+            return
+        mask = ~(1 << position)
+        for key, bits in list(self.postings.items()):
+            bits &= mask
+            if bits:
+                self.postings[key] = bits
+            else:
+                del self.postings[key]
+
+    def update_courses(self, course_ids) -> bool:
+        """Re-read the tag / interest / level links of `course_ids` from the database, returning whether any changed."""
+        course_ids = set(course_ids)
+        previous_course_ids, previous_postings = array('q', self.course_ids), dict(self.postings)
+        for course_id in course_ids:
+            self.clear_course(course_id)
+
+        existing = set()
+        for course_id, education_level_id in Course.objects.filter(id__in=course_ids).values_list('id', 'min_education_level_id'):
+            existing.add(course_id)
+            self.set_bit(LEVEL, education_level_id, self.position_for(course_id))
+        for course_id, tag_id in Course.tags.through.objects.filter(course_id__in=existing).values_list('course_id', 'tag_id'):
+            self.set_bit(TAG, tag_id, self.positions[course_id])
+        for course_id, interest_id in Course.relevant_interests.through.objects.filter(course_id__in=existing).values_list('course_id', 'interest_id'):
+            self.set_bit(INTEREST, interest_id, self.positions[course_id])
+
+        # deleted courses keep their (now empty) position until the next full rebuild
+        for course_id in course_ids - existing:
+            position = self.positions.pop(course_id, None)
+            if position is not None:
+                self.course_ids[position] = REMOVED
+        return self.course_ids != previous_course_ids or self.postings != previous_postings
+
+    def write(self, path: str):
+        """Atomically replace the snapshot at `path` with this index."""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+
+        entries = sorted(self.postings.items())
+        data_offset = HEADER.size + len(self.course_ids) * 8 + len(entries) * ENTRY.size
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.generation + 1, len(self.course_ids), len(entries))
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.course-index-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(self.course_ids.tobytes())
+                blobs = []
+                offset = data_offset
+                for (kind, key), bits in entries:
+                    blob = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+                    f.write(ENTRY.pack(kind, key, offset, len(blob)))
+                    blobs.append(blob)
+                    offset += len(blob)
+                for blob in blobs:
+                    f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.generation += 1
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.generation, course_count, entry_count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a course index snapshot")
+
+        offset = HEADER.size
+        self.course_ids = array('q')
+        self.course_ids.frombytes(self.buffer[offset:offset + course_count * 8])
+        offset += course_count * 8
+
+        self.entries = {}
+        for _ in range(entry_count):
+            kind, key, data_offset, length = ENTRY.unpack_from(self.buffer, offset)
+            self.entries[(kind, key)] = (data_offset, length)
+            offset += ENTRY.size
+
+    def close(self):
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def bitset(self, kind: int, key) -> int:
+        location = self.entries.get((kind, key))
+        if location is None:
+            return 0
+        data_offset, length = location
+        return int.from_bytes(self.buffer[data_offset:data_offset + length], 'little')
+
+    def top_courses(self, tag_ids, interest_ids, education_level_id, seed: int, limit: int) -> list:
+        planes = []
+        candidates = 0
+        weighted = (
+            [(TAG, key, constants.RECOMMENDATION_TAG_WEIGHT) for key in tag_ids] +
+            [(INTEREST, key, constants.RECOMMENDATION_INTEREST_WEIGHT) for key in interest_ids] +
+            [(LEVEL, education_level_id, constants.RECOMMENDATION_EDUCATION_WEIGHT)]
+        )
+        for kind, key, weight in weighted:
+            bits = self.bitset(kind, key)
+            if bits:
+                add_weighted(planes, bits, weight)
+                candidates |= bits
+
+        above, tied = top_positions(planes, candidates, limit)
+        ranked = [(-score_at(planes, position), position) for position in iter_positions(above)]
+        if tied:
+            tied_score = -score_at(planes, next(iter_positions(tied)))
+            ranked += [
+                (tied_score, position) for position in heapq.nsmallest(
+                    limit - len(ranked),
+                    iter_positions(tied),
+                    key=lambda position: tie_break_key(self.course_ids[position], seed),
+                )
+            ]
+        ranked.sort(key=lambda item: (item[0], tie_break_key(self.course_ids[item[1]], seed)))
+        return [self.course_ids[position] for _, position in ranked]
+
+
+class SnapshotStore:
+    """Per-process handle on the snapshot file at `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.snapshot = None
+        self.mutex = threading.Lock()
+        # changes waiting for the next write, see request_update
+        self.pending_lock = threading.Lock()
+        self.pending_ids = set()
+        self.pending_rebuild = False
+        self.pending_callbacks = []
+        self.timer = None
+
+    def locked(self):
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        return FileLock(self.lock_path)
+
+    def current(self) -> Snapshot:
+        """The latest snapshot, building it from the database if none exists yet."""
+        with self.mutex:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self.rebuild()
+                stat = os.stat(self.path)
+            if self.snapshot is None or self.snapshot.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+                # the replaced snapshot is not closed here: requests on other threads may still be
+                # scoring against it, and its mapping is released with the last reference
+                self.snapshot = Snapshot(self.path)
+            return self.snapshot
+
+    def rebuild(self):
+        """Replace the snapshot with a fresh, compacted index built from the database."""
+        with self.locked():
+            index = CourseIndex.from_db()
+            if os.path.exists(self.path):
+                with Snapshot(self.path) as previous:
+                    index.generation = previous.generation
+            index.write(self.path)
+
+    def update_courses(self, course_ids):
+        """Refresh the postings of `course_ids` in place of a full rebuild."""
+        with self.locked():
+            if os.path.exists(self.path):
+                with Snapshot(self.path) as snapshot:
+                    index = CourseIndex.from_snapshot(snapshot)
+                if not index.update_courses(course_ids):
+                    return
+            else:
+                index = CourseIndex.from_db()
+            index.write(self.path)
+
+    def request_update(self, course_ids=None, callback=None):
+        """
+        Queue `course_ids` (every course if None) for the next write of the
+        snapshot, calling `callback` once it is written. The write happens
+        `RECOMMENDATION_INDEX_DEBOUNCE` after the first queued request, so a
+        burst of course saves costs one rewrite.
+        """
+        delay = constants.RECOMMENDATION_INDEX_DEBOUNCE.total_seconds()
+        with self.pending_lock:
+            if course_ids is None:
+                self.pending_rebuild = True
+            else:
+                self.pending_ids.update(course_ids)
+            if callback is not None and callback not in self.pending_callbacks:
+                self.pending_callbacks.append(callback)
+            if delay:
+                if self.timer is None:
+                    self.timer = threading.Timer(delay, self.flush_in_background)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """Write the queued changes now."""
+        with self.pending_lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            course_ids, rebuild, callbacks = self.pending_ids, self.pending_rebuild, self.pending_callbacks
+            self.pending_ids, self.pending_rebuild, self.pending_callbacks = set(), False, []
+        if not (course_ids or rebuild):
+            return
+
+        try:
+            if rebuild:
+                self.rebuild()
+            else:
+                self.update_courses(course_ids)
+        except BaseException:
+            # the queued ids are gone, so the next write starts over from the database
+            with self.pending_lock:
+                self.pending_rebuild = True
+            raise
+        for callback in callbacks:
+            callback()
+
+    def flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Updating the course index snapshot at %s failed", self.path)
+        finally:
+            # the timer thread's own database connection
+            connections.close_all()
+
+
+class FileLock:
+    def __init__(self, path: str):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+
+
+_stores = {}
+
+
+def get_store() -> SnapshotStore:
+    path = settings.RECOMMENDATION_INDEX_PATH
+    if path not in _stores:
+        _stores[path] = SnapshotStore(path)
+        # write changes still waiting for the debounce when the worker exits
+        atexit.register(_stores[path].flush)
+    return _stores[path]
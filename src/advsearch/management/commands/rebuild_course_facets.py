@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from course.models import Course
+from advsearch.facets import refresh_course_facets
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized course facet table"
+
+    def handle(self, *args, **options):
+        course_ids = list(Course.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(course_ids), CHUNK_SIZE):
+            refresh_course_facets(course_ids[start:start + CHUNK_SIZE])
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt facets for {len(course_ids)} course(s)"))
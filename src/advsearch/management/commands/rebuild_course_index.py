@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from advsearch.index import get_store
+from advsearch.store import invalidate_catalogue
+
+
+class Command(BaseCommand):
+    help = "Rebuild the recommendation index snapshot from the database"
+
+    def handle(self, *args, **options):
+        if not settings.RECOMMENDATION_INDEX_PATH:
+            raise CommandError("RECOMMENDATION_INDEX_PATH is not set")
+
+        get_store().rebuild()
+        invalidate_catalogue()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {settings.RECOMMENDATION_INDEX_PATH}"))
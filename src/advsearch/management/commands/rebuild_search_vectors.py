@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from advsearch.search import get_search_engine
+
+
+class Command(BaseCommand):
+    help = "Recompute the full text search vector of every course"
+
+    def handle(self, *args, **options):
+        updated = get_search_engine().update()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the search vector of {updated} course(s)"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from student.models import Student
+from advsearch.store import refresh_student
+from utils import process_local_cache
+
+
+class Command(BaseCommand):
+    help = "Recompute and store course recommendations for every student"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, action='append', dest='student_ids', help="Only refresh the given student id (repeatable)")
+
+    def handle(self, *args, **options):
+        if process_local_cache():
+            self.stderr.write("The default cache is process-local: rankings stored here are lost when this command exits")
+
+        students = Student.objects.only('id', 'current_education_level')
+        if options['student_ids']:
+            students = students.filter(id__in=options['student_ids'])
+
+        refreshed = 0
+        for student in students.iterator(chunk_size=500):
+            refresh_student(student)
+            refreshed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed recommendations for {refreshed} student(s)"))
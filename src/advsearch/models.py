@@ -0,0 +1,21 @@
+from django.db import models
+from course.models import Course
+
+
+class CourseFacet(models.Model):
+    """
+    Materialized (course, facet, value) rows used to count facets of a filtered
+    course set with a single GROUP BY. Maintained by `advsearch.facets`.
+    """
+    class Meta:
+        verbose_name_plural = 'Course facets'
+        indexes = [
+            models.Index(fields=['course', 'facet', 'value'], name='course_facet_idx'),
+        ]
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='facets')
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=20)
+
+    def __str__(self):
+        return f"Facet {self.facet}={self.value} for course {self.course_id}"
@@ -0,0 +1,6 @@
+from course.pagination import CourseCursorPagination
+
+
+class SearchCursorPagination(CourseCursorPagination):
+    """Cursor pagination over ranked search results, best match first."""
+    ordering = ('-rank', 'id')
@@ -0,0 +1,54 @@
+from django.db.models import Q, Count, Case, When, Value, F, IntegerField
+from django.db.models.functions import Mod
+from course.models import Course
+import constants
+
+# Constants for the per-student tie breaker: (id * A + seed) mod M is a cheap
+# permutation of course ids that differs per student but never changes between
+# requests, so courses with equal scores are shuffled in a stable order.
+TIE_BREAK_MULTIPLIER = 7919
+TIE_BREAK_MODULUS = 1000003
+
+
+def tie_break_key(course_id: int, seed: int) -> int:
+    return (course_id * TIE_BREAK_MULTIPLIER + seed) % TIE_BREAK_MODULUS
+
+
+def score_courses(student):
+    """
+    Annotate matching courses with `match_score` for `student`.
+
+    The weighted score (3 per matching tag, 2 per matching interest, 1 for a
+    matching education level) is computed by the database and the result is
+    ordered by score, so slicing the queryset issues a single
+    `GROUP BY ... ORDER BY ... LIMIT` query.
+    """
+    tags = student.selected_tags.all()
+    interests = student.interests.all()
+    education_level_id = student.current_education_level_id
+
+    return Course.objects.filter(
+        Q(tags__in=tags) |
+        Q(relevant_interests__in=interests) |
+        Q(min_education_level_id=education_level_id)
+    ).annotate(
+        tag_match=Count('tags', filter=Q(tags__in=tags), distinct=True),
+        interest_match=Count('relevant_interests', filter=Q(relevant_interests__in=interests), distinct=True),
+        edu_match=Case(
+            When(min_education_level_id=education_level_id, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    ).annotate(
+        match_score=(
+            F('tag_match') * constants.RECOMMENDATION_TAG_WEIGHT +
+            F('interest_match') * constants.RECOMMENDATION_INTEREST_WEIGHT +
+            F('edu_match') * constants.RECOMMENDATION_EDUCATION_WEIGHT
+        ),
+        tie_break=Mod(F('id') * TIE_BREAK_MULTIPLIER + student.pk, TIE_BREAK_MODULUS),
+    ).order_by('-match_score', 'tie_break')
+
+
+def recommended_courses(student, limit: int = constants.RECOMMENDATION_LIMIT):
+    """Top `limit` course cards for `student`, best match first."""
+    return score_courses(student).cards()[:limit]
@@ -0,0 +1,101 @@
+"""
+Course search engines.
+
+`PostgresSearchEngine` ranks courses with PostgreSQL full text search over
+`Course.search_vector`, a precomputed tsvector (GIN indexed) that is kept up
+to date by signals and filled for existing rows by `rebuild_search_vectors`. `FallbackSearchEngine` gives SQLite dev databases the
+same interface with `icontains` matching and a simple weighted rank.
+
+Both annotate an integer `rank` so results can be cursor paginated on it.
+"""
+import re
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Subquery, TextField, Value, When
+from django.db.models.functions import Cast
+from course.models import Course
+from instituteadmin.models import InstituteAdmin
+from preference.models import Tag
+import constants
+
+TERM_PATTERN = re.compile(r'\w+')
+RANK_SCALE = 1000000
+
+
+def search_terms(query: str) -> list:
+    return TERM_PATTERN.findall(query.lower())
+
+
+class PostgresSearchEngine:
+    def search(self, queryset, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+
+        # every term must match, the last one as a prefix for typeahead
+        raw_query = ' & '.join(terms[:-1] + [f"{terms[-1]}:*"])
+        search_query = SearchQuery(raw_query, search_type='raw', config=constants.SEARCH_CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), search_query) * RANK_SCALE, IntegerField()),
+        )
+
+    def search_vector(self):
+        """The tsvector of a course, computed in SQL from its own row, its tags and its institute."""
+        tag_names = Subquery(
+            Course.tags.through.objects.filter(course_id=OuterRef('pk')).order_by().values('course_id').annotate(
+                names=StringAgg('tag__name', ' '),
+            ).values('names'),
+            output_field=TextField(),
+        )
+        institute_name = Subquery(
+            InstituteAdmin.objects.filter(pk=OuterRef('offered_by_id')).values('name'), output_field=TextField(),
+        )
+        return (
+            SearchVector('name', weight='A', config=constants.SEARCH_CONFIG) +
+            SearchVector(tag_names, weight='B', config=constants.SEARCH_CONFIG) +
+            SearchVector(institute_name, weight='B', config=constants.SEARCH_CONFIG) +
+            SearchVector('description', weight='C', config=constants.SEARCH_CONFIG)
+        )
+
+    def update(self, course_ids=None):
+        """Recompute the search vector of `course_ids` (every course if None) in a single UPDATE."""
+        courses = Course.objects.all() if course_ids is None else Course.objects.filter(id__in=course_ids)
+        return courses.update(search_vector=self.search_vector())
+
+
+class FallbackSearchEngine:
+    def search(self, queryset, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+
+        rank = Value(0)
+        for i, term in enumerate(terms):
+            tag_match = f"tag_match_{i}"
+            queryset = queryset.annotate(**{
+                tag_match: Exists(Tag.objects.filter(courses=OuterRef('pk'), name__icontains=term)),
+            }).filter(
+                Q(name__icontains=term) |
+                Q(description__icontains=term) |
+                Q(offered_by__name__icontains=term) |
+                Q(**{tag_match: True})
+            )
+            rank = rank + Case(
+                When(name__istartswith=term, then=Value(4)),
+                When(name__icontains=term, then=Value(3)),
+                When(**{tag_match: True}, then=Value(2)),
+                When(offered_by__name__icontains=term, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        return queryset.annotate(rank=rank)
+
+    def update(self, course_ids=None):
+        return 0
+
+
+def get_search_engine():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchEngine()
+    return FallbackSearchEngine()
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+from course.models import Course
+import constants
+
+
+class SearchRequestSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=constants.SEARCH_QUERY_MAX_LENGTH)
+
+
+class CourseFilterSerializer(serializers.Serializer):
+    mode = serializers.ListField(child=serializers.ChoiceField(choices=Course.Types.choices), required=False)
+    fee_min = serializers.IntegerField(min_value=0, required=False)
+    fee_max = serializers.IntegerField(min_value=0, required=False)
+    education_level = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    exam = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    stream = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    skill = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    interest = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    location = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    commencement_after = serializers.DateField(required=False)
+    commencement_before = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('fee_min') is not None and data.get('fee_max') is not None and data['fee_min'] > data['fee_max']:
+            raise serializers.ValidationError({"fee_max": "fee_max must not be less than fee_min."})
+        if data.get('commencement_after') and data.get('commencement_before') and data['commencement_after'] > data['commencement_before']:
+            raise serializers.ValidationError({"commencement_before": "commencement_before must not be earlier than commencement_after."})
+        return data
@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from course.models import Course, Batch
+from instituteadmin.models import InstituteAdmin
+from preference.models import Tag, Interest, EducationLevel
+from mediaserver.derivatives import only_derivatives
+from student.models import Student
+from .store import invalidate_catalogue, invalidate_student
+from .index import get_store
+from .search import get_search_engine
+from .facets import TAG_FACETS, forget_facet_value, refresh_course_facets, retag_facets
+
+M2M_WRITE_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+
+@receiver(m2m_changed, sender=Student.selected_tags.through)
+@receiver(m2m_changed, sender=Student.interests.through)
+def student_preferences_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in M2M_WRITE_ACTIONS:
+        return
+
+    if not reverse:
+        invalidate_student(instance.pk)
+    elif pk_set:
+        for student_id in pk_set:
+            invalidate_student(student_id)
+    else:
+        # tag.students.clear() does not report which students were affected
+        invalidate_catalogue()
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, **kwargs):
+    invalidate_student(instance.pk)
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+@receiver(m2m_changed, sender=Course.relevant_interests.through)
+def course_links_changed(sender, action, **kwargs):
+    if action in M2M_WRITE_ACTIONS:
+        invalidate_catalogue()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Interest)
+@receiver(post_delete, sender=EducationLevel)
+def catalogue_changed(sender, update_fields=None, **kwargs):
+    # image derivatives play no part in rankings
+    if not only_derivatives(update_fields):
+        invalidate_catalogue()
+
+
+def refresh_index(course_ids=None):
+    """Update the recommendation index once the current transaction commits."""
+    if not settings.RECOMMENDATION_INDEX_PATH:
+        return
+
+    # rankings computed between the write and the index update are stale
+    transaction.on_commit(lambda: get_store().request_update(
+        None if course_ids is None else list(course_ids), callback=invalidate_catalogue,
+    ))
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+@receiver(m2m_changed, sender=Course.relevant_interests.through)
+def course_links_indexed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in M2M_WRITE_ACTIONS:
+        return
+
+    if not reverse:
+        refresh_index([instance.pk])
+    elif pk_set:
+        refresh_index(pk_set)
+    else:
+        refresh_index()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_indexed(sender, instance, update_fields=None, **kwargs):
+    if not only_derivatives(update_fields):
+        refresh_index([instance.pk])
+
+
+@receiver(post_save, sender=Course)
+def course_search_vector(sender, instance, update_fields=None, **kwargs):
+    if not only_derivatives(update_fields):
+        get_search_engine().update([instance.pk])
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def course_tags_search_vector(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # tag.courses.clear() does not report the affected courses afterwards
+        instance._cleared_course_ids = list(instance.courses.values_list('id', flat=True))
+    if action not in M2M_WRITE_ACTIONS:
+        return
+
+    if not reverse:
+        get_search_engine().update([instance.pk])
+    elif action == 'post_clear':
+        get_search_engine().update(getattr(instance, '_cleared_course_ids', []))
+    else:
+        get_search_engine().update(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def tag_search_vector(sender, instance, **kwargs):
+    get_search_engine().update(instance.courses.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=InstituteAdmin)
+def institute_search_vector(sender, instance, update_fields=None, **kwargs):
+    if not only_derivatives(update_fields):
+        get_search_engine().update(instance.offered_courses.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Course)
+def course_facets(sender, instance, update_fields=None, **kwargs):
+    if settings.COURSE_FACET_TABLE and not only_derivatives(update_fields):
+        refresh_course_facets([instance.pk])
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+@receiver(m2m_changed, sender=Course.relevant_interests.through)
+def course_links_facets(sender, instance, action, reverse, pk_set, **kwargs):
+    if not settings.COURSE_FACET_TABLE:
+        return
+    if reverse and action == 'pre_clear':
+        links = sender.objects.filter(**{f"{instance._meta.model_name}_id": instance.pk})
+        instance._cleared_facet_course_ids = list(links.values_list('course_id', flat=True))
+    if action not in M2M_WRITE_ACTIONS:
+        return
+
+    if not reverse:
+        refresh_course_facets([instance.pk])
+    elif action == 'post_clear':
+        refresh_course_facets(getattr(instance, '_cleared_facet_course_ids', []))
+    else:
+        refresh_course_facets(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def tag_facets(sender, instance, created, **kwargs):
+    # the facet a tag is counted under follows its type
+    if settings.COURSE_FACET_TABLE and not created:
+        retag_facets(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Interest)
+def link_target_facets(sender, instance, **kwargs):
+    if settings.COURSE_FACET_TABLE:
+        forget_facet_value(TAG_FACETS.values() if sender is Tag else ['interest'], instance.pk)
+
+
+@receiver(post_save, sender=Batch)
+@receiver(post_delete, sender=Batch)
+def batch_facets(sender, instance, **kwargs):
+    if settings.COURSE_FACET_TABLE and instance.course_id:
+        refresh_course_facets([instance.course_id])
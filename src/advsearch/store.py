@@ -0,0 +1,87 @@
+"""
+Ranked course recommendations stored per student in the default cache.
+
+Rankings are written by web workers and by `refresh_recommendations`, and the
+catalogue version they are checked against is bumped by whichever process
+handles a write, so the cache must be shared by all of them (see
+`CACHE_URL`); a process-local cache fails the `advsearch.E001` check in
+production. Invalidations wait for the writer's transaction to commit, like
+the version stamps in `httpcache`: a ranking computed from the old rows in
+the meantime would otherwise be stored under the new version.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .recommender import score_courses
+from . import index
+import constants
+
+CATALOGUE_VERSION_KEY = 'recommendations:catalogue-version'
+
+
+def student_key(student_id: int) -> str:
+    return f"recommendations:student:{student_id}"
+
+
+def get_catalogue_version() -> int:
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalogue_version():
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOGUE_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_catalogue():
+    """Expire every stored ranking once the current transaction commits, used when course tags / interests / levels change."""
+    transaction.on_commit(bump_catalogue_version)
+
+
+def invalidate_student(student_id: int):
+    transaction.on_commit(lambda: cache.delete(student_key(student_id)))
+
+
+def rank_courses(student) -> list:
+    if not settings.RECOMMENDATION_INDEX_PATH:
+        return list(score_courses(student).values_list('id', flat=True)[:constants.RECOMMENDATION_LIMIT])
+
+    return index.get_store().current().top_courses(
+        tag_ids=student.selected_tags.values_list('id', flat=True),
+        interest_ids=student.interests.values_list('id', flat=True),
+        education_level_id=student.current_education_level_id,
+        seed=student.pk,
+        limit=constants.RECOMMENDATION_LIMIT,
+    )
+
+
+def refresh_student(student) -> list:
+    """Recompute and store the ranked course ids for `student`."""
+    version = get_catalogue_version()
+    course_ids = rank_courses(student)
+    cache.set(
+        student_key(student.pk),
+        (version, course_ids),
+        timeout=constants.RECOMMENDATION_CACHE_TIMEOUT.total_seconds(),
+    )
+    return course_ids
+
+
+def get_recommended_course_ids(student) -> list:
+    """
+    Ranked course ids for `student`, best match first.
+
+    Rankings are stored per student together with the catalogue version they
+    were computed against, and recomputed lazily once either is invalidated.
+    """
+    stored = cache.get(student_key(student.pk))
+    if stored is not None:
+        version, course_ids = stored
+        if version == get_catalogue_version():
+            return course_ids
+    return refresh_student(student)
@@ -1,3 +1,416 @@
-from django.test import TestCase
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from course.models import Course, Batch
+from instituteadmin.models import InstituteAdmin
+from preference.models import Tag, Interest, EducationLevel, Location
+from student.models import Student
+from .recommender import recommended_courses
+from .store import get_catalogue_version, get_recommended_course_ids, student_key
+from .index import CourseIndex, get_store
+from .models import CourseFacet
+from utils import shared_cache_check
 
-# Create your tests here.
+
+class RecommendationFixtures:
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        cls.graduate = EducationLevel.objects.create(name='Graduate')
+        cls.school = EducationLevel.objects.create(name='School')
+        cls.python = Tag.objects.create(name='python')
+        cls.django = Tag.objects.create(name='django')
+        cls.design = Interest.objects.create(name='design')
+        cls.coding = Interest.objects.create(name='coding')
+
+        cls.student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919999999999')
+        cls.student.selected_tags.set([cls.python, cls.django])
+        cls.student.interests.set([cls.coding])
+        cls.student.current_education_level = cls.graduate
+        cls.student.save()
+
+    def create_course(self, name, education_level, tags=(), interests=()):
+        course = Course.objects.create(
+            offered_by=self.institute,
+            name=name,
+            slug=name,
+            fee_amount=0,
+            min_education_level=education_level,
+        )
+        course.tags.set(tags)
+        course.relevant_interests.set(interests)
+        return course
+
+
+@override_settings(RECOMMENDATION_INDEX_PATH='')
+class RecommendedCoursesTest(RecommendationFixtures, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_courses_ranked_by_weighted_score(self):
+        # two tags and an interest: 3 + 3 + 2 + 1
+        best = self.create_course('best', self.graduate, [self.python, self.django], [self.coding, self.design])
+        # one tag: 3
+        tag_only = self.create_course('tag-only', self.school, [self.python])
+        # one interest and education level: 2 + 1
+        interest_only = self.create_course('interest-only', self.graduate, [], [self.coding])
+        # education level only: 1
+        level_only = self.create_course('level-only', self.graduate)
+        self.create_course('unrelated', self.school, [], [self.design])
+
+        courses = list(recommended_courses(self.student))
+
+        self.assertEqual([course.match_score for course in courses], [9, 3, 3, 1])
+        self.assertEqual(courses[0], best)
+        self.assertEqual(set(courses[1:3]), {tag_only, interest_only})
+        self.assertEqual(courses[3], level_only)
+
+    def test_ties_are_ordered_stably(self):
+        for i in range(15):
+            self.create_course(f'course-{i}', self.graduate)
+
+        first = [course.id for course in recommended_courses(self.student)]
+        second = [course.id for course in recommended_courses(self.student)]
+
+        self.assertEqual(len(first), 10)
+        self.assertEqual(first, second)
+
+    def test_view_serves_stored_ranking(self):
+        for i in range(15):
+            self.create_course(f'course-{i}', self.graduate, [self.python], [self.coding])
+        client = APIClient()
+        client.force_authenticate(user=self.student)
+
+        # scoring query + card query
+        with self.assertNumQueries(2):
+            first = client.get(reverse('recommended-courses'))
+        # card query only
+        with self.assertNumQueries(1):
+            second = client.get(reverse('recommended-courses'))
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.json()), 10)
+        self.assertEqual(first.json(), second.json())
+
+    def test_student_preference_change_invalidates_ranking(self):
+        self.create_course('python', self.school, [self.python])
+        design = self.create_course('design', self.school, [], [self.design])
+        get_recommended_course_ids(self.student)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.interests.add(self.design)
+
+        self.assertIsNone(cache.get(student_key(self.student.pk)))
+        self.assertIn(design.id, get_recommended_course_ids(self.student))
+
+    def test_course_change_invalidates_ranking(self):
+        course = self.create_course('python', self.school)
+        self.assertNotIn(course.id, get_recommended_course_ids(self.student))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            course.tags.add(self.python)
+
+        self.assertIn(course.id, get_recommended_course_ids(self.student))
+
+    def test_rankings_are_invalidated_only_once_the_write_commits(self):
+        course = self.create_course('python', self.school)
+        get_recommended_course_ids(self.student)
+        version = get_catalogue_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            course.tags.add(self.python)
+            self.student.interests.add(self.design)
+            # a request before the commit still sees the old rows and the old version
+            self.assertEqual(get_catalogue_version(), version)
+            self.assertIsNotNone(cache.get(student_key(self.student.pk)))
+
+        self.assertGreater(get_catalogue_version(), version)
+        self.assertIsNone(cache.get(student_key(self.student.pk)))
+
+    def test_refresh_command_stores_rankings(self):
+        self.create_course('python', self.school, [self.python])
+
+        call_command('refresh_recommendations', stdout=StringIO(), stderr=StringIO())
+
+        self.assertIsNotNone(cache.get(student_key(self.student.pk)))
+
+    def test_production_requires_shared_cache(self):
+        check = shared_cache_check("Stored recommendations", 'advsearch.E001')
+        self.assertEqual(check(), [])
+
+        with self.settings(DJANGO_ENV='production'):
+            self.assertEqual([error.id for error in check()], ['advsearch.E001'])
+            with tempfile.TemporaryDirectory() as directory, self.settings(CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+            }):
+                self.assertEqual(check(), [])
+
+
+class CourseIndexTest(RecommendationFixtures, TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(RECOMMENDATION_INDEX_PATH=os.path.join(directory.name, 'courses.idx'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # write on commit instead of from the debounce timer thread, which cannot see the test database
+        debounce = mock.patch('constants.RECOMMENDATION_INDEX_DEBOUNCE', timedelta(0))
+        debounce.start()
+        self.addCleanup(debounce.stop)
+
+    def top_courses(self, limit=10):
+        return get_store().current().top_courses(
+            tag_ids=[self.python.id, self.django.id],
+            interest_ids=[self.coding.id],
+            education_level_id=self.graduate.id,
+            seed=self.student.pk,
+            limit=limit,
+        )
+
+    def test_matches_sql_ranking(self):
+        tags = [[], [self.python], [self.django], [self.python, self.django]]
+        interests = [[], [self.coding], [self.design], [self.coding, self.design]]
+        levels = [self.graduate, self.school]
+        for i in range(40):
+            self.create_course(f'course-{i}', levels[i % 2], tags[i % 4], interests[(i // 4) % 4])
+
+        with self.settings(RECOMMENDATION_INDEX_PATH=''):
+            expected = [course.id for course in recommended_courses(self.student)]
+
+        for limit in (1, 5, 10):
+            self.assertEqual(self.top_courses(limit), expected[:limit])
+
+    def test_scoring_does_not_query_database(self):
+        self.create_course('python', self.graduate, [self.python])
+        get_store().current()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.top_courses()), 1)
+
+    def test_course_changes_update_index_incrementally(self):
+        get_store().current()
+        with self.captureOnCommitCallbacks(execute=True):
+            course = self.create_course('python', self.school)
+        self.assertEqual(self.top_courses(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            course.tags.add(self.python)
+        self.assertEqual(self.top_courses(), [course.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python.courses.remove(course)
+        self.assertEqual(self.top_courses(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            course.relevant_interests.add(self.coding)
+            course.delete()
+        self.assertEqual(self.top_courses(), [])
+
+    def test_course_changes_share_one_write(self):
+        get_store().current()
+
+        with mock.patch('constants.RECOMMENDATION_INDEX_DEBOUNCE', timedelta(minutes=1)), \
+                mock.patch.object(CourseIndex, 'write', autospec=True, side_effect=CourseIndex.write) as write:
+            with self.captureOnCommitCallbacks(execute=True):
+                first = self.create_course('python', self.school, [self.python])
+                second = self.create_course('django', self.school, [self.django])
+            self.assertEqual(self.top_courses(), [])
+
+            get_store().flush()
+
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(set(self.top_courses()), {first.id, second.id})
+
+    def test_unchanged_postings_do_not_rewrite_snapshot(self):
+        course = self.create_course('python', self.school, [self.python])
+        get_store().current()
+
+        course.name = 'Python'
+        with mock.patch.object(CourseIndex, 'write') as write, self.captureOnCommitCallbacks(execute=True):
+            course.save()
+
+        write.assert_not_called()
+
+    def test_workers_pick_up_new_snapshot(self):
+        course = self.create_course('python', self.school, [self.python])
+        worker = get_store().current()
+
+        course.tags.clear()
+        get_store().update_courses([course.id])
+
+        self.assertIsNot(get_store().current(), worker)
+        self.assertEqual(self.top_courses(), [])
+
+
+class CourseSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        level = EducationLevel.objects.create(name='Graduate')
+        institute = InstituteAdmin.objects.create(email='institute@example.com', name='Pixel Academy')
+        machine_learning = Tag.objects.create(name='machine-learning')
+
+        def create_course(name, description=''):
+            return Course.objects.create(
+                offered_by=institute,
+                name=name,
+                slug=name.lower().replace(' ', '-')[:20],
+                description=description,
+                fee_amount=0,
+                min_education_level=level,
+            )
+
+        cls.data_science = create_course('Data Science', 'Statistics and python')
+        cls.intro_databases = create_course('Intro to Databases')
+        cls.python = create_course('Python Basics', 'Learn programming')
+        cls.ml = create_course('Applied AI', 'Models in production')
+        cls.ml.tags.add(machine_learning)
+
+    def search(self, q, **params):
+        return APIClient().get(reverse('course-search'), {'q': q, **params})
+
+    def result_ids(self, q):
+        return [course['id'] for course in self.search(q).json()['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.result_ids('python'), [self.python.id, self.data_science.id])
+
+    def test_prefix_matching(self):
+        self.assertEqual(set(self.result_ids('data')), {self.data_science.id, self.intro_databases.id})
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.result_ids('data stat'), [self.data_science.id])
+
+    def test_tag_and_institute_names_are_searched(self):
+        self.assertEqual(self.result_ids('machine'), [self.ml.id])
+        self.assertEqual(len(self.result_ids('pixel')), 4)
+
+    def test_results_are_cursor_paginated(self):
+        first = self.search('pixel', page_size=3).json()
+        second = APIClient().get(first['next']).json()
+
+        ids = [course['id'] for course in first['results'] + second['results']]
+        self.assertEqual(sorted(ids), sorted([self.data_science.id, self.intro_databases.id, self.python.id, self.ml.id]))
+
+    def test_query_is_required(self):
+        self.assertEqual(APIClient().get(reverse('course-search')).status_code, 400)
+
+
+class CourseFilterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.graduate = EducationLevel.objects.create(name='Graduate')
+        cls.school = EducationLevel.objects.create(name='School')
+        cls.jee = Tag.objects.create(name='jee', type=Tag.Types.EXAM)
+        cls.science = Tag.objects.create(name='science', type=Tag.Types.STREAM)
+        cls.coding = Interest.objects.create(name='coding')
+        cls.delhi = Location.objects.create(name='Delhi')
+        cls.pune = Location.objects.create(name='Pune')
+        institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+
+        def create_course(name, mode, fee_amount, level, tags=(), batches=()):
+            course = Course.objects.create(
+                offered_by=institute,
+                name=name,
+                slug=name,
+                mode=mode,
+                fee_amount=fee_amount,
+                min_education_level=level,
+            )
+            course.tags.set(tags)
+            for location, commencement_date in batches:
+                Batch.objects.create(course=course, location=location, commencement_date=commencement_date)
+            return course
+
+        cls.online_jee = create_course('online-jee', Course.Types.ONLINE, 5000, cls.school, [cls.jee, cls.science])
+        cls.campus_jee = create_course('campus-jee', Course.Types.ON_CAMPUS, 60000, cls.school, [cls.jee], [(cls.delhi, date(2025, 6, 1))])
+        cls.campus_science = create_course('campus-science', Course.Types.ON_CAMPUS, 30000, cls.graduate, [cls.science], [(cls.pune, date(2025, 7, 15)), (cls.delhi, date(2025, 9, 1))])
+        cls.campus_science.relevant_interests.add(cls.coding)
+
+    def filter(self, **params):
+        response = APIClient().get(reverse('course-filter'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, data):
+        return {course['id'] for course in data['results']}
+
+    def test_filters_combine(self):
+        self.assertEqual(self.ids(self.filter(mode='ON_CAMPUS')), {self.campus_jee.id, self.campus_science.id})
+        self.assertEqual(self.ids(self.filter(exam=self.jee.id, stream=self.science.id)), {self.online_jee.id})
+        self.assertEqual(self.ids(self.filter(fee_min=10000, fee_max=50000)), {self.campus_science.id})
+        self.assertEqual(self.ids(self.filter(interest=self.coding.id)), {self.campus_science.id})
+        self.assertEqual(self.ids(self.filter(education_level=[self.school.id, self.graduate.id])), {self.online_jee.id, self.campus_jee.id, self.campus_science.id})
+
+    def test_location_and_window_apply_to_the_same_batch(self):
+        self.assertEqual(self.ids(self.filter(location=self.delhi.id)), {self.campus_jee.id, self.campus_science.id})
+        self.assertEqual(
+            self.ids(self.filter(location=self.delhi.id, commencement_after='2025-07-01', commencement_before='2025-08-01')),
+            set(),
+        )
+        self.assertEqual(
+            self.ids(self.filter(location=self.pune.id, commencement_after='2025-07-01', commencement_before='2025-08-01')),
+            {self.campus_science.id},
+        )
+
+    def test_facets_count_the_filtered_courses(self):
+        facets = self.filter(mode='ON_CAMPUS')['facets']
+
+        self.assertEqual(facets['mode'], [{'value': 'ON_CAMPUS', 'count': 2}])
+        self.assertEqual(facets['exam'], [{'value': self.jee.id, 'count': 1}])
+        self.assertEqual(facets['stream'], [{'value': self.science.id, 'count': 1}])
+        self.assertEqual(facets['location'], [{'value': self.delhi.id, 'count': 2}, {'value': self.pune.id, 'count': 1}])
+        self.assertEqual(facets['fee'], [{'value': '25000', 'count': 1}, {'value': '50000', 'count': 1}])
+        self.assertEqual(facets['commencement'], [
+            {'value': '2025-06', 'count': 1}, {'value': '2025-07', 'count': 1}, {'value': '2025-09', 'count': 1},
+        ])
+
+    def test_materialized_and_live_counts_agree(self):
+        for params in ({}, {'mode': 'ON_CAMPUS'}, {'stream': self.science.id}):
+            with self.settings(COURSE_FACET_TABLE=True):
+                materialized = self.filter(**params)['facets']
+            with self.settings(COURSE_FACET_TABLE=False):
+                live = self.filter(**params)['facets']
+            self.assertEqual(materialized, live)
+
+    def test_facet_table_follows_changes(self):
+        self.science.courses.clear()
+        Batch.objects.filter(course=self.campus_jee).delete()
+
+        facets = self.filter()['facets']
+
+        self.assertEqual(facets['stream'], [])
+        self.assertEqual(facets['location'], [{'value': self.delhi.id, 'count': 1}, {'value': self.pune.id, 'count': 1}])
+
+    def test_facet_table_follows_tag_changes(self):
+        self.jee.type = Tag.Types.SKILL
+        self.jee.save()
+        self.coding.delete()
+
+        with self.settings(COURSE_FACET_TABLE=True):
+            materialized = self.filter()['facets']
+        with self.settings(COURSE_FACET_TABLE=False):
+            live = self.filter()['facets']
+
+        self.assertEqual(materialized, live)
+        self.assertEqual(materialized['exam'], [])
+        self.assertEqual(materialized['skill'], [{'value': self.jee.id, 'count': 2}])
+        self.assertEqual(materialized['interest'], [])
+
+    def test_rebuild_command_fills_facet_table(self):
+        CourseFacet.objects.all().delete()
+
+        call_command('rebuild_course_facets', stdout=StringIO())
+
+        self.assertEqual(self.filter()['facets']['exam'], [{'value': self.jee.id, 'count': 2}])
+
+    def test_invalid_range_rejected(self):
+        response = APIClient().get(reverse('course-filter'), {'fee_min': 10, 'fee_max': 5})
+        self.assertEqual(response.status_code, 400)
@@ -4,4 +4,6 @@ from .views import *
 
 urlpatterns = format_suffix_patterns([
     path('recommended/', RecommendedCoursesView.as_view(), name='recommended-courses'),
+    path('search/', CourseSearchView.as_view(), name='course-search'),
+    path('filter/', CourseFilterView.as_view(), name='course-filter'),
 ])
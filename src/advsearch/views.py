@@ -1,11 +1,16 @@
 from rest_framework.views import APIView
-from course.models import Course 
+from course.models import Course
 from course.serializers import CourseSerializer
 from user.authentication import IsStudent
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.db.models import Q, Count
-import random
 from rest_framework import status
+from .store import get_recommended_course_ids
+from .search import get_search_engine
+from .serializers import SearchRequestSerializer, CourseFilterSerializer
+from .pagination import SearchCursorPagination
+from .facets import filter_courses, count_facets
+from course.pagination import CourseCursorPagination
 
 
 class RecommendedCoursesView(APIView):
@@ -14,28 +19,96 @@ class RecommendedCoursesView(APIView):
     def get(self, request):
         student = request.user
         
-        matching_courses = Course.objects.filter(
-            Q(tags__in=student.selected_tags.all()) |
-            Q(relevant_interests__in=student.interests.all()) |
-            Q(min_education_level=student.current_education_level)
-        ).distinct()
-        
-        scored_courses = matching_courses.annotate(
-            tag_match=Count('tags', filter=Q(tags__in=student.selected_tags.all())),
-            interest_match=Count('relevant_interests', filter=Q(relevant_interests__in=student.interests.all())),
-            edu_match=Count('min_education_level', filter=Q(min_education_level__level__lte=student.current_education_level.level))
-        )
-        
-        for course in scored_courses:
-            course.match_score = (course.tag_match * 3) + (course.interest_match * 2) + (course.edu_match * 1)
-        
-        sorted_courses = sorted(scored_courses, key=lambda x: x.match_score, reverse=True)
-
-        top_courses = sorted_courses[:10]
-        random.shuffle(top_courses)
+        course_ids = get_recommended_course_ids(student)
+        courses = Course.objects.cards().in_bulk(course_ids)
+        top_courses = [courses[course_id] for course_id in course_ids if course_id in courses]
 
-        serializer = CourseSerializer(top_courses, many=True)
+        serializer = self.response_serializer(top_courses, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
-            
-        
 
+
+class CourseSearchView(APIView):
+    """
+    Full text search over course names, descriptions, institute names and tags.
+
+    Permissions:
+    - Publicly accessible (AllowAny).
+
+    HTTP Method:
+    - GET: Returns a cursor-paginated list of matching courses, best match first.
+
+    Query Parameters:
+    - q (str): Search text. The last word is matched as a prefix, for typeahead.
+    - cursor (str): Opaque cursor taken from a previous `next` / `previous` link.
+    - page_size (int): Number of courses per page.
+
+    Response:
+    - 200 OK: Returns `next`, `previous` and a JSON list of courses in `results`.
+    - 400 Bad Request: If `q` is missing or too long.
+
+    Example Usage:
+    - GET /api/adv-search/search/?q=data sci
+    """
+    permission_classes = [AllowAny]
+    request_serializer = SearchRequestSerializer
+    response_serializer = CourseSerializer
+    pagination_class = SearchCursorPagination
+
+    def get(self, request):
+        serializer = self.request_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        courses = get_search_engine().search(Course.objects.cards(), serializer.validated_data['q'])
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(courses, request, view=self)
+        serializer = self.response_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class CourseFilterView(APIView):
+    """
+    Filter courses and count the facets of the filtered set.
+
+    Permissions:
+    - Publicly accessible (AllowAny).
+
+    HTTP Method:
+    - GET: Returns a cursor-paginated list of matching courses and facet counts.
+
+    Query Parameters (repeat a parameter to pass several values):
+    - mode (str): ON_CAMPUS / ONLINE / HYBRID.
+    - fee_min, fee_max (int): Inclusive fee range.
+    - education_level (int): Minimum education level ids.
+    - exam, stream, skill (int): Tag ids of that type. Tags of one type are
+      alternatives, tags of different types must all match.
+    - interest (int): Interest ids.
+    - location (int): Batch location ids.
+    - commencement_after, commencement_before (date): Batch commencement window.
+      Location and commencement window must hold for the same batch.
+    - cursor (str), page_size (int): Pagination.
+
+    Response:
+    - 200 OK: `next`, `previous`, `results` and `facets`, where `facets` maps
+      mode / fee / education_level / exam / stream / skill / interest /
+      location / commencement to a list of `{value, count}` over the filtered courses.
+    - 400 Bad Request: Invalid filter values.
+
+    Example Usage:
+    - GET /api/adv-search/filter/?mode=ONLINE&stream=3&fee_max=50000
+    """
+    permission_classes = [AllowAny]
+    request_serializer = CourseFilterSerializer
+    response_serializer = CourseSerializer
+    pagination_class = CourseCursorPagination
+
+    def get(self, request):
+        serializer = self.request_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        courses = filter_courses(Course.objects.cards(), serializer.validated_data)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(courses, request, view=self)
+        response = paginator.get_paginated_response(self.response_serializer(page, many=True).data)
+
+        response.data['facets'] = count_facets(courses.values('id'))
+        return response
@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import Application, ApplicationFormResponseField, DocumentUpload, Transaction
+from .models import Application, ApplicationFormResponseField, DocumentUpload, StatusCampaign, Transaction
+from .campaigns import start_campaign
+from .export import export_response
 from django.shortcuts import redirect
 from django.utils.html import format_html
 from django.contrib import messages
 from django.urls import path, reverse
+from course.admin import CourseChoicesMixin, CourseFilter
+from instituteadmin.admin import InstituteScopedAdminMixin
 
 class ApplicationFormResponseFieldInline(admin.TabularInline):
     model = ApplicationFormResponseField
@@ -22,14 +26,24 @@ class ApplicationFormResponseFieldInline(admin.TabularInline):
     get_value.short_description = "Value"
     get_field_name.short_description = "Field Name"
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('form_details')
+
 class DocumentUploadInline(admin.TabularInline):
     model = DocumentUpload
     extra = 0
+    readonly_fields = ('document_details',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('document_details')
 
 
-class ApplicationAdmin(admin.ModelAdmin):
+class ApplicationAdmin(InstituteScopedAdminMixin, CourseChoicesMixin, admin.ModelAdmin):
     list_display = ('full_name', 'email', 'phone_number', 'course', 'status', 'submitted_on', 'updated_on', 'approve_reject_buttons',)
-    list_filter = ('status', 'submitted_on', 'course')
+    list_select_related = ('course__offered_by',)
+    institute_lookup = 'course__offered_by_id'
+    list_filter = ('status', 'submitted_on', ('course', CourseFilter))
+    raw_id_fields = ('applied_by',)
     search_fields = ('full_name', 'email', 'phone_number', 'applied_by__full_name', 'course__name')
     readonly_fields = ('submitted_on', 'updated_on')
     
@@ -37,6 +51,12 @@ class ApplicationAdmin(admin.ModelAdmin):
 
     inlines = [ApplicationFormResponseFieldInline, DocumentUploadInline]
 
+    def get_queryset(self, request):
+        # the change page shows the applicant, course and batch through their __str__
+        return super().get_queryset(request).select_related(
+            'applied_by', 'course__offered_by', 'batch_selected__course', 'batch_selected__location',
+        )
+
     def get_readonly_fields(self, request, obj=None):
         if request.user.is_superuser:
             return self.readonly_fields
@@ -51,19 +71,27 @@ class ApplicationAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser
     
-    actions = ['approve_application', 'reject_application']
+    actions = ['approve_application', 'reject_application', 'export_csv', 'export_xlsx']
 
     def approve_application(self, request, queryset):
-        updated_count = queryset.update(status=Application.Status.ACCEPTED)
-        self.message_user(request, f"{updated_count} application(s) approved.", messages.SUCCESS)
+        campaign = start_campaign(queryset, Application.Status.ACCEPTED, request.user)
+        self.message_user(request, f"{campaign.total} application(s) approved. Applicants will be notified by email.", messages.SUCCESS)
 
     def reject_application(self, request, queryset):
-        updated_count = queryset.update(status=Application.Status.REJECTED)
-        self.message_user(request, f"{updated_count} application(s) rejected.", messages.WARNING)
+        campaign = start_campaign(queryset, Application.Status.REJECTED, request.user)
+        self.message_user(request, f"{campaign.total} application(s) rejected. Applicants will be notified by email.", messages.WARNING)
 
     approve_application.short_description = "Approve selected applications"
     reject_application.short_description = "Reject selected applications"
 
+    @admin.action(description="Export selected applications as CSV")
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv', 'applications')
+
+    @admin.action(description="Export selected applications as XLSX")
+    def export_xlsx(self, request, queryset):
+        return export_response(queryset, 'xlsx', 'applications')
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -73,16 +101,12 @@ class ApplicationAdmin(admin.ModelAdmin):
         return custom_urls + urls
 
     def approve_view(self, request, application_id):
-        application = Application.objects.get(id=application_id)
-        application.status = Application.Status.ACCEPTED
-        application.save()
+        start_campaign(self.get_queryset(request).filter(id=application_id), Application.Status.ACCEPTED, request.user)
         self.message_user(request, "Application approved.", messages.SUCCESS)
         return redirect(request.META.get('HTTP_REFERER', 'admin:index'))
 
     def reject_view(self, request, application_id):
-        application = Application.objects.get(id=application_id)
-        application.status = Application.Status.REJECTED
-        application.save()
+        start_campaign(self.get_queryset(request).filter(id=application_id), Application.Status.REJECTED, request.user)
         self.message_user(request, "Application rejected.", messages.WARNING)
         return redirect(request.META.get('HTTP_REFERER', 'admin:index'))
 
@@ -97,9 +121,12 @@ class ApplicationAdmin(admin.ModelAdmin):
     approve_reject_buttons.short_description = "Actions"
 
 
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(InstituteScopedAdminMixin, admin.ModelAdmin):
     list_display = ('application',)
+    list_select_related = ('application__applied_by', 'application__course')
+    institute_lookup = 'application__course__offered_by_id'
     readonly_fields = ('application',)
+    raw_id_fields = ('application',)
 
     def get_readonly_fields(self, request, obj=None):
         if request.user.is_superuser:
@@ -110,5 +137,19 @@ class TransactionAdmin(admin.ModelAdmin):
         return request.user.is_superuser
 
 
+class StatusCampaignAdmin(admin.ModelAdmin):
+    list_display = ('status', 'state', 'total', 'sent_count', 'failed_count', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'state')
+    readonly_fields = ('status', 'created_by', 'cursor', 'retries', 'total', 'sent_count', 'failed_count', 'last_error', 'created_at', 'locked_at', 'finished_at')
+    exclude = ('applications',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+
 admin.site.register(Application, ApplicationAdmin)
+admin.site.register(StatusCampaign, StatusCampaignAdmin)
 admin.site.register(Transaction, TransactionAdmin)
\ No newline at end of file
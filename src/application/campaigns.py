@@ -0,0 +1,158 @@
+"""
+Emails for bulk application status changes.
+
+`start_campaign` moves the selected applications to the new status and records
+them in a `StatusCampaign`; the `send_status_campaigns` worker then walks the
+campaign's applications in id order, a chunk at a time, rendering one email
+per applicant and sending it over the pooled SMTP connection at no more than
+`CAMPAIGN_SEND_RATE` messages per second. The cursor is advanced after every
+message, so a run that crashes resumes after the last applicant emailed.
+
+An email that cannot be rendered or that the server refuses for good (a 5xx
+reply) is counted as failed and skipped. A dropped connection or a 4xx reply
+releases the campaign to be retried from the same applicant, at most
+`CAMPAIGN_MAX_RETRIES` times before that email too is counted as failed.
+"""
+import smtplib
+import time
+from itertools import islice
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import get_template
+from django.utils import timezone
+from emailclient.pool import DISCONNECTED, smtp_pool
+from .models import Application, StatusCampaign
+import constants
+
+# subject and body template for each status applicants are told about
+TEMPLATES = {
+    Application.Status.ACCEPTED: ("Your application for {course} has been accepted", 'application/email/accepted.txt'),
+    Application.Status.REJECTED: ("Update on your application for {course}", 'application/email/rejected.txt'),
+}
+
+
+def start_campaign(queryset, status: str, user=None) -> StatusCampaign:
+    """Move the applications in `queryset` to `status` and queue emails for the ones that changed."""
+    Membership = StatusCampaign.applications.through
+    with transaction.atomic():
+        campaign = StatusCampaign.objects.create(status=status, created_by=user)
+        ids = queryset.exclude(status=status).order_by().values_list('id', flat=True).iterator(chunk_size=constants.CAMPAIGN_CHUNK_SIZE)
+        while chunk := list(islice(ids, constants.CAMPAIGN_CHUNK_SIZE)):
+            Membership.objects.bulk_create(
+                [Membership(statuscampaign_id=campaign.id, application_id=id) for id in chunk]
+            )
+            campaign.total += len(chunk)
+
+        Application.objects.filter(status_campaigns=campaign).update(status=status, updated_on=timezone.now())
+        if campaign.total and status in TEMPLATES:
+            campaign.save(update_fields=['total'])
+        else:
+            campaign.delete()
+            campaign.id = None
+    return campaign
+
+
+def claim() -> StatusCampaign | None:
+    """Lock the oldest campaign that still has emails to send for this worker."""
+    now = timezone.now()
+    abandoned = Q(state=StatusCampaign.State.RUNNING, locked_at__lt=now - constants.CAMPAIGN_LOCK_TIMEOUT)
+    with transaction.atomic():
+        campaign = (
+            StatusCampaign.objects.select_for_update(skip_locked=True)
+            .filter(Q(state=StatusCampaign.State.PENDING) | abandoned)
+            .order_by('created_at')
+            .first()
+        )
+        if campaign:
+            campaign.state, campaign.locked_at = StatusCampaign.State.RUNNING, now
+            campaign.save(update_fields=['state', 'locked_at'])
+    return campaign
+
+
+class Pacer:
+    """Spaces calls to `wait` at least 1 / rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_at = 0
+
+    def wait(self):
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+
+def render(campaign: StatusCampaign, template, application: Application) -> EmailMessage:
+    subject = TEMPLATES[campaign.status][0].format(course=application.course.name)
+    body = template.render({'application': application, 'course': application.course, 'institute': application.course.offered_by})
+    return EmailMessage(subject, body, settings.EMAIL_HOST_USER, [application.email])
+
+
+def transient(error: Exception) -> bool:
+    """Whether sending may succeed if retried: the connection dropped or the server answered 4xx"""
+    if isinstance(error, DISCONNECTED):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 400 <= error.smtp_code < 500
+
+
+def failure(error: Exception) -> dict:
+    return {'failed_count': F('failed_count') + 1, 'last_error': repr(error)}
+
+
+def send_chunk(campaign: StatusCampaign, pacer: Pacer, running=lambda: True) -> int:
+    """Email the next chunk of applicants, returning how many were handled (0 once finished)."""
+    applications = list(
+        Application.objects.filter(status_campaigns=campaign, id__gt=campaign.cursor)
+        .select_related('course__offered_by')
+        .order_by('id')[:constants.CAMPAIGN_CHUNK_SIZE]
+    )
+    progress = StatusCampaign.objects.filter(id=campaign.id)
+    if not applications:
+        progress.update(state=StatusCampaign.State.DONE, locked_at=None, finished_at=timezone.now())
+        return 0
+
+    template = get_template(TEMPLATES[campaign.status][1])
+    handled = 0
+    for application in applications:
+        if not running():
+            break
+        pacer.wait()
+        try:
+            message = render(campaign, template, application)
+            smtp_pool.send_messages([message])
+            outcome = {'sent_count': F('sent_count') + 1}
+        except Exception as error:
+            if transient(error) and campaign.retries < constants.CAMPAIGN_MAX_RETRIES:
+                # released by `run`; the next claim starts again with this applicant
+                progress.update(retries=F('retries') + 1)
+                raise
+            # a bad address, a refused message or a broken template should not hold up the rest of the campaign
+            outcome = failure(error)
+        progress.update(cursor=application.id, retries=0, locked_at=timezone.now(), **outcome)
+        campaign.cursor, campaign.retries = application.id, 0
+        handled += 1
+    return handled
+
+
+def release(campaign: StatusCampaign, **fields):
+    """Hand the campaign back for the next claim, which resumes from the cursor."""
+    StatusCampaign.objects.filter(id=campaign.id, state=StatusCampaign.State.RUNNING).update(
+        state=StatusCampaign.State.PENDING, locked_at=None, **fields,
+    )
+
+
+def run(campaign: StatusCampaign, rate: float = constants.CAMPAIGN_SEND_RATE, running=lambda: True):
+    """Send `campaign` until it is finished or `running()` turns false."""
+    pacer = Pacer(rate)
+    try:
+        while running() and send_chunk(campaign, pacer, running):
+            pass
+    except Exception as error:
+        release(campaign, last_error=repr(error))
+        raise
+    # stopped early; a finished campaign is already DONE and left alone
+    release(campaign)
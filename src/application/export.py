@@ -0,0 +1,224 @@
+"""
+Streaming CSV / XLSX export of applications.
+
+Applications are read with a server-side cursor (`.iterator(chunk_size=...)`)
+and their form responses fetched one chunk at a time, so memory use does not
+depend on how many applications are exported. The form-field columns are
+resolved once, up front, from `ApplicationFormField`.
+
+The XLSX file is a minimal workbook (one sheet of inline strings) written
+through `zipfile` into a buffer that is drained after every few rows.
+"""
+import csv
+import io
+import math
+import re
+import zipfile
+from collections import defaultdict
+from itertools import islice
+from xml.sax.saxutils import escape
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from course.models import ApplicationFormField
+from .models import Application, ApplicationFormResponseField
+import constants
+
+# (lookup, header) of the columns every export starts with
+BASE_COLUMNS = [
+    ('id', 'Application ID'),
+    ('full_name', 'Full name'),
+    ('email', 'Email'),
+    ('phone_number', 'Phone number'),
+    ('date_of_birth', 'Date of birth'),
+    ('course__name', 'Course'),
+    ('batch_selected__location__name', 'Batch location'),
+    ('batch_selected__commencement_date', 'Batch commencement'),
+    ('status', 'Status'),
+    ('submitted_on', 'Submitted on'),
+]
+STATUS_LABELS = dict(Application.Status.choices)
+
+
+def form_fields(queryset) -> list:
+    """Form fields of every course in `queryset`, in one query."""
+    course_ids = queryset.order_by().values('course_id').distinct()
+    return list(
+        ApplicationFormField.objects.filter(course_id__in=course_ids)
+        .select_related('course')
+        .order_by('course_id', 'id')
+    )
+
+
+def header(fields: list) -> list:
+    single_course = len({field.course_id for field in fields}) <= 1
+    return [title for _, title in BASE_COLUMNS] + [
+        field.field_name if single_course else f"{field.course.name}: {field.field_name}" for field in fields
+    ]
+
+
+def cell(value):
+    if hasattr(value, 'tzinfo'):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def rows(queryset, fields: list):
+    """Yield the header, then one flat row per application in `queryset`."""
+    yield header(fields)
+
+    positions = {field.id: index for index, field in enumerate(fields)}
+    numeric = {field.id for field in fields if field.field_type == ApplicationFormField.FieldType.NUMBER}
+    status_index = [lookup for lookup, _ in BASE_COLUMNS].index('status')
+
+    applications = (
+        queryset.order_by('id')
+        .values_list(*[lookup for lookup, _ in BASE_COLUMNS])
+        .iterator(chunk_size=constants.APPLICATION_EXPORT_CHUNK_SIZE)
+    )
+    while chunk := list(islice(applications, constants.APPLICATION_EXPORT_CHUNK_SIZE)):
+        answers = defaultdict(dict)
+        if fields:
+            responses = ApplicationFormResponseField.objects.filter(
+                application_id__in=[row[0] for row in chunk], form_details_id__in=list(positions),
+            ).values_list('application_id', 'form_details_id', 'value_text', 'value_number')
+            for application_id, field_id, text, number in responses:
+                answers[application_id][field_id] = number if field_id in numeric else text
+
+        for row in chunk:
+            values = [cell(value) for value in row]
+            values[status_index] = STATUS_LABELS.get(values[status_index], values[status_index])
+            answered = [None] * len(fields)
+            for field_id, value in answers[row[0]].items():
+                answered[positions[field_id]] = value
+            yield values + answered
+
+
+SIGNED_NUMBER = re.compile(r'[+-]\d[\d .]*')
+
+
+class Echo:
+    """File-like object whose `write` hands the data back, for `csv.writer`."""
+
+    def write(self, value):
+        return value
+
+
+def csv_safe(value):
+    if value is None:
+        return ''
+    # keep spreadsheet apps from evaluating applicant input as a formula; a
+    # signed number (an E.164 phone number, a negative mark) is no formula
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r') and not SIGNED_NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    # BOM so Excel reads the file as UTF-8
+    yield '\ufeff'
+    for row in rows:
+        yield writer.writerow([csv_safe(value) for value in row])
+
+
+class ZipStream(io.RawIOBase):
+    """Write-only, unseekable sink for `zipfile`; `drain` returns what was written since the last call."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks, self.size = [], 0
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Applications" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_TAIL = '</sheetData></worksheet>'
+# characters XML 1.0 does not allow at all
+INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# flush the zip buffer to the client once this much has accumulated
+XLSX_FLUSH_SIZE = 64 * 1024
+
+
+def xlsx_cell(value) -> str:
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = escape(INVALID_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(rows):
+    buffer = ZipStream()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(SHEET_HEAD.encode())
+            for number, row in enumerate(rows, 1):
+                sheet.write(f'<row r="{number}">{"".join(xlsx_cell(value) for value in row)}</row>'.encode())
+                if buffer.size >= XLSX_FLUSH_SIZE:
+                    yield buffer.drain()
+            sheet.write(SHEET_TAIL.encode())
+    yield buffer.drain()
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def export_response(queryset, file_format: str, filename: str) -> StreamingHttpResponse:
+    stream, content_type = FORMATS[file_format]
+    response = StreamingHttpResponse(stream(rows(queryset, form_fields(queryset))), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    # let nginx pass the rows on as they are produced
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from application.models import DocumentUploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete expired document upload sessions and their part files"
+
+    def handle(self, *args, **options):
+        purged = 0
+        for session in DocumentUploadSession.objects.filter(expires_at__lte=timezone.now()).iterator():
+            session.discard()
+            purged += 1
+        self.stdout.write(f"Purged {purged} expired upload sessions")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from course.models import Course
+from application.models import ApplicationCounter
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Recount the per course / batch / status application counters from the applications"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, nargs='*', help="Only recount these course ids")
+
+    def handle(self, *args, **options):
+        course_ids = options['course'] or list(Course.objects.order_by('id').values_list('id', flat=True))
+        wrong = 0
+        for start in range(0, len(course_ids), CHUNK_SIZE):
+            wrong += ApplicationCounter.rebuild(course_ids[start:start + CHUNK_SIZE])
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt application counters for {len(course_ids)} course(s), {wrong} were wrong"))
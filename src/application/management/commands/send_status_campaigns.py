@@ -0,0 +1,47 @@
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from application.campaigns import claim, run
+from emailclient.pool import smtp_pool
+import constants
+
+
+class Command(BaseCommand):
+    help = "Email applicants about bulk status changes, resuming unfinished campaigns"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send the pending campaigns once and exit")
+        parser.add_argument('--rate', type=float, default=constants.CAMPAIGN_SEND_RATE, help="Emails per second")
+        parser.add_argument(
+            '--interval', type=float, default=constants.CAMPAIGN_POLL_INTERVAL.total_seconds(),
+            help="Seconds to sleep when there is nothing to send",
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while self.running:
+            close_old_connections()
+            try:
+                campaign = claim()
+                if campaign:
+                    run(campaign, options['rate'], lambda: self.running)
+            except Exception as error:
+                # the campaign is released and resumes from its cursor on a later pass
+                self.stderr.write(f"Campaign failed: {error!r}")
+                campaign = None
+                if options['once']:
+                    raise
+
+            if options['once'] and not campaign:
+                break
+            if not campaign:
+                time.sleep(options['interval'])
+
+        smtp_pool.close()
+
+    def stop(self, *args):
+        self.running = False
@@ -1,12 +1,63 @@
-from django.db import models
+import os
+import uuid
+from collections import Counter
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, F
+from blobstore.storage import document_storage
 from student.models import Student
+from user.models import User
 from course.models import Course, ApplicationFormField, Batch, RequiredDocument
 import constants
 from django.utils import timezone
 
+# fields an `ApplicationCounter` row is keyed on, and the names `update()` may set them by
+COUNTED_FIELDS = ('course_id', 'batch_selected_id', 'status')
+COUNTED_UPDATES = {'course', 'course_id', 'batch_selected', 'batch_selected_id', 'status'}
+
+
+class ApplicationQuerySet(models.QuerySet):
+    """ Keeps `ApplicationCounter` in step with bulk writes that bypass `Application.save` """
+
+    def counter_keys(self) -> Counter:
+        rows = self.order_by().values_list(*COUNTED_FIELDS).annotate(applications=Count('id'))
+        return Counter({(course_id, batch_id, status): applications for course_id, batch_id, status, applications in rows})
+
+    def update(self, **kwargs):
+        if COUNTED_UPDATES.isdisjoint(kwargs):
+            return super().update(**kwargs)
+
+        updated = 0
+        with transaction.atomic(using=self.db):
+            # lock the matched rows and work on their ids: the filter may no longer match after the update
+            ids = list(self.select_for_update(of=('self',)).order_by('id').values_list('id', flat=True))
+            for start in range(0, len(ids), constants.APPLICATION_COUNTER_CHUNK_SIZE):
+                chunk = self.model.objects.using(self.db).filter(id__in=ids[start:start + constants.APPLICATION_COUNTER_CHUNK_SIZE])
+                before = chunk.counter_keys()
+                updated += super(ApplicationQuerySet, chunk).update(**kwargs)
+                deltas = chunk.counter_keys()
+                deltas.subtract(before)
+                ApplicationCounter.adjust(deltas)
+        return updated
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # which rows were really inserted is not known
+                ApplicationCounter.rebuild({application.course_id for application in created})
+            else:
+                ApplicationCounter.adjust(Counter(application.counter_key() for application in created))
+        return created
+
+
 class Application(models.Model):
     class Meta:
         verbose_name_plural = 'Applications'
+        indexes = [
+            # an institute's applications per course, filtered by status and sorted by date
+            models.Index(fields=['course', 'status', 'submitted_on'], name='application_course_status_idx'),
+        ]
     class Status(models.TextChoices):
         UNDER_REVIEW = 'UNDER_REVIEW', 'Under review'
         REVIEWED = 'REVIEWED', 'reviewed'
@@ -30,9 +81,114 @@ class Application(models.Model):
     updated_on = models.DateTimeField(default=timezone.now)
     # transaction_details
 
+    objects = ApplicationQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_counter_key = instance.counter_key()
+        return instance
+
+    def counter_key(self) -> tuple | None:
+        """ The `ApplicationCounter` this application is counted in; None if a counted field was not loaded """
+        key = tuple(self.__dict__.get(field) for field in COUNTED_FIELDS)
+        return None if None in key else key
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        unchanged = getattr(self, '_loaded_counter_key', None) == self.counter_key()
+        if not self._state.adding and unchanged and update_fields is None:
+            # leave course, batch and status out of the write: the loaded values may be stale,
+            # and writing them back would undo a concurrent queryset update behind the counters' back
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred and field.attname not in COUNTED_FIELDS
+            ]
+        if not self._state.adding and update_fields is not None and COUNTED_UPDATES.isdisjoint(update_fields):
+            # course, batch and status are not being written
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            deltas = Counter()
+            if not self._state.adding:
+                previous = Application.objects.select_for_update().filter(pk=self.pk).values_list(*COUNTED_FIELDS).first()
+                if previous:
+                    deltas[previous] -= 1
+            super().save(*args, **kwargs)
+            deltas[tuple(getattr(self, field) for field in COUNTED_FIELDS)] += 1
+            ApplicationCounter.adjust(deltas)
+        self._loaded_counter_key = self.counter_key()
+
     def __str__(self):
         return f"Applied by: {self.applied_by.full_name}, Applied for: {self.course.name}"
 
+
+class ApplicationCounter(models.Model):
+    """
+    Number of applications per (course, batch, status), maintained by `Application.save`,
+    `ApplicationQuerySet` and the post_delete receiver in the same transaction as the
+    write, so institute dashboards read a handful of rows instead of counting applications.
+    `rebuild_application_counters` recomputes them from scratch; entrypoint.sh runs it on
+    every deploy, which also counts the applications made before the counters existed.
+    """
+    class Meta:
+        verbose_name_plural = 'Application counters'
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'batch', 'status'], name='application_counter_unique'),
+        ]
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='application_counters')
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='application_counters')
+    status = models.CharField(max_length=20, choices=Application.Status.choices)
+    count = models.IntegerField(default=0)
+
+    @classmethod
+    def adjust(cls, deltas: Counter):
+        """ Add `deltas`, keyed by (course id, batch id, status), to the counters """
+        # a consistent order keeps concurrent writers from deadlocking on the counter rows
+        for (course_id, batch_id, status), delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            counter = cls.objects.filter(course_id=course_id, batch_id=batch_id, status=status)
+            if counter.update(count=F('count') + delta) or delta < 0:
+                # a missing row is not created for a decrement: its course or batch may be being deleted
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(course_id=course_id, batch_id=batch_id, status=status, count=delta)
+            except IntegrityError:
+                # created by a concurrent writer in the meantime
+                counter.update(count=F('count') + delta)
+
+    @classmethod
+    def rebuild(cls, course_ids=None) -> int:
+        """ Recount the counters of `course_ids` (all courses if None), returning how many were wrong """
+        applications = Application.objects.all()
+        counters = cls.objects.all()
+        if course_ids is not None:
+            applications = applications.filter(course_id__in=course_ids)
+            counters = counters.filter(course_id__in=course_ids)
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # hold off application writes (and their counter updates) until the new rows are in
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {connection.ops.quote_name(Application._meta.db_table)} IN SHARE MODE')
+            actual = applications.counter_keys()
+            stored = Counter({(row.course_id, row.batch_id, row.status): row.count for row in counters.select_for_update()})
+            wrong = sum(1 for key in actual.keys() | stored.keys() if actual[key] != stored[key])
+            if wrong:
+                counters.delete()
+                cls.objects.bulk_create([
+                    cls(course_id=course_id, batch_id=batch_id, status=status, count=count)
+                    for (course_id, batch_id, status), count in actual.items()
+                ])
+        return wrong
+
+    def __str__(self):
+        return f"{self.count} {self.status} applications for course {self.course_id}, batch {self.batch_id}"
+
 class ApplicationFormResponseField(models.Model):
     class Meta:
         verbose_name_plural = 'Application form response fields'
@@ -49,9 +205,66 @@ class DocumentUpload(models.Model):
         verbose_name_plural = 'Uploaded documents'
         
     document_details = models.ForeignKey(RequiredDocument, on_delete=models.CASCADE)
-    file = models.FileField(upload_to=constants.FILE_UPLOAD_PATH)
+    # indexed: every request for the file looks up who may read it by name
+    file = models.FileField(upload_to=constants.FILE_UPLOAD_PATH, storage=document_storage, db_index=True)
     
     application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='uploaded_docs')
+
+    @classmethod
+    def replace(cls, application, document_details, file) -> 'DocumentUpload':
+        """ Store `file` as the application's copy of `document_details`, removing earlier uploads of it """
+        with transaction.atomic():
+            previous = list(
+                cls.objects.select_for_update().filter(application=application, document_details=document_details).order_by('id')
+            )
+            document = previous[0] if previous else cls(application=application, document_details=document_details)
+            # the file of the row reused below; deleted duplicates release theirs through post_delete
+            old_file = previous[0].file if previous else None
+            document.file = file
+            document.save()
+            cls.objects.filter(id__in=[upload.id for upload in previous[1:]]).delete()
+
+            if old_file:
+                # a blob reference is dropped even when the new content is the same blob
+                transaction.on_commit(lambda: old_file.storage.delete(old_file.name))
+        return document
+
+
+def upload_session_expiry():
+    return timezone.now() + constants.UPLOAD_SESSION_LIFETIME
+
+
+class DocumentUploadSession(models.Model):
+    """ A resumable, chunked upload of a required document, assembled in UPLOAD_PARTIAL_ROOT """
+    class Meta:
+        verbose_name_plural = 'Document upload sessions'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='upload_sessions')
+    document_details = models.ForeignKey(RequiredDocument, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255, blank=True, default='')
+    size = models.PositiveBigIntegerField()
+    # bytes received so far; the next chunk must start here
+    offset = models.PositiveBigIntegerField(default=0)
+    # detected from the magic bytes of the first chunk
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(default=upload_session_expiry)
+
+    @property
+    def partial_path(self) -> str:
+        return os.path.join(settings.UPLOAD_PARTIAL_ROOT, f"{self.id}.part")
+
+    def discard(self):
+        """ Delete the session and whatever was received """
+        try:
+            os.remove(self.partial_path)
+        except FileNotFoundError:
+            pass
+        self.delete()
+
+    def __str__(self):
+        return f"Upload of {self.document_details_id} for application {self.application_id} ({self.offset}/{self.size} bytes)"
 class Transaction(models.Model):
     class Meta:
         verbose_name_plural = 'Transactions'
@@ -60,4 +273,39 @@ class Transaction(models.Model):
     
     # other details to be added later when payment is implemented 
 
-    
\ No newline at end of file
+    
+
+
+class StatusCampaign(models.Model):
+    """ Emails telling applicants about a bulk approve / reject, sent in chunks by `send_status_campaigns` """
+    class Meta:
+        verbose_name_plural = 'Status campaigns'
+        indexes = [
+            models.Index(fields=['state', 'created_at'], name='statuscampaign_due_idx'),
+        ]
+
+    class State(models.TextChoices):
+        PENDING = 'PENDING', 'pending'
+        RUNNING = 'RUNNING', 'running'
+        DONE = 'DONE', 'done'
+
+    status = models.CharField(max_length=20, choices=Application.Status.choices)
+    applications = models.ManyToManyField(Application, related_name='status_campaigns')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    state = models.CharField(max_length=10, choices=State.choices, default=State.PENDING)
+    # applications are emailed in id order; everything up to `cursor` has been handled
+    cursor = models.PositiveBigIntegerField(default=0)
+    # connection-level failures in a row on the applicant after `cursor`
+    retries = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_status_display()} campaign ({self.sent_count}/{self.total} sent)"
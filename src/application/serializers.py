@@ -1,10 +1,12 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Application, ApplicationFormResponseField, DocumentUpload
+from .models import Application, ApplicationFormResponseField, DocumentUpload, DocumentUploadSession
 from course.serializers import CourseSerializer, BatchSerializer, ApplicationFormFieldsSerializer, RequiredDocumentsSerializer
 from student.serializers import StudentSerializer
 from course.models import Course, Batch, ApplicationFormField
 from utils import format_phone_number
-import mimetypes
+from .uploads import MAGIC_LENGTH, sniff
+import constants
 
 class ApplicationFormSerializer(serializers.ModelSerializer):
     value_text = serializers.CharField(required=False, allow_null=True)
@@ -60,21 +62,37 @@ class ApplicationReqDocsSerializer(serializers.Serializer):
 
     def validate_file(self, value):
         """
-        Validate file type and size.
+        Validate file type (from its leading bytes, not its name) and size.
         """
-        allowed_types = ["application/pdf", "image/jpeg", "image/png"]
-        max_size = 5 * 1024 * 1024  # 5MB limit
+        if value.size > constants.DOCUMENT_MAX_SIZE:
+            raise serializers.ValidationError(f"File size must be less than {constants.DOCUMENT_MAX_SIZE // (1024 * 1024)}MB.")
 
-        content_type, _ = mimetypes.guess_type(value.name)
-        
-        if content_type not in allowed_types:
+        head = value.read(MAGIC_LENGTH)
+        value.seek(0)
+        if not sniff(head):
             raise serializers.ValidationError("Only PDF, JPEG, and PNG files are allowed.")
 
-        # if value.size > max_size:
-        #     raise serializers.ValidationError("File size must be less than 5MB.")
-
         return value
 
+
+class UploadSessionRequestSerializer(serializers.Serializer):
+    size = serializers.IntegerField(min_value=1, max_value=constants.DOCUMENT_MAX_SIZE)
+    filename = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DocumentUploadSession
+        fields = [
+            'id',
+            'document_details',
+            'filename',
+            'size',
+            'offset',
+            'content_type',
+            'expires_at',
+        ]
+
 class ApplicationDetailSerializer(serializers.ModelSerializer):
     form_data = ApplicationFormSerializer(many=True)
     course = CourseSerializer(many=False)
@@ -107,7 +125,8 @@ class ApplicationDetailSerializer(serializers.ModelSerializer):
 class ApplicationFormCreateSerializer(serializers.ModelSerializer):
     value_text = serializers.CharField(required=False, allow_null=True)
     value_number = serializers.FloatField(required=False, allow_null=True)
-    form_details = serializers.PrimaryKeyRelatedField(queryset=ApplicationFormField.objects.all())  # Only ID for POST
+    # Only ID for POST; existence is checked for the whole list in ApplicationRequestSerializer.validate_form_data
+    form_details = serializers.IntegerField(source='form_details_id')
     
     class Meta:
         model = ApplicationFormResponseField
@@ -135,11 +154,25 @@ class ApplicationRequestSerializer(serializers.Serializer):
         
         return formatted_phone_number
 
+    def validate_form_data(self, value):
+        """
+        Check all referenced form fields with one query instead of one per entry.
+        """
+        field_ids = {entry['form_details_id'] for entry in value}
+        existing = set(ApplicationFormField.objects.filter(id__in=field_ids).values_list('id', flat=True))
+        if field_ids - existing:
+            raise serializers.ValidationError([
+                {} if entry['form_details_id'] in existing
+                else {'form_details': [f'Invalid pk "{entry["form_details_id"]}" - object does not exist.']}
+                for entry in value
+            ])
+        return value
+
     def validate(self, data):
         course = data.get("course")
         batch_selected = data.get("batch_selected")
 
-        if batch_selected and batch_selected.course != course:
+        if batch_selected and course and batch_selected.course_id != course.id:
             raise serializers.ValidationError({"batch_selected": "This batch does not belong to the selected course."})
 
         return data
@@ -162,17 +195,19 @@ class ApplicationRequestSerializer(serializers.Serializer):
         form_data = validated_data.pop('form_data', [])
         applied_by = self.context['user']
         
-        application = Application.objects.create(
-            applied_by=applied_by, 
-            full_name=validated_data.get('full_name'),
-            phone_number=validated_data.get('phone_number'),
-            email=validated_data.get('email'),
-            date_of_birth=validated_data.get('date_of_birth'),
-            course=validated_data.get('course'),
-            batch_selected=validated_data.get('batch_selected'),
-        )
-        for entry in form_data:
-            ApplicationFormResponseField.objects.create(application=application, **entry)
+        with transaction.atomic():
+            application = Application.objects.create(
+                applied_by=applied_by, 
+                full_name=validated_data.get('full_name'),
+                phone_number=validated_data.get('phone_number'),
+                email=validated_data.get('email'),
+                date_of_birth=validated_data.get('date_of_birth'),
+                course=validated_data.get('course'),
+                batch_selected=validated_data.get('batch_selected'),
+            )
+            ApplicationFormResponseField.objects.bulk_create([
+                ApplicationFormResponseField(application=application, **entry) for entry in form_data
+            ])
             
         return application
     
@@ -183,24 +218,34 @@ class ApplicationRequestSerializer(serializers.Serializer):
         instance.email = validated_data.get('email', instance.email)
         instance.date_of_birth = validated_data.get('date_of_birth', instance.date_of_birth)
         
-        instance.course = validated_data.get('course', instance.course)
-        instance.batch_selected = validated_data.get('batch_selected', instance.batch_selected)
+        if 'course' in validated_data:
+            instance.course = validated_data['course']
+        if 'batch_selected' in validated_data:
+            instance.batch_selected = validated_data['batch_selected']
 
         form_data = validated_data.get('form_data')
-        if form_data is not None:
-            existing_fields = {field.form_details.id: field for field in instance.form_data.all()}
-            
-            for entry in form_data:
-                field_id = entry["form_details"].id
-                if field_id in existing_fields:
-
-                    form_field = existing_fields[field_id]
-                    form_field.value_text = entry.get("value_text", form_field.value_text)
-                    form_field.value_number = entry.get("value_number", form_field.value_number)
-                    form_field.save()
-                else:
-                    ApplicationFormResponseField.objects.create(application=instance, **entry)
-
-        instance.save()
+        with transaction.atomic():
+            if form_data is not None:
+                existing_fields = {field.form_details_id: field for field in instance.form_data.all()}
+                changed_fields = []
+                new_fields = []
+
+                for entry in form_data:
+                    form_field = existing_fields.get(entry['form_details_id'])
+                    if form_field is None:
+                        new_fields.append(ApplicationFormResponseField(application=instance, **entry))
+                        continue
+
+                    value_text = entry.get("value_text", form_field.value_text)
+                    value_number = entry.get("value_number", form_field.value_number)
+                    if (value_text, value_number) != (form_field.value_text, form_field.value_number):
+                        form_field.value_text = value_text
+                        form_field.value_number = value_number
+                        changed_fields.append(form_field)
+
+                ApplicationFormResponseField.objects.bulk_update(changed_fields, ['value_text', 'value_number'])
+                ApplicationFormResponseField.objects.bulk_create(new_fields)
+
+            instance.save()
         return instance
     
\ No newline at end of file
@@ -0,0 +1,12 @@
+from collections import Counter
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Application, ApplicationCounter
+
+
+@receiver(post_delete, sender=Application)
+def application_deleted(sender, instance, **kwargs):
+    # runs inside the delete's transaction, queryset and cascade deletes included
+    key = instance.counter_key()
+    if key:
+        ApplicationCounter.adjust(Counter({key: -1}))
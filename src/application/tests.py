@@ -1,3 +1,638 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import io
+import os
+import shutil
+import smtplib
+import tempfile
+import re
+import zipfile
+from collections import Counter
+from datetime import date
+from unittest import mock
+from xml.etree import ElementTree
+from django.contrib import admin
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from blobstore.models import Blob
+from course.models import Course, Batch, ApplicationFormField, Duration, EligibilityCriterion, RequiredDocument
+from instituteadmin.models import Detail, InstituteAdmin
+from notification.outbox import enqueue_email
+from preference.models import EducationLevel, Interest, Location, Tag
+from student.models import Student
+from user.models import User
+from user.tokens import AccountRefreshToken
+import constants
+from .campaigns import claim, run, start_campaign
+from .admin import ApplicationAdmin
+from .models import Application, ApplicationCounter, ApplicationFormResponseField, DocumentUpload, DocumentUploadSession, StatusCampaign, Transaction
+from .serializers import ApplicationRequestSerializer
+from .uploads import receive
 
-# Create your tests here.
+
+class ApplicationSubmissionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        education_level = EducationLevel.objects.create(name='Graduate')
+        location = Location.objects.create(name='Pune')
+        cls.student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+
+        cls.courses = {}
+        for field_count in (5, 50):
+            course = Course.objects.create(
+                offered_by=institute,
+                name=f"Course {field_count}",
+                slug=f"course-{field_count}",
+                fee_amount=1000,
+                min_education_level=education_level,
+            )
+            batch = Batch.objects.create(course=course, location=location, commencement_date=date(2026, 1, 1))
+            fields = ApplicationFormField.objects.bulk_create([
+                ApplicationFormField(course=course, field_name=f"Field {i}") for i in range(field_count)
+            ])
+            cls.courses[field_count] = (course, batch, fields)
+
+    def payload(self, field_count, value='answer'):
+        course, batch, fields = self.courses[field_count]
+        return {
+            'full_name': 'Student',
+            'phone_number': '+919876543210',
+            'email': 'student@example.com',
+            'date_of_birth': '2000-01-01',
+            'course': course.id,
+            'batch_selected': batch.id,
+            'form_data': [{'form_details': field.id, 'value_text': value} for field in fields],
+        }
+
+    def submit(self, field_count):
+        serializer = ApplicationRequestSerializer(data=self.payload(field_count), context={'user': self.student})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            application = serializer.save()
+        return application, len(queries)
+
+    def test_submission_queries_do_not_grow_with_form_size(self):
+        _, small = self.submit(5)
+        application, large = self.submit(50)
+
+        self.assertEqual(large, small)
+        self.assertEqual(application.form_data.count(), 50)
+
+    def test_update_writes_only_changed_responses(self):
+        application, _ = self.submit(50)
+        payload = self.payload(50)
+        payload['form_data'][0]['value_text'] = 'changed'
+        payload['form_data'][1]['value_text'] = 'changed'
+
+        serializer = ApplicationRequestSerializer(application, data=payload, partial=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            serializer.save()
+
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "application_applicationformresponsefield"')]
+        self.assertEqual(len(updates), 1)
+        self.assertLess(len(queries), 15)
+        self.assertEqual(
+            ApplicationFormResponseField.objects.filter(application=application, value_text='changed').count(), 2,
+        )
+
+    def test_unknown_form_field_is_rejected(self):
+        payload = self.payload(5)
+        payload['form_data'][2]['form_details'] = 0
+
+        serializer = ApplicationRequestSerializer(data=payload, context={'user': self.student})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('form_details', serializer.errors['form_data'][2])
+
+
+@mock.patch('application.campaigns.Pacer.wait', lambda self: None)
+class StatusCampaignTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        course = Course.objects.create(
+            offered_by=institute, name='Course', slug='course', fee_amount=1000,
+            min_education_level=EducationLevel.objects.create(name='Graduate'),
+        )
+        batch = Batch.objects.create(course=course, location=Location.objects.create(name='Pune'), commencement_date=date(2026, 1, 1))
+        student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+        Application.objects.bulk_create([
+            Application(
+                full_name=f"Applicant {i}", phone_number='+919876543210', email=f"applicant{i}@example.com",
+                date_of_birth=date(2000, 1, 1), applied_by=student, course=course, batch_selected=batch,
+            )
+            for i in range(5)
+        ])
+
+    def test_bulk_approval_emails_each_applicant_once(self):
+        campaign = start_campaign(Application.objects.all(), Application.Status.ACCEPTED)
+
+        self.assertEqual(campaign.total, 5)
+        self.assertEqual(Application.objects.filter(status=Application.Status.ACCEPTED).count(), 5)
+        self.assertEqual(len(mail.outbox), 0)
+
+        run(claim())
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f"applicant{i}@example.com" for i in range(5)])
+        self.assertIn('Course', mail.outbox[0].subject)
+        self.assertIn('Institute has accepted', mail.outbox[0].body)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.state, campaign.sent_count), (StatusCampaign.State.DONE, 5))
+        self.assertIsNone(claim())
+
+    def test_interrupted_campaign_resumes_after_the_cursor(self):
+        start_campaign(Application.objects.all(), Application.Status.REJECTED)
+        campaign = claim()
+
+        with mock.patch('application.campaigns.smtp_pool.send_messages', side_effect=[1, 1, ConnectionError('smtp down')]):
+            with self.assertRaises(ConnectionError):
+                run(campaign)
+
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.state, campaign.sent_count), (StatusCampaign.State.PENDING, 2))
+
+        run(claim())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(StatusCampaign.objects.get().sent_count, 5)
+
+    def test_refused_messages_are_skipped_and_retries_are_capped(self):
+        start_campaign(Application.objects.all(), Application.Status.ACCEPTED)
+        refused = smtplib.SMTPDataError(550, b'Message rejected')
+        with mock.patch('application.campaigns.smtp_pool.send_messages', side_effect=[1, refused, 1, 1, 1]):
+            run(claim())
+
+        campaign = StatusCampaign.objects.get()
+        self.assertEqual((campaign.state, campaign.sent_count, campaign.failed_count), (StatusCampaign.State.DONE, 4, 1))
+        self.assertIn('Message rejected', campaign.last_error)
+
+        start_campaign(Application.objects.all(), Application.Status.REJECTED)
+        busy = smtplib.SMTPDataError(451, b'Try again later')
+        with mock.patch('application.campaigns.smtp_pool.send_messages', side_effect=busy):
+            for _ in range(constants.CAMPAIGN_MAX_RETRIES):
+                with self.assertRaises(smtplib.SMTPDataError):
+                    run(claim())
+            # out of retries, the first applicant is counted as failed and the rest are tried in turn
+            with self.assertRaises(smtplib.SMTPDataError):
+                run(claim())
+
+        campaign = StatusCampaign.objects.get(status=Application.Status.REJECTED)
+        self.assertEqual((campaign.state, campaign.failed_count, campaign.retries), (StatusCampaign.State.PENDING, 1, 1))
+
+    def test_unchanged_applications_are_not_notified(self):
+        Application.objects.update(status=Application.Status.ACCEPTED)
+
+        campaign = start_campaign(Application.objects.all(), Application.Status.ACCEPTED)
+
+        self.assertEqual(campaign.total, 0)
+        self.assertFalse(StatusCampaign.objects.exists())
+
+
+class ApplicationExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        cls.course = Course.objects.create(
+            offered_by=cls.institute, name='Course', slug='course', fee_amount=1000,
+            min_education_level=EducationLevel.objects.create(name='Graduate'),
+        )
+        batch = Batch.objects.create(course=cls.course, location=Location.objects.create(name='Pune'), commencement_date=date(2026, 1, 1))
+        cls.school, cls.marks = ApplicationFormField.objects.bulk_create([
+            ApplicationFormField(course=cls.course, field_name='School'),
+            ApplicationFormField(course=cls.course, field_name='Marks', field_type=ApplicationFormField.FieldType.NUMBER),
+        ])
+        student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+        applications = Application.objects.bulk_create([
+            Application(
+                full_name=f"Applicant {i}", phone_number='+919876543210', email=f"applicant{i}@example.com",
+                date_of_birth=date(2000, 1, 1), applied_by=student, course=cls.course, batch_selected=batch,
+            )
+            for i in range(7)
+        ])
+        ApplicationFormResponseField.objects.bulk_create(
+            [ApplicationFormResponseField(application=application, form_details=cls.school, value_text='=HYPERLINK("x")') for application in applications]
+            + [ApplicationFormResponseField(application=application, form_details=cls.marks, value_number=90.5) for application in applications[:3]]
+        )
+
+    def export(self, user, file_format='csv', course=None):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccountRefreshToken.for_user(user).access_token}")
+        return client.get(f"/api/applications/course/{(course or self.course).id}/export/", {'file_format': file_format})
+
+    def test_csv_has_a_column_per_form_field(self):
+        response = self.export(self.institute)
+
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[0][-2:], ['School', 'Marks'])
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[1][-2:], ["'=HYPERLINK(\"x\")", '90.5'])
+        # phone numbers start with "+" but are not formulas
+        self.assertEqual(rows[1][rows[0].index('Phone number')], '+919876543210')
+        self.assertEqual(rows[-1][-1], '')
+
+    def test_xlsx_is_a_readable_workbook(self):
+        response = self.export(self.institute, 'xlsx')
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        rows = sheet.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}row')
+        self.assertEqual(len(rows), 8)
+        self.assertIn('xl/workbook.xml', archive.namelist())
+
+    def test_queries_grow_with_chunks_not_rows(self):
+        with mock.patch('constants.APPLICATION_EXPORT_CHUNK_SIZE', 3):
+            response = self.export(self.institute)
+            with CaptureQueriesContext(connection) as queries:
+                b''.join(response.streaming_content)
+        # three chunks of applications, each with one query for its form responses
+        self.assertLessEqual(len(queries), 7)
+
+    def test_other_institutes_cannot_export(self):
+        other = InstituteAdmin.objects.create(email='other@example.com', name='Other')
+
+        self.assertEqual(self.export(other).status_code, 404)
+        self.assertEqual(self.export(self.institute, 'pdf').status_code, 400)
+
+
+class AdminQueryCountTest(TestCase):
+    """
+    Every registered ModelAdmin's changelist and change page must render in a
+    bounded number of queries, whatever the number of rows or inlines. The
+    fixture has ROWS related rows of everything, so a per-row lookup shows up
+    as the same statement repeated about ROWS times.
+    """
+    ROWS = 10
+    # the session, the user, the object, and one query per form field or inline
+    BUDGET = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create(email='admin@example.com', is_staff=True, is_superuser=True)
+        education_level = EducationLevel.objects.create(name='Graduate')
+        locations = [Location.objects.create(name=f"Location {i}") for i in range(cls.ROWS)]
+        tags = [Tag.objects.create(name=f"Tag {i}") for i in range(cls.ROWS)]
+        interests = [Interest.objects.create(name=f"Interest {i}") for i in range(cls.ROWS)]
+        students = [
+            Student.objects.create(email=f"student{i}@example.com", full_name=f"Student {i}", phone_number=f"+9198765432{i:02d}")
+            for i in range(cls.ROWS)
+        ]
+
+        for i in range(cls.ROWS):
+            institute = InstituteAdmin.objects.create(email=f"institute{i}@example.com", name=f"Institute {i}")
+            Detail.objects.bulk_create([Detail(admin=institute, detail=f"Detail {j}", info='Info') for j in range(cls.ROWS)])
+            course = Course.objects.create(
+                offered_by=institute, name=f"Course {i}", slug=f"course-{i}", fee_amount=1000, min_education_level=education_level,
+            )
+            course.tags.set(tags)
+            course.relevant_interests.set(interests)
+            Duration.objects.create(course=course, years=1)
+            EligibilityCriterion.objects.bulk_create([EligibilityCriterion(course=course, detail=f"Criterion {j}") for j in range(cls.ROWS)])
+            batches = [Batch.objects.create(course=course, location=location, commencement_date=date(2026, 1, 1)) for location in locations]
+            fields = ApplicationFormField.objects.bulk_create([ApplicationFormField(course=course, field_name=f"Field {j}") for j in range(cls.ROWS)])
+            documents = RequiredDocument.objects.bulk_create([RequiredDocument(course=course, file_name=f"Document {j}") for j in range(cls.ROWS)])
+
+            for student in students:
+                student.wishlist.add(course)
+                application = Application.objects.create(
+                    full_name=student.full_name, phone_number=student.phone_number, email=student.email,
+                    date_of_birth=date(2000, 1, 1), applied_by=student, course=course, batch_selected=batches[0],
+                )
+                ApplicationFormResponseField.objects.bulk_create([
+                    ApplicationFormResponseField(application=application, form_details=field, value_text='answer') for field in fields
+                ])
+                DocumentUpload.objects.bulk_create([
+                    DocumentUpload(application=application, document_details=document, file='documents/file.pdf') for document in documents
+                ])
+                Transaction.objects.create(application=application)
+            enqueue_email('Subject', 'Body', [institute.email])
+
+        start_campaign(Application.objects.all(), Application.Status.ACCEPTED)
+
+    def setUp(self):
+        self.client.force_login(self.superuser)
+
+    def assertPageWithinBudget(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        statements = [query['sql'] for query in queries]
+        listing = "\n".join(statement[:200] for statement in statements)
+        self.assertLessEqual(len(statements), self.BUDGET, f"{url} ran {len(statements)} queries:\n{listing}")
+        # the same statement with different ids / values, i.e. a lookup per row
+        shapes = Counter(re.sub(r"'[^']*'|\b\d+\b", '?', statement) for statement in statements)
+        shape, repeats = shapes.most_common(1)[0]
+        self.assertLess(repeats, self.ROWS // 2, f"{url} ran this {repeats} times:\n{shape[:300]}")
+
+    def test_every_registered_admin(self):
+        for model in admin.site._registry:
+            info = model._meta.app_label, model._meta.model_name
+            with self.subTest(model=model.__name__):
+                self.assertPageWithinBudget(reverse('admin:%s_%s_changelist' % info))
+                obj = model._default_manager.order_by('pk').last()
+                if obj is not None:
+                    self.assertPageWithinBudget(reverse('admin:%s_%s_change' % info, args=[obj.pk]))
+
+
+class InstituteScopedAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        education_level = EducationLevel.objects.create(name='Graduate')
+        location = Location.objects.create(name='Pune')
+        student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+        cls.institutes = []
+        for i in range(2):
+            institute = InstituteAdmin.objects.create(email=f"institute{i}@example.com", name=f"Institute {i}", is_staff=True)
+            course = Course.objects.create(offered_by=institute, name=f"Course {i}", slug=f"course-{i}", fee_amount=1000, min_education_level=education_level)
+            batch = Batch.objects.create(course=course, location=location, commencement_date=date(2026, 1, 1))
+            application = Application.objects.create(
+                full_name='Student', phone_number=student.phone_number, email=student.email,
+                date_of_birth=date(2000, 1, 1), applied_by=student, course=course, batch_selected=batch,
+            )
+            Transaction.objects.create(application=application)
+            cls.institutes.append(institute)
+
+    def request(self, institute):
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=institute.pk)
+        return request
+
+    def test_institute_admins_only_see_their_own_rows(self):
+        own, other = self.institutes
+        request = self.request(own)
+
+        for model in (Application, Course, Batch, Transaction, InstituteAdmin):
+            with self.subTest(model=model.__name__):
+                queryset = admin.site._registry[model].get_queryset(request)
+                # a single join on the institute's id, no lookup of the institute first
+                with self.assertNumQueries(1):
+                    rows = list(queryset)
+                self.assertEqual(len(rows), 1)
+
+        self.assertEqual([application.course.offered_by_id for application in admin.site._registry[Application].get_queryset(request)], [own.pk])
+
+    def test_course_choices_are_limited_to_the_institute(self):
+        own, other = self.institutes
+        field = admin.site._registry[Batch].formfield_for_foreignkey(Batch._meta.get_field('course'), self.request(own))
+
+        self.assertEqual([course.offered_by_id for course in field.queryset], [own.pk])
+
+    def test_other_institutes_applications_cannot_be_approved(self):
+        own, other = self.institutes
+        model_admin = ApplicationAdmin(Application, admin.site)
+        application = Application.objects.get(course__offered_by=other)
+
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.approve_view(self.request(own), application.id)
+
+        application.refresh_from_db()
+        self.assertEqual(application.status, Application.Status.UNDER_REVIEW)
+
+
+class ChunkedUploadTest(TestCase):
+    PDF = b'%PDF-1.7\n' + os.urandom(2500)
+
+    @classmethod
+    def setUpTestData(cls):
+        institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        course = Course.objects.create(
+            offered_by=institute, name='Course', slug='course', fee_amount=1000,
+            min_education_level=EducationLevel.objects.create(name='Graduate'),
+        )
+        batch = Batch.objects.create(course=course, location=Location.objects.create(name='Pune'), commencement_date=date(2026, 1, 1))
+        cls.document = RequiredDocument.objects.create(file_name='Marksheet', file_type=RequiredDocument.FileTypes.DOC, course=course)
+        cls.student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+        cls.application = Application.objects.create(
+            full_name='Student', phone_number='+919876543210', email='student@example.com',
+            date_of_birth=date(2000, 1, 1), applied_by=cls.student, course=course, batch_selected=batch,
+        )
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        paths = override_settings(MEDIA_ROOT=os.path.join(root, 'media'), UPLOAD_PARTIAL_ROOT=os.path.join(root, 'media', '.uploads'))
+        paths.enable()
+        self.addCleanup(paths.disable)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccountRefreshToken.for_user(self.student).access_token}")
+
+    def open(self, size, filename='marksheet.pdf'):
+        return self.client.post(
+            f"/api/applications/{self.application.id}/upload-docs/{self.document.id}/uploads/",
+            {'size': size, 'filename': filename}, format='json',
+        )
+
+    def send(self, session_id, offset, chunk, checksum=None):
+        headers = {'Upload-Offset': str(offset)}
+        if checksum is not False:
+            digest = checksum or hashlib.sha256(chunk).digest()
+            headers['Upload-Checksum'] = f"sha256 {base64.b64encode(digest).decode()}"
+        return self.client.generic(
+            'PATCH', f"/api/applications/uploads/{session_id}/", chunk,
+            content_type='application/offset+octet-stream', headers=headers,
+        )
+
+    def test_chunks_are_assembled_into_the_document(self):
+        session = self.open(len(self.PDF)).json()
+        self.assertEqual(session['offset'], 0)
+
+        response = self.send(session['id'], 0, self.PDF[:1000])
+        self.assertEqual((response.status_code, response.json()['offset']), (200, 1000))
+        self.assertEqual(self.client.get(f"/api/applications/uploads/{session['id']}/").json()['offset'], 1000)
+
+        self.send(session['id'], 1000, self.PDF[1000:2000], checksum=False)
+        part = os.stat(DocumentUploadSession(id=session['id']).partial_path).st_ino
+        response = self.send(session['id'], 2000, self.PDF[2000:])
+
+        self.assertEqual(response.status_code, 201)
+        document = DocumentUpload.objects.get(application=self.application)
+        self.assertTrue(document.file.name.endswith('.pdf'))
+        with document.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.PDF)
+        # renamed into place, not copied
+        self.assertEqual(os.stat(document.file.path).st_ino, part)
+        self.assertFalse(DocumentUploadSession.objects.exists())
+        self.assertFalse(os.path.exists(DocumentUploadSession(id=session['id']).partial_path))
+
+    def test_rejected_chunks_leave_the_offset_unchanged(self):
+        session_id = self.open(len(self.PDF)).json()['id']
+        self.send(session_id, 0, self.PDF[:1000])
+
+        self.assertEqual(self.send(session_id, 500, self.PDF[500:1500]).status_code, 409)
+        self.assertEqual(self.send(session_id, 1000, self.PDF[1000:2000], checksum=b'x' * 32).status_code, 400)
+        self.assertEqual(self.send(session_id, 1000, self.PDF[1000:] + b'extra').status_code, 413)
+
+        session = DocumentUploadSession.objects.get(id=session_id)
+        self.assertEqual(session.offset, 1000)
+        self.assertEqual(os.path.getsize(session.partial_path), 1000)
+        self.assertEqual(self.send(session_id, 1000, self.PDF[1000:]).status_code, 201)
+
+    def test_file_type_is_sniffed_across_short_reads(self):
+        class Trickle(io.BytesIO):
+            def read(self, size=-1):
+                return super().read(min(size, 3))
+
+        png = b'\x89PNG\r\n\x1a\n' + b'0' * 100
+        part = io.BytesIO()
+        self.assertEqual(receive(part, Trickle(png), len(png), None, first=True), 'image/png')
+        self.assertEqual(part.getvalue(), png)
+
+        # a first chunk shorter than the PNG magic is sniffed as a whole
+        pdf = self.PDF[:6]
+        self.assertEqual(receive(io.BytesIO(), Trickle(pdf), len(pdf), None, first=True), 'application/pdf')
+
+    def test_files_are_checked_by_content_and_size(self):
+        session_id = self.open(len(self.PDF)).json()['id']
+        response = self.send(session_id, 0, b'MZ' + self.PDF[2:1000])
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(DocumentUploadSession.objects.get(id=session_id).offset, 0)
+
+        self.assertEqual(self.open(constants.DOCUMENT_MAX_SIZE + 1).status_code, 400)
+
+        disguised = SimpleUploadedFile('marksheet.pdf', b'MZ not a pdf', content_type='application/pdf')
+        response = self.client.post(f"/api/applications/{self.application.id}/upload-docs/{self.document.id}/", {'file': disguised})
+        self.assertEqual(response.status_code, 400)
+
+    def test_uploading_again_replaces_the_document(self):
+        url = f"/api/applications/{self.application.id}/upload-docs/{self.document.id}/"
+        first = self.client.post(url, {'file': SimpleUploadedFile('first.pdf', self.PDF)})
+        old_file = DocumentUpload.objects.get().file
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.client.post(url, {'file': SimpleUploadedFile('second.png', b'\x89PNG\r\n\x1a\n' + b'0' * 100)})
+
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        document = DocumentUpload.objects.get()
+        self.assertEqual(document.id, first.json()['id'])
+        self.assertTrue(document.file.name.endswith('.png'))
+        # the first file's blob is no longer referenced and is left to collect_blobs
+        self.assertEqual(Blob.objects.get(name=old_file.name).refcount, 0)
+
+
+class ApplicationCounterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        cls.course = Course.objects.create(
+            offered_by=cls.institute, name='Course', slug='course', fee_amount=1000,
+            min_education_level=EducationLevel.objects.create(name='Graduate'),
+        )
+        location = Location.objects.create(name='Pune')
+        cls.batches = [
+            Batch.objects.create(course=cls.course, location=location, commencement_date=date(2026, month, 1)) for month in (1, 6)
+        ]
+        cls.student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+
+    def application(self, batch=0, **fields):
+        return Application(
+            full_name='Student', phone_number='+919876543210', email='student@example.com', date_of_birth=date(2000, 1, 1),
+            applied_by=self.student, course=self.course, batch_selected=self.batches[batch], **fields,
+        )
+
+    def counters(self) -> dict:
+        return {
+            (batch_id, status): count
+            for batch_id, status, count in ApplicationCounter.objects.exclude(count=0).values_list('batch_id', 'status', 'count')
+        }
+
+    def assertCountersMatch(self, expected):
+        self.assertEqual(self.counters(), expected)
+        live = Application.objects.counter_keys()
+        self.assertEqual(self.counters(), {(batch_id, status): count for (_, batch_id, status), count in live.items()})
+
+    def test_save_and_delete(self):
+        first, second = self.batches[0].id, self.batches[1].id
+        application = self.application()
+        application.save()
+        self.application(batch=1).save()
+        self.assertCountersMatch({(first, 'UNDER_REVIEW'): 1, (second, 'UNDER_REVIEW'): 1})
+
+        application = Application.objects.get(id=application.id)
+        application.status = Application.Status.ACCEPTED
+        application.save()
+        application.batch_selected = self.batches[1]
+        application.save()
+        self.assertCountersMatch({(second, 'UNDER_REVIEW'): 1, (second, 'ACCEPTED'): 1})
+
+        # saving other fields does not touch the counters
+        application.full_name = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            application.save(update_fields=['full_name'])
+        self.assertEqual(len(queries), 1)
+
+        application.delete()
+        self.assertCountersMatch({(second, 'UNDER_REVIEW'): 1})
+
+    def test_full_save_keeps_a_concurrent_status_change(self):
+        application = self.application()
+        application.save()
+        stale = Application.objects.get(id=application.id)
+
+        # approved from the admin while `stale` is held elsewhere
+        start_campaign(Application.objects.filter(id=application.id), Application.Status.ACCEPTED)
+        stale.full_name = 'Renamed'
+        stale.save()
+
+        application.refresh_from_db()
+        self.assertEqual((application.full_name, application.status), ('Renamed', Application.Status.ACCEPTED))
+        self.assertCountersMatch({(self.batches[0].id, 'ACCEPTED'): 1})
+
+    def test_bulk_paths(self):
+        first, second = self.batches[0].id, self.batches[1].id
+        Application.objects.bulk_create([self.application() for _ in range(4)] + [self.application(batch=1)])
+        self.assertCountersMatch({(first, 'UNDER_REVIEW'): 4, (second, 'UNDER_REVIEW'): 1})
+
+        # the filter stops matching once the status changes
+        ids = list(Application.objects.filter(batch_selected_id=first).values_list('id', flat=True)[:2])
+        self.assertEqual(Application.objects.filter(id__in=ids, status=Application.Status.UNDER_REVIEW).update(status=Application.Status.REJECTED), 2)
+        self.assertCountersMatch({(first, 'UNDER_REVIEW'): 2, (first, 'REJECTED'): 2, (second, 'UNDER_REVIEW'): 1})
+
+        start_campaign(Application.objects.all(), Application.Status.ACCEPTED)
+        self.assertCountersMatch({(first, 'ACCEPTED'): 4, (second, 'ACCEPTED'): 1})
+
+        applications = list(Application.objects.filter(batch_selected_id=first)[:3])
+        for application in applications:
+            application.batch_selected = self.batches[1]
+        Application.objects.bulk_update(applications, ['batch_selected'])
+        self.assertCountersMatch({(first, 'ACCEPTED'): 1, (second, 'ACCEPTED'): 4})
+
+        Application.objects.filter(batch_selected_id=second).delete()
+        self.assertCountersMatch({(first, 'ACCEPTED'): 1})
+
+    def test_rebuild_fixes_drift(self):
+        Application.objects.bulk_create([self.application(), self.application(batch=1)])
+        ApplicationCounter.objects.filter(batch=self.batches[0]).update(count=7)
+        ApplicationCounter.objects.filter(batch=self.batches[1]).delete()
+
+        output = io.StringIO()
+        call_command('rebuild_application_counters', stdout=output)
+
+        self.assertIn('2 were wrong', output.getvalue())
+        self.assertCountersMatch({(self.batches[0].id, 'UNDER_REVIEW'): 1, (self.batches[1].id, 'UNDER_REVIEW'): 1})
+
+    def test_counts_endpoint(self):
+        Application.objects.bulk_create([self.application(), self.application(status=Application.Status.ACCEPTED), self.application(batch=1)])
+        other = InstituteAdmin.objects.create(email='other@example.com', name='Other')
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccountRefreshToken.for_user(self.institute).access_token}")
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f"/api/applications/course/{self.course.id}/counts/")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['total'], data['statuses']['UNDER_REVIEW'], data['statuses']['ACCEPTED'], data['statuses']['REJECTED']), (3, 2, 1, 0))
+        self.assertEqual([(batch['batch'], batch['total']) for batch in data['batches']], [(self.batches[0].id, 2), (self.batches[1].id, 1)])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccountRefreshToken.for_user(other).access_token}")
+        self.assertEqual(client.get(f"/api/applications/course/{self.course.id}/counts/").status_code, 404)
@@ -0,0 +1,175 @@
+"""
+Chunked, resumable uploads of required documents.
+
+A client opens a `DocumentUploadSession` with the size of the file, then sends
+it in order as `PATCH` bodies of at most `UPLOAD_CHUNK_MAX_SIZE` bytes, each
+carrying the offset it starts at (`Upload-Offset`) and optionally its sha256
+(`Upload-Checksum: sha256 <base64 digest>`). Chunks are streamed straight into a
+part file under `UPLOAD_PARTIAL_ROOT`; a chunk that does not match its checksum,
+overruns the declared size or arrives truncated is cut back off, so the session
+offset is always the length of good data on disk and an interrupted upload
+resumes from `GET`'s offset. The first chunk's magic bytes decide whether the
+file is accepted at all. Once the last byte arrives the part file is moved
+into storage as the application's `DocumentUpload`; it is only renamed, not
+copied, because `UPLOAD_PARTIAL_ROOT` lies on the media filesystem.
+`purge_upload_sessions` deletes sessions that were never finished.
+"""
+import base64
+import hashlib
+import os
+from django.core.files import File
+from django.db import DatabaseError, transaction
+from rest_framework import status
+from .models import DocumentUpload, DocumentUploadSession
+import constants
+
+# leading bytes of each accepted file type, and the extension it is stored with
+MAGIC = [
+    (b'%PDF-', 'application/pdf', '.pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png', '.png'),
+]
+MAGIC_LENGTH = max(len(magic) for magic, _, _ in MAGIC)
+EXTENSIONS = {content_type: extension for _, content_type, extension in MAGIC}
+# bytes read from the request per write
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status_code: int = status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def sniff(head: bytes) -> str | None:
+    """ Content type of a file starting with `head`, if it is one we accept """
+    for magic, content_type, _ in MAGIC:
+        if head.startswith(magic):
+            return content_type
+    return None
+
+
+def parse_checksum(header: str | None) -> bytes | None:
+    if not header:
+        return None
+    algorithm, _, digest = header.partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError("Only sha256 checksums are supported")
+    try:
+        return base64.b64decode(digest, validate=True)
+    except ValueError:
+        raise UploadError("Malformed Upload-Checksum header")
+
+
+def parse_length(value, name: str) -> int:
+    try:
+        length = int(value)
+    except (TypeError, ValueError):
+        raise UploadError(f"Malformed {name} header")
+    if length < 0:
+        raise UploadError(f"Malformed {name} header")
+    return length
+
+
+class PartialFile(File):
+    """ The assembled part file; `temporary_file_path` lets storage move it into place instead of copying """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def open_session(application, document_details, size: int, filename: str = '') -> DocumentUploadSession:
+    if size <= 0:
+        raise UploadError("Size must be a positive number of bytes")
+    if size > constants.DOCUMENT_MAX_SIZE:
+        raise UploadError(
+            f"File size must be less than {constants.DOCUMENT_MAX_SIZE // (1024 * 1024)}MB.",
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+    return DocumentUploadSession.objects.create(
+        application=application, document_details=document_details, size=size, filename=os.path.basename(filename)[:255],
+    )
+
+
+def receive(part, stream, length: int, checksum: bytes | None, first: bool) -> str | None:
+    """ Append `length` bytes of `stream` to `part`, returning the sniffed content type of a first chunk """
+    digest = hashlib.sha256()
+    content_type = None
+    # the start of the file, held back until there is enough of it to sniff
+    head = b''
+    remaining = length
+    while remaining:
+        block = stream.read(min(BLOCK_SIZE, remaining))
+        if not block:
+            raise UploadError("Chunk ended before Content-Length bytes were received")
+        remaining -= len(block)
+        if first and content_type is None:
+            head += block
+            if len(head) < MAGIC_LENGTH and remaining:
+                continue
+            content_type = sniff(head[:MAGIC_LENGTH])
+            if not content_type:
+                raise UploadError("Only PDF, JPEG, and PNG files are allowed.", status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+            block = head
+        digest.update(block)
+        part.write(block)
+
+    if checksum is not None and digest.digest() != checksum:
+        raise UploadError("Chunk does not match its Upload-Checksum")
+    return content_type
+
+
+def write_chunk(session_id, stream, headers) -> tuple[DocumentUploadSession, DocumentUpload | None]:
+    """
+    Write one chunk of an upload from `stream`, finishing the upload if it was the last.
+
+    Returns the session and, once complete, the stored `DocumentUpload`.
+    Raises `UploadError` without moving the offset if the chunk is rejected.
+    """
+    offset = parse_length(headers.get('Upload-Offset'), 'Upload-Offset')
+    if headers.get('Content-Length') in (None, ''):
+        raise UploadError("Content-Length is required", status.HTTP_411_LENGTH_REQUIRED)
+    length = parse_length(headers.get('Content-Length'), 'Content-Length')
+    checksum = parse_checksum(headers.get('Upload-Checksum'))
+    if length > constants.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError(
+            f"Chunks must be at most {constants.UPLOAD_CHUNK_MAX_SIZE} bytes", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+
+    with transaction.atomic():
+        try:
+            # one writer per session; a concurrent chunk gets a conflict instead of interleaving
+            session = DocumentUploadSession.objects.select_for_update(nowait=True).get(id=session_id)
+        except DatabaseError:
+            raise UploadError("Another chunk of this upload is being written", status.HTTP_409_CONFLICT)
+        if offset != session.offset:
+            raise UploadError(f"Upload-Offset must be {session.offset}", status.HTTP_409_CONFLICT)
+        if session.offset + length > session.size:
+            raise UploadError("Chunk runs past the declared size", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        os.makedirs(os.path.dirname(session.partial_path), exist_ok=True)
+        with open(session.partial_path, 'r+b' if session.offset else 'wb') as part:
+            part.seek(session.offset)
+            try:
+                content_type = receive(part, stream, length, checksum, first=session.offset == 0)
+            except UploadError:
+                part.truncate(session.offset)
+                raise
+
+        session.offset += length
+        if content_type:
+            session.content_type = content_type
+        if session.offset < session.size:
+            session.save(update_fields=['offset', 'content_type'])
+            return session, None
+        return session, finish(session)
+
+
+def finish(session: DocumentUploadSession) -> DocumentUpload:
+    """ Move the assembled file into storage as the application's copy of the document """
+    name = (os.path.splitext(session.filename)[0] or 'document') + EXTENSIONS[session.content_type]
+    with open(session.partial_path, 'rb') as part:
+        document = DocumentUpload.replace(session.application, session.document_details, PartialFile(part, name=name))
+    session.discard()
+    return document
@@ -5,6 +5,10 @@ urlpatterns = format_suffix_patterns([
     path('', ApplicationsListView.as_view(), name='applications-list'),
     path('<int:id>/', ApplicationView.as_view(), name='application'),
     path('<int:id>/upload-docs/<int:doc_id>/', ApplicationUploadDocView.as_view(), name='upload-related-docs'),
+    path('<int:id>/upload-docs/<int:doc_id>/uploads/', ApplicationUploadSessionsView.as_view(), name='upload-sessions'),
+    path('uploads/<uuid:session_id>/', ApplicationUploadSessionView.as_view(), name='upload-session'),
     path('course/<int:id>/', ApplicationByCourseView.as_view(), name='application-by-course'),
+    path('course/<int:id>/export/', ApplicationExportView.as_view(), name='application-export'),
+    path('course/<int:id>/counts/', ApplicationCountsView.as_view(), name='application-counts'),
     path('course/<str:slug>/', ApplicationByCourseSlugView.as_view(), name='application-by-course-slug'),
 ])
@@ -1,11 +1,14 @@
 from django.shortcuts import render
 from rest_framework.views import APIView
-from user.authentication import IsStudent
-from .serializers import ApplicationSerializer, ApplicationDetailSerializer, ApplicationRequestSerializer, ApplicationReqDocsSerializer, ApplicationDocumentsSerializer 
+from user.authentication import IsInstituteAdmin, IsStudent
+from .serializers import ApplicationSerializer, ApplicationDetailSerializer, ApplicationRequestSerializer, ApplicationReqDocsSerializer, ApplicationDocumentsSerializer, UploadSessionRequestSerializer, UploadSessionSerializer
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Application, DocumentUpload
-from course.models import RequiredDocument
+from django.utils import timezone
+from .models import Application, ApplicationCounter, DocumentUpload, DocumentUploadSession
+from course.models import Course, RequiredDocument
+from .export import FORMATS, export_response
+from .uploads import UploadError, open_session, write_chunk
 class ApplicationsListView(APIView):
     """
     API endpoint to list and create student applications.
@@ -30,7 +33,7 @@ class ApplicationsListView(APIView):
             - **200 OK**: List of serialized applications.
         """
         student = request.user
-        applications = student.applications.all()
+        applications = student.applications.select_related('course__offered_by', 'course__duration', 'batch_selected')
         serializer = self.response_serializer(applications, many=True)        
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -201,15 +204,158 @@ class ApplicationUploadDocView(APIView):
             return Response({ 'message': 'Document details not found'}, status=status.HTTP_404_NOT_FOUND)
         
         
-        document, _ = DocumentUpload.objects.update_or_create(
-            document_details=required_doc_details,
-            file=serializer.validated_data['file'],
-            application=application
-        )
+        # one upload per required document; uploading again replaces it
+        document = DocumentUpload.replace(application, required_doc_details, serializer.validated_data['file'])
         
         response_data = self.response_serializer(document).data 
         return Response(response_data, status=status.HTTP_200_OK)
 
+class ApplicationUploadSessionsView(APIView):
+    """
+    API endpoint for starting a chunked, resumable upload of a required document.
+
+    - **POST**: Open an upload session; the file is then sent with `ApplicationUploadSessionView`.
+
+    Serializers:
+        - `request_serializer`: UploadSessionRequestSerializer (For the size and name of the file)
+        - `response_serializer`: UploadSessionSerializer (For returning the session)
+    """
+    permission_classes = [IsStudent]
+    request_serializer = UploadSessionRequestSerializer
+    response_serializer = UploadSessionSerializer
+
+    def post(self, request, id, doc_id):
+        """
+        Open an upload session for a document of a student's application.
+
+        Path Parameters:
+            - `id` (int): ID of the application.
+            - `doc_id` (int): ID of the required document type.
+
+        Request Body (UploadSessionRequestSerializer):
+            - size (int): Size of the whole file in bytes, at most 5MB.
+            - filename (str, optional): Original name of the file.
+
+        Returns:
+            - **201 Created**: The session, with `offset` 0.
+            - **400 Bad Request**: Validation errors.
+            - **404 Not Found**: If the application or required document is not found.
+
+        Example Usage:
+            POST /api/applications/4/upload-docs/2/uploads/
+            { "size": 3145728, "filename": "marksheet.pdf" }
+        """
+        serializer = self.request_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            application = request.user.applications.get(id=id)
+        except Application.DoesNotExist:
+            return Response({ 'message': 'Application not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        required_doc_details = RequiredDocument.objects.filter(id=doc_id, course_id=application.course_id).first()
+        if required_doc_details is None:
+            return Response({ 'message': 'Document details not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            session = open_session(application, required_doc_details, **serializer.validated_data)
+        except UploadError as error:
+            return Response({ 'message': error.message }, status=error.status_code)
+        return Response(self.response_serializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class ApplicationUploadSessionView(APIView):
+    """
+    API endpoint for sending the chunks of a resumable document upload.
+
+    - **GET**: Current offset, to resume an interrupted upload from.
+    - **PATCH**: Append one chunk; the last chunk stores the document.
+    - **DELETE**: Abandon the upload.
+
+    Chunks are raw request bodies (`Content-Type: application/offset+octet-stream`) with headers:
+        - `Upload-Offset`: Offset of the chunk in the file; must equal the session's offset.
+        - `Upload-Checksum` (optional): `sha256 <base64 digest of the chunk>`.
+    """
+    permission_classes = [IsStudent]
+    response_serializer = UploadSessionSerializer
+    document_serializer = ApplicationDocumentsSerializer
+
+    def get_session(self, request, session_id):
+        return DocumentUploadSession.objects.filter(
+            id=session_id, application__applied_by=request.user, expires_at__gt=timezone.now(),
+        ).first()
+
+    def get(self, request, session_id):
+        """
+        Get the progress of an upload.
+
+        Path Parameters:
+            - `session_id` (uuid): ID of the upload session.
+
+        Returns:
+            - **200 OK**: The session; its `offset` is where the next chunk starts.
+            - **404 Not Found**: If the session does not exist, has expired or is finished.
+        """
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({ 'message': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.response_serializer(session).data, status=status.HTTP_200_OK)
+
+    def patch(self, request, session_id):
+        """
+        Append a chunk to an upload.
+
+        Path Parameters:
+            - `session_id` (uuid): ID of the upload session.
+
+        Returns:
+            - **200 OK**: Chunk stored; the session with its new offset.
+            - **201 Created**: Last chunk stored; the uploaded document (ApplicationDocumentsSerializer).
+            - **400 Bad Request**: Checksum mismatch or malformed headers; the offset is unchanged.
+            - **404 Not Found**: If the session does not exist, has expired or is finished.
+            - **409 Conflict**: `Upload-Offset` is not the session's offset, or another chunk is being written.
+            - **411 Length Required**: No `Content-Length`.
+            - **413 Request Entity Too Large**: Chunk larger than 1MB or past the declared size.
+            - **415 Unsupported Media Type**: The file is not a PDF, JPEG or PNG.
+
+        Example Usage:
+            PATCH /api/applications/uploads/5f0c.../
+            Upload-Offset: 1048576
+            Upload-Checksum: sha256 47DEQpj8HBSa+/TImW+5JCeuQeRkm5NMpJWZG3hSuFU=
+        """
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({ 'message': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            session, document = write_chunk(session.id, request.stream, request.headers)
+        except UploadError as error:
+            return Response({ 'message': error.message }, status=error.status_code)
+        except DocumentUploadSession.DoesNotExist:
+            return Response({ 'message': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if document is None:
+            return Response(self.response_serializer(session).data, status=status.HTTP_200_OK)
+        return Response(self.document_serializer(document).data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, session_id):
+        """
+        Abandon an upload and delete what was received.
+
+        Path Parameters:
+            - `session_id` (uuid): ID of the upload session.
+
+        Returns:
+            - **204 No Content**: Upload abandoned.
+            - **404 Not Found**: If the session does not exist or is finished.
+        """
+        session = self.get_session(request, session_id)
+        if session is None:
+            return Response({ 'message': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        session.discard()
+        return Response({ 'message': "Upload cancelled"}, status=status.HTTP_204_NO_CONTENT)
+
+
 class ApplicationByCourseView(APIView):
     """
     API endpoint for managing applications based on course ID.
@@ -376,3 +522,97 @@ class ApplicationByCourseSlugView(APIView):
 
         application.delete()
         return Response({'message': 'Application deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
+
+
+class ApplicationExportView(APIView):
+    """
+    API endpoint for institute admins to download every application to one of their courses.
+
+    - **GET**: Stream the applications as CSV (default) or XLSX, one row per application
+      with a column per application form field.
+
+    Permissions:
+        - Only institute admins (for their own courses) and superusers.
+    """
+    permission_classes = [IsInstituteAdmin]
+
+    def get(self, request, id):
+        """
+        Stream the applications of a course.
+
+        Path Parameters:
+            - `id` (int): ID of the course.
+
+        Query Parameters:
+            - `file_format` (str): `csv` or `xlsx`. Defaults to `csv`.
+
+        Returns:
+            - **200 OK**: The export as an attachment, streamed as it is generated.
+            - **400 Bad Request**: If the file format is not supported.
+            - **404 Not Found**: If the course does not exist or belongs to another institute.
+
+        Example Usage:
+            GET /api/applications/course/12/export/?file_format=xlsx
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FORMATS:
+            return Response({'message': f"Unsupported file format, use one of: {', '.join(FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        courses = Course.objects.all() if request.user.is_superuser else Course.objects.filter(offered_by_id=request.user.pk)
+        course = courses.filter(id=id).values('slug').first()
+        if course is None:
+            return Response({'message': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return export_response(Application.objects.filter(course_id=id), file_format, f"applications-{course['slug']}")
+
+
+class ApplicationCountsView(APIView):
+    """
+    API endpoint for the number of applications to a course, by status and by batch.
+
+    - **GET**: Counts read from the maintained `ApplicationCounter` rows.
+
+    Permissions:
+        - Only institute admins (for their own courses) and superusers.
+    """
+    permission_classes = [IsInstituteAdmin]
+
+    def get(self, request, id):
+        """
+        Get the application counts of a course.
+
+        Path Parameters:
+            - `id` (int): ID of the course.
+
+        Returns:
+            - **200 OK**: `total` and `statuses` for the course, and the same per batch.
+            - **404 Not Found**: If the course does not exist or belongs to another institute.
+
+        Example Usage:
+            GET /api/applications/course/12/counts/
+            {
+                "course": 12,
+                "total": 41,
+                "statuses": { "UNDER_REVIEW": 30, "REVIEWED": 0, "REJECTED": 3, "REQUEST_PAYMENT": 0, "ACCEPTED": 8 },
+                "batches": [{ "batch": 7, "total": 41, "statuses": { ... } }]
+            }
+        """
+        courses = Course.objects.all() if request.user.is_superuser else Course.objects.filter(offered_by_id=request.user.pk)
+        if not courses.filter(id=id).exists():
+            return Response({'message': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        def empty():
+            return {'total': 0, 'statuses': dict.fromkeys(Application.Status.values, 0)}
+
+        course = empty()
+        batches = {}
+        for batch_id, application_status, count in ApplicationCounter.objects.filter(course_id=id).values_list('batch_id', 'status', 'count'):
+            for counts in (course, batches.setdefault(batch_id, empty())):
+                counts['total'] += count
+                counts['statuses'][application_status] = counts['statuses'].get(application_status, 0) + count
+
+        return Response({
+            'course': id,
+            **course,
+            'batches': [{'batch': batch_id, **counts} for batch_id, counts in sorted(batches.items())],
+        }, status=status.HTTP_200_OK)
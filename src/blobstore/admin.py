@@ -0,0 +1,21 @@
+from django.contrib import admin
+from .models import Blob
+
+
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'created_at', 'updated_at')
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size', 'refcount', 'created_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    # blobs are removed by collect_blobs once nothing refers to them
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+
+admin.site.register(Blob, BlobAdmin)
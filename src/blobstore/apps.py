@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class BlobstoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'blobstore'
+
+    def ready(self):
+        from . import signals
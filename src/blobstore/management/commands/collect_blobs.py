@@ -0,0 +1,81 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from blobstore.models import Blob
+from blobstore.storage import blob_fields, blob_storage
+import constants
+
+
+class Command(BaseCommand):
+    help = "Recount blob references, then delete blobs and stray blob files nothing refers to"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted without deleting it")
+        parser.add_argument(
+            '--grace', type=float, default=constants.BLOB_GC_GRACE.total_seconds() / 3600,
+            help="Hours an unreferenced blob is kept for",
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(hours=options['grace'])
+
+        references = self.count_references()
+        self.stdout.write(f"Corrected {self.recount(references)} reference counts")
+        self.stdout.write(f"Deleted {self.collect(cutoff)} unreferenced blobs")
+        self.stdout.write(f"Deleted {self.sweep(cutoff)} stray files")
+
+    def count_references(self) -> Counter:
+        references = Counter()
+        for model, field in blob_fields():
+            names = model.objects.exclude(**{f"{field}__isnull": True}).exclude(**{field: ''}).values_list(field, flat=True)
+            references.update(name for name in names.iterator() if blob_storage.is_blob(name))
+        return references
+
+    def recount(self, references: Counter) -> int:
+        corrected = 0
+        for sha256, name, refcount, updated_at in Blob.objects.values_list('sha256', 'name', 'refcount', 'updated_at').iterator():
+            if references[name] != refcount:
+                # skipped if a save or delete touched the blob since it was read; the next run corrects it
+                corrected += Blob.objects.filter(sha256=sha256, updated_at=updated_at).update(refcount=references[name])
+        return corrected
+
+    def referenced(self, name: str) -> bool:
+        return any(model.objects.filter(**{field: name}).exists() for model, field in blob_fields())
+
+    def collect(self, cutoff) -> int:
+        deleted = 0
+        candidates = Blob.objects.filter(refcount=0, updated_at__lt=cutoff).values_list('sha256', flat=True)
+        for sha256 in list(candidates):
+            with transaction.atomic():
+                # a concurrent save of the same content takes this lock before adding its reference
+                blob = Blob.objects.select_for_update().filter(sha256=sha256, refcount=0, updated_at__lt=cutoff).first()
+                if blob is None or self.referenced(blob.name):
+                    continue
+                self.stdout.write(f"{'Would delete' if self.dry_run else 'Deleting'} {blob.name} ({blob.size} bytes)")
+                if not self.dry_run:
+                    if blob_storage.exists(blob.name):
+                        os.remove(blob_storage.path(blob.name))
+                    blob.delete()
+                deleted += 1
+        return deleted
+
+    def sweep(self, cutoff) -> int:
+        """ Delete old files under the blob directory without a Blob row (rolled back saves, interrupted uploads) """
+        root = blob_storage.path(constants.BLOB_UPLOAD_PATH)
+        deleted = 0
+        for directory, _, files in os.walk(root):
+            for file in files:
+                path = os.path.join(directory, file)
+                name = os.path.relpath(path, blob_storage.location).replace(os.sep, '/')
+                modified = datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc)
+                if modified >= cutoff or Blob.objects.filter(name=name).exists():
+                    continue
+                self.stdout.write(f"{'Would delete' if self.dry_run else 'Deleting'} stray file {name}")
+                if not self.dry_run:
+                    os.remove(path)
+                deleted += 1
+        return deleted
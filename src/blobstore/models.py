@@ -0,0 +1,25 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Blob(models.Model):
+    """ One stored file of `ContentAddressedStorage`, shared by every field holding the same bytes """
+    class Meta:
+        verbose_name_plural = 'Blobs'
+        indexes = [
+            # garbage collection looks for unreferenced blobs by age
+            models.Index(fields=['refcount', 'updated_at'], name='blob_unreferenced_idx'),
+        ]
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    # storage name of the file, e.g. docs/blobs/3f/3f2a...e1.pdf
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    # number of file field values pointing at `name`
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    # last time the refcount changed
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Blob: {self.name} ({self.refcount} references)"
@@ -0,0 +1,26 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete
+from .storage import blob_fields, blob_storage
+
+
+def release_files(sender, instance, fields=(), **kwargs):
+    """ Drop the blob references of a deleted row once the delete commits """
+    for field in fields:
+        name = getattr(instance, field).name
+        if name:
+            transaction.on_commit(partial(blob_storage.delete, name))
+
+
+def connect():
+    models = {}
+    for model, field in blob_fields():
+        models.setdefault(model, []).append(field)
+    for model, fields in models.items():
+        post_delete.connect(
+            partial(release_files, fields=tuple(fields)), sender=model, weak=False,
+            dispatch_uid=f"release_blobs_{model._meta.label_lower}",
+        )
+
+
+connect()
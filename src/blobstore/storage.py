@@ -0,0 +1,118 @@
+"""
+Content-addressed file storage.
+
+`ContentAddressedStorage` keeps each distinct file once, as a `Blob` named
+after the SHA-256 of its bytes (`docs/blobs/3f/3f2a...e1.pdf`). Saving hashes the
+upload while copying it into a temporary file next to the blobs (or, for
+uploads Django already spooled to disk, while reading that file, which is then
+moved rather than copied) and either renames it into place or, when the blob
+exists already, drops it and returns the existing name. Every save adds a
+reference to the blob and every `delete` removes one; the file itself is only
+removed by the `collect_blobs` command once no field refers to it.
+
+Reference counts are updated in the caller's transaction, so a save that is
+rolled back does not leave a reference behind. Files stored before this
+backend (plain names under `docs/`) are still read and deleted as before.
+"""
+import hashlib
+import os
+import tempfile
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Blob
+import constants
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def is_blob(self, name: str) -> bool:
+        return name.startswith(constants.BLOB_UPLOAD_PATH)
+
+    def blob_name(self, digest: str, name: str) -> str:
+        extension = os.path.splitext(name)[1].lower()
+        return f"{constants.BLOB_UPLOAD_PATH}{digest[:2]}/{digest}{extension}"
+
+    def get_available_name(self, name, max_length=None):
+        # the stored name comes from the content, see _save
+        return name
+
+    def incoming(self, content):
+        """ Hash `content` into a temporary file beside the blobs, returning (path, sha256, size) """
+        directory = self.path(constants.BLOB_UPLOAD_PATH + '.incoming')
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+
+        if hasattr(content, 'temporary_file_path'):
+            # already on disk: hash it in place and move it instead of writing a copy
+            with open(content.temporary_file_path(), 'rb') as file:
+                while block := file.read(constants.BLOB_HASH_BLOCK_SIZE):
+                    digest.update(block)
+            descriptor, path = tempfile.mkstemp(dir=directory)
+            os.close(descriptor)
+            file_move_safe(content.temporary_file_path(), path, allow_overwrite=True)
+            return path, digest.hexdigest(), os.path.getsize(path)
+
+        size = 0
+        descriptor, path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                if hasattr(content, 'seek') and content.seekable():
+                    content.seek(0)
+                for chunk in content.chunks(constants.BLOB_HASH_BLOCK_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, digest.hexdigest(), size
+
+    def _save(self, name, content):
+        path, digest, size = self.incoming(content)
+        try:
+            with transaction.atomic():
+                blob, created = Blob.objects.select_for_update().get_or_create(
+                    sha256=digest, defaults={'name': self.blob_name(digest, name), 'size': size, 'refcount': 1},
+                )
+                if not created:
+                    Blob.objects.filter(sha256=digest).update(refcount=F('refcount') + 1, updated_at=timezone.now())
+                target = self.path(blob.name)
+                if created or not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(path, self.file_permissions_mode)
+                    os.replace(path, target)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+        return blob.name
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        if not self.is_blob(name):
+            return super().delete(name)
+        Blob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1, updated_at=timezone.now())
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def document_storage():
+    """ Storage of uploaded documents; a callable so migrations reference it instead of serialising it """
+    return blob_storage
+
+
+def blob_fields() -> list:
+    """ (model, field name) of every file field stored in `blob_storage` """
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and field.storage is blob_storage
+    ]
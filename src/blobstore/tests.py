@@ -0,0 +1,122 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from application.models import Application, DocumentUpload
+from course.models import Batch, Course, RequiredDocument
+from instituteadmin.models import InstituteAdmin
+from preference.models import EducationLevel, Location
+from student.models import Student
+from .models import Blob
+from .storage import blob_storage
+import constants
+
+
+class BlobStorageTest(TestCase):
+    SCAN = b'%PDF-1.7\n' + b'aadhaar' * 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        location = Location.objects.create(name='Pune')
+        cls.applications, cls.documents = [], []
+        student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+        for index in range(2):
+            course = Course.objects.create(
+                offered_by=institute, name=f"Course {index}", slug=f"course-{index}", fee_amount=1000,
+                min_education_level=EducationLevel.objects.get_or_create(name='Graduate')[0],
+            )
+            batch = Batch.objects.create(course=course, location=location, commencement_date=date(2026, 1, 1))
+            cls.documents.append(RequiredDocument.objects.create(file_name='Aadhaar', course=course))
+            cls.applications.append(Application.objects.create(
+                full_name='Student', phone_number='+919876543210', email='student@example.com',
+                date_of_birth=date(2000, 1, 1), applied_by=student, course=course, batch_selected=batch,
+            ))
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        media = override_settings(MEDIA_ROOT=root, RECOMMENDATION_INDEX_PATH='')
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, index, content, name='aadhaar.pdf'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return DocumentUpload.replace(self.applications[index], self.documents[index], SimpleUploadedFile(name, content))
+
+    def collect(self, *args):
+        output = io.StringIO()
+        call_command('collect_blobs', *args, stdout=output)
+        return output.getvalue()
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(0, self.SCAN, 'scan.PDF')
+        second = self.upload(1, self.SCAN)
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith(constants.BLOB_UPLOAD_PATH))
+        self.assertTrue(first.file.name.endswith('.pdf'))
+        blob = Blob.objects.get()
+        self.assertEqual((blob.refcount, blob.size), (2, len(self.SCAN)))
+        with second.file.open('rb') as file:
+            self.assertEqual(file.read(), self.SCAN)
+        # nothing left behind besides the blob itself
+        files = [name for _, _, names in os.walk(blob_storage.path(constants.BLOB_UPLOAD_PATH)) for name in names]
+        self.assertEqual(len(files), 1)
+
+    def test_spooled_uploads_are_moved_into_place(self):
+        spooled = TemporaryUploadedFile('scan.pdf', 'application/pdf', len(self.SCAN), None)
+        self.addCleanup(spooled.close)
+        spooled.write(self.SCAN)
+        spooled.seek(0)
+        name = blob_storage.save('docs/scan.pdf', spooled)
+
+        self.assertFalse(os.path.exists(spooled.temporary_file_path()))
+        self.assertEqual(name, self.upload(0, self.SCAN).file.name)
+        self.assertEqual(Blob.objects.get().refcount, 2)
+
+    def test_references_are_released_on_replace_and_delete(self):
+        self.upload(0, self.SCAN)
+        self.upload(1, self.SCAN)
+        self.upload(0, b'%PDF-1.7\nmarksheet')
+        self.assertEqual(Blob.objects.get(size=len(self.SCAN)).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.applications[1].delete()
+        self.assertEqual(Blob.objects.get(size=len(self.SCAN)).refcount, 0)
+
+        # re-uploading the same content keeps exactly one reference
+        self.upload(0, b'%PDF-1.7\nmarksheet')
+        self.assertEqual(Blob.objects.get(size=len(b'%PDF-1.7\nmarksheet')).refcount, 1)
+
+    def test_collect_blobs_deletes_only_unreferenced_old_blobs(self):
+        kept = self.upload(0, self.SCAN).file.name
+        orphan = blob_storage.save('docs/old.pdf', ContentFile(b'%PDF-1.7\nold'))
+        recent = blob_storage.save('docs/new.pdf', ContentFile(b'%PDF-1.7\nnew'))
+        stray = blob_storage.path(f"{constants.BLOB_UPLOAD_PATH}ab/stray.pdf")
+        os.makedirs(os.path.dirname(stray), exist_ok=True)
+        open(stray, 'wb').close()
+        os.utime(stray, (0, 0))
+        long_ago = timezone.now() - constants.BLOB_GC_GRACE * 2
+        # a reference count that drifted from the rows, and two blobs no row uses
+        Blob.objects.filter(name=kept).update(refcount=0, updated_at=long_ago)
+        Blob.objects.filter(name=orphan).update(updated_at=long_ago)
+        Blob.objects.filter(name=recent).update(refcount=0)
+
+        self.assertIn('Would delete', self.collect('--dry-run'))
+        self.assertTrue(blob_storage.exists(orphan))
+
+        self.collect()
+
+        self.assertEqual(Blob.objects.get(name=kept).refcount, 1)
+        self.assertTrue(blob_storage.exists(kept))
+        self.assertFalse(Blob.objects.filter(name=orphan).exists())
+        self.assertFalse(blob_storage.exists(orphan))
+        self.assertTrue(blob_storage.exists(recent))
+        self.assertFalse(os.path.exists(stray))
@@ -7,6 +7,127 @@ VERIFY_EMAIL_EXP_TIME = timedelta(hours=1)
 
 OTP_LENGTH = 6
 OTP_EXP_TIME = timedelta(minutes=30)
+OTP_MAX_ATTEMPTS = 5
+# sliding-window limits on OTP sends / verifications
+OTP_PHONE_SEND_LIMIT = 5
+OTP_IP_SEND_LIMIT = 20
+OTP_SEND_WINDOW = timedelta(hours=1)
+OTP_IP_VERIFY_LIMIT = 30
+OTP_VERIFY_WINDOW = timedelta(minutes=15)
+# expired / used OTP rows are kept this long before `purge_otps` deletes them
+OTP_RETENTION = timedelta(days=1)
+
+# per-process cache of users resolved by CustomJWTAuthentication
+# how long a published account state is trusted before it is read from the database
+# again; bounds how long a write bypassing save() (e.g. QuerySet.update) goes unnoticed
+AUTH_ACCOUNT_STATE_TTL = timedelta(minutes=5)
+AUTH_USER_CACHE_TTL = timedelta(seconds=30)
+AUTH_USER_CACHE_SIZE = 1024
 
 IMAGE_UPLOAD_PATH = 'images/'
-FILE_UPLOAD_PATH = 'docs/'
\ No newline at end of file
+FILE_UPLOAD_PATH = 'docs/'
+
+#### Pagination consts ####
+COURSE_PAGE_SIZE = 20
+COURSE_MAX_PAGE_SIZE = 100
+
+
+#### Recommendation consts ####
+RECOMMENDATION_LIMIT = 10
+RECOMMENDATION_TAG_WEIGHT = 3
+RECOMMENDATION_INTEREST_WEIGHT = 2
+RECOMMENDATION_EDUCATION_WEIGHT = 1
+RECOMMENDATION_CACHE_TIMEOUT = timedelta(hours=6)
+# course changes within this long of each other share one rewrite of the index snapshot
+RECOMMENDATION_INDEX_DEBOUNCE = timedelta(seconds=2)
+
+
+#### Search consts ####
+SEARCH_CONFIG = 'english'
+SEARCH_QUERY_MAX_LENGTH = 100
+
+
+#### Facet consts ####
+# lower bounds of the fee ranges reported in the `fee` facet
+FEE_FACET_BUCKETS = [0, 10000, 25000, 50000, 100000, 250000]
+
+
+#### HTTP cache consts ####
+# how long browsers and nginx may reuse a catalogue response without revalidating
+HTTP_CACHE_MAX_AGE = timedelta(minutes=1)
+# rendered course detail payloads, keyed by course version
+COURSE_DETAIL_CACHE_TIMEOUT = timedelta(hours=1)
+
+
+#### Notification consts ####
+NOTIFICATION_BATCH_SIZE = 20
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BASE = timedelta(seconds=30)
+NOTIFICATION_RETRY_MAX = timedelta(hours=1)
+NOTIFICATION_POLL_INTERVAL = timedelta(seconds=2)
+# a SENDING row older than this belongs to a dead worker and is claimed again
+NOTIFICATION_LOCK_TIMEOUT = timedelta(minutes=5)
+
+
+#### Sender pool consts ####
+# open SMTP connections kept per process
+EMAIL_POOL_SIZE = 4
+# idle connections older than this are closed rather than reused (servers drop idle clients)
+EMAIL_KEEPALIVE = timedelta(minutes=2)
+# idle connections older than this are checked with a NOOP before reuse; younger ones are reused as they are
+EMAIL_PROBE_AFTER = timedelta(seconds=5)
+# keep-alive HTTP connections to the Twilio API per process
+SMS_HTTP_POOL_SIZE = 4
+SMS_HTTP_TIMEOUT = timedelta(seconds=10)
+
+
+#### Status campaign consts ####
+# applications loaded (and recorded in the campaign) per query
+CAMPAIGN_CHUNK_SIZE = 200
+# emails per second, to stay under the mail provider's sending limits
+CAMPAIGN_SEND_RATE = 5
+CAMPAIGN_POLL_INTERVAL = timedelta(seconds=5)
+# a RUNNING campaign not heard from for this long belongs to a dead worker
+CAMPAIGN_LOCK_TIMEOUT = timedelta(minutes=5)
+# times one applicant's email is retried after a dropped connection or 4xx reply before it counts as failed
+CAMPAIGN_MAX_RETRIES = 5
+
+
+#### Application export consts ####
+# applications read from the cursor (and form responses fetched) per query
+APPLICATION_EXPORT_CHUNK_SIZE = 2000
+
+
+#### Document upload consts ####
+DOCUMENT_MAX_SIZE = 5 * 1024 * 1024
+# largest chunk accepted by one PATCH of a resumable upload
+UPLOAD_CHUNK_MAX_SIZE = 1024 * 1024
+UPLOAD_SESSION_LIFETIME = timedelta(days=1)
+
+
+#### Media consts ####
+# browser / proxy cache lifetime of public media (images, syllabus and fee breakdown files)
+MEDIA_PUBLIC_MAX_AGE = timedelta(days=1)
+
+
+#### Image derivative consts ####
+IMAGE_DERIVATIVE_PATH = IMAGE_UPLOAD_PATH + 'derived/'
+# widths in pixels of the resized copies made of course, institute and preference images
+IMAGE_DERIVATIVE_WIDTHS = {'thumb': 160, 'card': 480, 'hero': 1280}
+IMAGE_DERIVATIVE_QUALITY = {'webp': 80, 'jpeg': 82}
+IMAGE_DERIVATIVE_WORKERS = 2
+# derivatives have content-hash names and never change
+IMAGE_DERIVATIVE_MAX_AGE = timedelta(days=365)
+
+
+#### Blob storage consts ####
+# uploaded documents are stored once per distinct content here, see blobstore.storage
+BLOB_UPLOAD_PATH = FILE_UPLOAD_PATH + 'blobs/'
+BLOB_HASH_BLOCK_SIZE = 64 * 1024
+# unreferenced blobs (and stray files) younger than this are kept, as their row may not be committed yet
+BLOB_GC_GRACE = timedelta(days=1)
+
+
+#### Application counter consts ####
+# applications locked and recounted per statement by bulk updates of course, batch or status
+APPLICATION_COUNTER_CHUNK_SIZE = 500
@@ -1,12 +1,57 @@
 from django.contrib import admin
 from .models import Course, Batch, Duration, EligibilityCriterion, ApplicationFormField, RequiredDocument
-from user.authentication import get_specific_user
+from instituteadmin.admin import InstituteScopedAdminMixin
 from django import forms
 
+# related rows each model's __str__ reads, loaded with the choices of course / batch form fields
+STR_RELATED = {
+    Course: ('offered_by',),
+    Batch: ('course', 'location'),
+}
+
+
+class CourseChoicesMixin:
+    """Loads what `Course.__str__` / `Batch.__str__` need in the query that lists the choices"""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        related = STR_RELATED.get(db_field.related_model)
+        if related and 'queryset' not in kwargs:
+            kwargs['queryset'] = db_field.related_model._default_manager.select_related(*related)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        related = STR_RELATED.get(db_field.related_model)
+        if related and 'queryset' not in kwargs:
+            kwargs['queryset'] = db_field.related_model._default_manager.select_related(*related)
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+
+class CourseFilter(admin.RelatedFieldListFilter):
+    """`list_filter` for a course foreign key, listing the courses with their institutes in one query"""
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin) or ()
+        courses = Course.objects.select_related('offered_by').order_by(*ordering)
+        if not request.user.is_superuser:
+            courses = courses.filter(offered_by_id=request.user.pk)
+        return [(course.pk, str(course)) for course in courses]
+
+
 class BatchInline(admin.TabularInline):
     model = Batch
     extra = 1
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'location':
+            # evaluated once and shared by every batch row, instead of one query per row
+            formfield.choices = [choice for choice in formfield.choices]
+        return formfield
+
+    def get_queryset(self, request):
+        # each row is labelled with Batch.__str__
+        return super().get_queryset(request).select_related('course', 'location')
+
 class EligibilityCriterionInline(admin.TabularInline):
     model = EligibilityCriterion
     extra = 1
@@ -57,8 +102,10 @@ class RequiredDocumentsInline(admin.TabularInline):
     extra = 1
     can_delete = True        
         
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(InstituteScopedAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'offered_by', 'mode', 'fee_amount', 'min_education_level')
+    list_select_related = ('offered_by', 'min_education_level')
+    institute_lookup = 'offered_by_id'
     list_filter = ('mode', 'offered_by')
     search_fields = ('name', 'offered_by__email')  
     prepopulated_fields = {"slug": ("name",)}
@@ -75,21 +122,10 @@ class CourseAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         """Automatically set offered_by to request.user for non-superusers."""
         if not request.user.is_superuser:
-            institute = get_specific_user(request.user)
-            obj.offered_by = institute
+            obj.offered_by_id = request.user.pk
         super().save_model(request, obj, form, change)
     
     
-    def get_queryset(self, request):
-        """Restrict non-superusers to only their own courses."""
-        qs = super().get_queryset(request)
-        if request.user.is_superuser:
-            return qs
-        
-        institute = get_specific_user(request.user)
-        return qs.filter(offered_by=institute)
-    
-    
     def get_fields(self, request, obj):
         fields = super().get_fields(request, obj)
         if request.user.is_superuser:
@@ -99,47 +135,28 @@ class CourseAdmin(admin.ModelAdmin):
         return fields
 
 
-class BatchAdmin(admin.ModelAdmin):
+class BatchAdmin(InstituteScopedAdminMixin, CourseChoicesMixin, admin.ModelAdmin):
     list_display = ('course', 'location', 'commencement_date', 'discount')
-    list_filter = ('course',)
+    list_select_related = ('course__offered_by', 'location')
+    list_filter = (('course', CourseFilter),)
     search_fields = ('course__name', 'location')
-
-    def get_queryset(self, request):
-        """Restrict non-superusers to only their own batches."""
-        qs = super().get_queryset(request)
-        if request.user.is_superuser:
-            return qs
-        
-        institute = get_specific_user(request.user)
-        return qs.filter(course__in=institute.offered_courses.all())
+    institute_lookup = 'course__offered_by_id'
 
 
-class EligibilityCriterionAdmin(admin.ModelAdmin):
+class EligibilityCriterionAdmin(InstituteScopedAdminMixin, CourseChoicesMixin, admin.ModelAdmin):
     list_display = ('course', 'detail')
+    list_select_related = ('course__offered_by',)
     search_fields = ('course__name', 'detail')
-
-    def get_queryset(self, request):
-        """Restrict non-superusers to El. Cr. of their own courses only."""
-        qs = super().get_queryset(request)
-        if request.user.is_superuser:
-            return qs
-        
-        institute = get_specific_user(request.user)
-        return qs.filter(course__in=institute.offered_courses.all())
+    institute_lookup = 'course__offered_by_id'
    
 
-class DurationAdmin(admin.ModelAdmin):
+
+class DurationAdmin(InstituteScopedAdminMixin, CourseChoicesMixin, admin.ModelAdmin):
     list_display = ('course', 'years', 'months', 'weeks', 'days', 'hours' )
+    list_select_related = ('course__offered_by',)
     search_fields = ('course__name', 'years', 'months', 'weeks', 'days', 'hours')
+    institute_lookup = 'course__offered_by_id'
 
-    def get_queryset(self, request):
-        """Restrict non-superusers to Durations of their own courses only."""
-        qs = super().get_queryset(request)
-        if request.user.is_superuser:
-            return qs
-        
-        institute = get_specific_user(request.user)
-        return qs.filter(course__in=institute.offered_courses.all())
  
    
 admin.site.register(Course, CourseAdmin)
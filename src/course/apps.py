@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class CourseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'course'
+
+    def ready(self):
+        from . import signals
+        from utils import shared_cache_check
+        checks.register(shared_cache_check("Conditional GET version stamps and cached course details", 'course.E001'))
@@ -0,0 +1,73 @@
+"""
+Server-side cache of the course detail payload.
+
+The rendered JSON is stored under the version digest of the course (see
+`httpcache.resource_version`), so any write that bumps one of the stamps the
+detail view depends on makes the old entry unreachable; it then simply
+expires. Slug lookups are cached as well so the slug route can be served
+without touching the database.
+
+Stamps are bumped and slugs forgotten only after the writing transaction
+commits, so a payload rendered from rows that were not committed yet is never
+stored under the new version. Entries are shared by all gunicorn workers
+through the default cache, which has to be a shared backend in production
+(`CACHE_URL`, the redis service in docker-compose.yaml).
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from rest_framework.renderers import JSONRenderer
+from .models import Course
+from .serializers import CourseDetailSerializer
+import constants
+
+
+def course_resource(course_id) -> str:
+    """Version stamp shared by the detail / batches / form / docs views of a course."""
+    return f"course:{course_id}"
+
+
+def course_detail_resources(course_id) -> list:
+    # the detail payload embeds tag / interest / education level names
+    return [course_resource(course_id), 'tag', 'interest', 'education-level']
+
+
+def slug_key(slug: str) -> str:
+    return f"course-slug:{slug}"
+
+
+def course_id_for_slug(slug: str):
+    course_id = cache.get(slug_key(slug))
+    if course_id is None:
+        course_id = Course.objects.filter(slug=slug).values_list('id', flat=True).first()
+        if course_id is not None:
+            cache.set(slug_key(slug), course_id, timeout=None)
+    return course_id
+
+
+def forget_slug(slug: str):
+    """Drop the cached lookup of `slug` once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(slug_key(slug)))
+
+
+def render_course_detail(course_id) -> bytes:
+    course = get_object_or_404(
+        Course.objects.select_related('offered_by', 'duration', 'min_education_level').prefetch_related(
+            'offered_by__details', 'batches', 'tags', 'relevant_interests', 'eligibility_criteria',
+        ),
+        id=course_id,
+    )
+    return JSONRenderer().render(CourseDetailSerializer(course).data)
+
+
+def get_course_detail(course_id, version: str = None) -> bytes:
+    """Rendered `CourseDetailSerializer` JSON of a course, cached per `version`."""
+    if version is None:
+        return render_course_detail(course_id)
+
+    key = f"course-detail:{course_id}:{version}"
+    content = cache.get(key)
+    if content is None:
+        content = render_course_detail(course_id)
+        cache.set(key, content, timeout=constants.COURSE_DETAIL_CACHE_TIMEOUT.total_seconds())
+    return content
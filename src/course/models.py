@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from blobstore.storage import document_storage
 from instituteadmin.models import InstituteAdmin
 import constants
 from datetime import timedelta
@@ -8,9 +12,38 @@ from preference.models import Tag, Location, EducationLevel, Interest
 def default_duration():
     return timedelta(weeks=2)
 
+
+class CourseQuerySet(models.QuerySet):
+    def cards(self):
+        """Columns and joins needed to render `CourseSerializer` without per-row queries."""
+        return self.select_related('offered_by', 'duration').only(
+            'id',
+            'name',
+            'mode',
+            'fee_amount',
+            'image',
+            'image_derivatives',
+            'slug',
+            'offered_by__id',
+            'offered_by__name',
+            'duration__hours',
+            'duration__days',
+            'duration__weeks',
+            'duration__months',
+            'duration__years',
+        )
+
+
 class Course(models.Model):
     class Meta:
         verbose_name_plural = 'Courses'
+        indexes = [
+            # institute admin pages filter on offered_by and page by id
+            models.Index(fields=['offered_by', 'id'], name='course_offered_by_id_idx'),
+        ]
+        # full text search is only indexed on PostgreSQL, see advsearch.search
+        if settings.DATABASE_ENGINE == 'postgres':
+            indexes.append(GinIndex(fields=['search_vector'], name='course_search_vector_idx'))
          
     class Types(models.TextChoices):
         ON_CAMPUS = 'ON_CAMPUS', 'Campus'
@@ -22,19 +55,24 @@ class Course(models.Model):
     mode = models.CharField(max_length=20, choices=Types.choices, default=Types.ON_CAMPUS)
     description = models.TextField(default='')
     image = models.ImageField(upload_to=constants.IMAGE_UPLOAD_PATH, blank=True, null=True)
+    # resized copies of `image`, see mediaserver.derivatives
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     # duration
     # batches[]
-    syllabus = models.FileField(upload_to=constants.FILE_UPLOAD_PATH, blank=True, null=True)
+    syllabus = models.FileField(upload_to=constants.FILE_UPLOAD_PATH, storage=document_storage, blank=True, null=True)
     slug = models.CharField(max_length=20, null=False, default='', unique=True)
     # eligibiilty_criteria[]
     fee_amount = models.IntegerField(validators=[MinValueValidator(0)])
-    fee_breakdown = models.FileField(upload_to=constants.FILE_UPLOAD_PATH, blank=True, null=True)
+    fee_breakdown = models.FileField(upload_to=constants.FILE_UPLOAD_PATH, storage=document_storage, blank=True, null=True)
     tags = models.ManyToManyField(Tag, related_name='courses')
     min_education_level = models.ForeignKey(EducationLevel, on_delete=models.DO_NOTHING, related_name='courses')
     relevant_interests = models.ManyToManyField(Interest, related_name='courses')
+    search_vector = SearchVectorField(null=True, editable=False)
     # form_fields
     # documents_required
     
+    objects = CourseQuerySet.as_manager()
+    
     def __str__(self):
         offered_by_name = self.offered_by.name if self.offered_by else 'N/A'
         return f"Course: {self.name} by {offered_by_name}"
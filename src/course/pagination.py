@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination
+import constants
+
+
+class CourseCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the course primary key.
+
+    Cursors are opaque and encode the last seen `id`, so every page is an
+    indexed range scan (`WHERE id > ? ORDER BY id LIMIT n`) no matter how deep
+    the client pages.
+    """
+    ordering = 'id'
+    page_size = constants.COURSE_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = constants.COURSE_MAX_PAGE_SIZE
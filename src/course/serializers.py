@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from mediaserver.serializers import ImageSrcsetField
 from .models import Course, Batch, Duration, EligibilityCriterion, ApplicationFormField, RequiredDocument
 from instituteadmin.serializers import InstituteAdminSerializer, InstituteAdminDetailSerializer
 from preference.serializers import TagSerialzer, InterestSerializer, EducationLevelSerializer
@@ -43,6 +44,7 @@ class CourseSerializer(serializers.ModelSerializer):
     # batches = BatchSerializer(many=True)
     # commencement_date = serializers.SerializerMethodField()
     duration = DurationSerializer(many=False)
+    image_srcset = ImageSrcsetField('image')
 
     class Meta:
         model = Course
@@ -52,6 +54,7 @@ class CourseSerializer(serializers.ModelSerializer):
             'mode',
             'fee_amount',
             'image',
+            'image_srcset',
             'slug',
             'offered_by',
             # 'tags',
@@ -67,6 +70,7 @@ class CourseDetailSerializer(serializers.ModelSerializer):
     eligibility_criteria = EligibilityCriterionSerializer(many=True)
     min_education_level = EducationLevelSerializer(many=False)
     relevant_interests = InterestSerializer(many=True)
+    image_srcset = ImageSrcsetField('image')
     class Meta:
         model = Course
         fields = [
@@ -75,6 +79,7 @@ class CourseDetailSerializer(serializers.ModelSerializer):
             'description',
             'mode',
             'image',
+            'image_srcset',
             'offered_by',
             'batches',
             'tags',
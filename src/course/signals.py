@@ -0,0 +1,74 @@
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from httpcache import bump_versions
+from instituteadmin.models import InstituteAdmin, Detail
+from .models import Course, Batch, Duration, EligibilityCriterion, ApplicationFormField, RequiredDocument
+from .cache import course_resource, forget_slug
+
+M2M_WRITE_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+
+def bump_courses(course_ids):
+    if course_ids:
+        bump_versions(*[course_resource(course_id) for course_id in course_ids])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    bump_courses([instance.pk])
+
+
+@receiver(pre_save, sender=Course)
+def course_slug_changing(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and 'slug' not in update_fields):
+        return
+    old_slug = Course.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+    if old_slug is not None and old_slug != instance.slug:
+        forget_slug(old_slug)
+
+
+@receiver(post_delete, sender=Course)
+def course_slug_deleted(sender, instance, **kwargs):
+    forget_slug(instance.slug)
+
+
+@receiver(post_save, sender=Batch)
+@receiver(post_delete, sender=Batch)
+@receiver(post_save, sender=Duration)
+@receiver(post_delete, sender=Duration)
+@receiver(post_save, sender=EligibilityCriterion)
+@receiver(post_delete, sender=EligibilityCriterion)
+@receiver(post_save, sender=ApplicationFormField)
+@receiver(post_delete, sender=ApplicationFormField)
+@receiver(post_save, sender=RequiredDocument)
+@receiver(post_delete, sender=RequiredDocument)
+def course_part_changed(sender, instance, **kwargs):
+    if instance.course_id:
+        bump_courses([instance.course_id])
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+@receiver(m2m_changed, sender=Course.relevant_interests.through)
+def course_links_changed(sender, instance, action, reverse, **kwargs):
+    if action not in M2M_WRITE_ACTIONS:
+        return
+
+    if reverse:
+        # tag.courses.add(...) and friends; the detail view also depends on the
+        # tag / interest stamp, so bumping that covers every affected course
+        bump_versions('tag' if sender is Course.tags.through else 'interest')
+    else:
+        bump_courses([instance.pk])
+
+
+@receiver(post_save, sender=InstituteAdmin)
+def institute_changed(sender, instance, **kwargs):
+    bump_courses(list(instance.offered_courses.values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=Detail)
+@receiver(post_delete, sender=Detail)
+def institute_detail_changed(sender, instance, **kwargs):
+    if instance.admin_id:
+        bump_courses(list(Course.objects.filter(offered_by_id=instance.admin_id).values_list('id', flat=True)))
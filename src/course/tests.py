@@ -1,3 +1,194 @@
-from django.test import TestCase
+from datetime import date
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from instituteadmin.models import InstituteAdmin
+from preference.models import EducationLevel, Location
+from .cache import slug_key
+from .models import Course, Duration, Batch
+import constants
 
-# Create your tests here.
+
+def create_courses(institute, education_level, count, start=0):
+    for i in range(start, start + count):
+        course = Course.objects.create(
+            offered_by=institute,
+            name=f"Course {i}",
+            slug=f"course-{i}",
+            fee_amount=1000,
+            min_education_level=education_level,
+        )
+        Duration.objects.create(course=course)
+
+
+class CourseListViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        cls.education_level = EducationLevel.objects.create(name='Graduate')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_card_fields_serialized(self):
+        create_courses(self.institute, self.education_level, 1)
+
+        response = self.client.get(reverse('course-list'))
+
+        self.assertEqual(response.status_code, 200)
+        course = response.json()['results'][0]
+        self.assertEqual(course['offered_by'], {'id': self.institute.id, 'name': 'Institute'})
+        self.assertEqual(course['duration']['weeks'], 2)
+
+    def test_query_count_does_not_grow_with_catalogue(self):
+        create_courses(self.institute, self.education_level, 2)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('course-list'))
+
+        create_courses(self.institute, self.education_level, 20, start=2)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('course-list'))
+
+        self.assertEqual(len(response.json()['results']), constants.COURSE_PAGE_SIZE)
+
+    def test_cursor_pagination_walks_whole_catalogue(self):
+        create_courses(self.institute, self.education_level, 7)
+
+        seen = []
+        url = reverse('course-list') + '?page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            seen.extend(course['id'] for course in page['results'])
+            url = page['next']
+
+        self.assertEqual(seen, list(Course.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_page_size_is_capped(self):
+        create_courses(self.institute, self.education_level, constants.COURSE_MAX_PAGE_SIZE + 1)
+
+        response = self.client.get(reverse('course-list'), {'page_size': constants.COURSE_MAX_PAGE_SIZE + 50})
+
+        self.assertEqual(len(response.json()['results']), constants.COURSE_MAX_PAGE_SIZE)
+        self.assertIsNotNone(response.json()['next'])
+
+
+# committed course writes would otherwise update the real recommendation index
+@override_settings(RECOMMENDATION_INDEX_PATH='')
+class CourseConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        cls.education_level = EducationLevel.objects.create(name='Graduate')
+        create_courses(cls.institute, cls.education_level, 1)
+        cls.course = Course.objects.get()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_matching_etag_is_answered_without_queries(self):
+        url = reverse('course-detail', args=[self.course.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_slug_route_shares_the_course_version(self):
+        etag = self.client.get(reverse('course-batches', args=[self.course.id]))['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('course-batches-slug', args=[self.course.slug]), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        url = reverse('course-batches', args=[self.course.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Batch.objects.create(course=self.course, location=Location.objects.create(name='Pune'), commencement_date=date(2026, 1, 1))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_only_once_the_write_commits(self):
+        url = reverse('course-batches', args=[self.course.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Batch.objects.create(course=self.course, location=Location.objects.create(name='Pune'), commencement_date=date(2026, 1, 1))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unknown_slug_is_not_cached(self):
+        response = self.client.get(reverse('course-detail-slug', args=['missing']))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+@override_settings(RECOMMENDATION_INDEX_PATH='')
+class CourseDetailCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        cls.education_level = EducationLevel.objects.create(name='Graduate')
+        create_courses(cls.institute, cls.education_level, 1)
+        cls.course = Course.objects.get()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_warm_detail_is_served_without_queries(self):
+        first = self.client.get(reverse('course-detail', args=[self.course.id]))
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['offered_by']['name'], 'Institute')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('course-detail', args=[self.course.id]))
+        self.assertEqual(response.content, first.content)
+
+        self.client.get(reverse('course-detail-slug', args=[self.course.slug]))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('course-detail-slug', args=[self.course.slug]))
+        self.assertEqual(response.content, first.content)
+
+    def test_related_writes_refresh_the_payload(self):
+        url = reverse('course-detail', args=[self.course.id])
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            location = Location.objects.create(name='Pune')
+            Batch.objects.create(course=self.course, location=location, commencement_date=date(2026, 1, 1))
+        self.assertEqual(len(self.client.get(url).json()['batches']), 1)
+
+        self.education_level.name = 'Postgraduate'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.education_level.save()
+        self.assertEqual(self.client.get(url).json()['min_education_level']['name'], 'Postgraduate')
+
+    def test_renamed_slug_is_forgotten(self):
+        self.client.get(reverse('course-detail-slug', args=[self.course.slug]))
+
+        self.course.slug = 'renamed'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.course.save()
+        # the old lookup is only dropped once the rename commits
+        self.assertIsNotNone(cache.get(slug_key('course-0')))
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.client.get(reverse('course-detail-slug', args=['course-0'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('course-detail-slug', args=['renamed'])).status_code, 200)
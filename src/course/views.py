@@ -2,34 +2,57 @@ from .serializers import CourseSerializer, CourseDetailSerializer
 from .serializers import BatchSerializer, ApplicationFormFieldsSerializer, RequiredDocumentsSerializer
 from rest_framework.views import APIView
 from .models import Course
+from .pagination import CourseCursorPagination
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from django.http import Http404, HttpResponse
+from httpcache import conditional_get
+from .cache import course_resource, course_detail_resources, course_id_for_slug, get_course_detail
 # Create your views here.
 
+
+def course_detail_version(request, id=None, slug=None):
+    course_id = id if slug is None else course_id_for_slug(slug)
+    return None if course_id is None else course_detail_resources(course_id)
+
+
+def course_part_version(request, id=None, slug=None):
+    course_id = id if slug is None else course_id_for_slug(slug)
+    return None if course_id is None else [course_resource(course_id)]
+
+
 class CourseListView(APIView):
     """
-    Retrieve a list of all available courses.
+    Retrieve a page of available courses.
 
     Permissions:
     - Only accessible to authenticated users (IsAuthenticated).
 
     HTTP Method:
-    - GET: Returns a list of all `Course` objects.
+    - GET: Returns a cursor-paginated list of `Course` objects.
+
+    Query Parameters:
+    - cursor (str): Opaque cursor taken from a previous `next` / `previous` link.
+    - page_size (int): Number of courses per page (capped at `COURSE_MAX_PAGE_SIZE`).
 
     Response:
-    - 200 OK: Returns a JSON list of courses.
+    - 200 OK: Returns `next`, `previous` and a JSON list of courses in `results`.
 
     Example Usage:
     - GET /api/courses/
+    - GET /api/courses/?page_size=20&cursor=cD0yMA%3D%3D
     """
     permission_classes = [AllowAny]
+    pagination_class = CourseCursorPagination
 
     def get(self, request):
-        courses = Course.objects.all()
-        serializer = CourseSerializer(courses, many=True)
-        return Response(serializer.data,status=status.HTTP_200_OK)
+        courses = Course.objects.cards()
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(courses, request, view=self)
+        serializer = CourseSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
 class CourseDetailView(APIView):
     """
@@ -50,10 +73,10 @@ class CourseDetailView(APIView):
     """
     permission_classes = [AllowAny]
 
+    @conditional_get(course_detail_version)
     def get(self, request, id):
-        course = get_object_or_404(Course, id=id)
-        serializer = CourseDetailSerializer(course, many=False)
-        return Response(serializer.data,status=status.HTTP_200_OK)
+        content = get_course_detail(id, getattr(request, 'resource_version', None))
+        return HttpResponse(content, content_type='application/json', status=status.HTTP_200_OK)
     
     
 class CourseDetailSlugView(APIView):
@@ -75,10 +98,13 @@ class CourseDetailSlugView(APIView):
     """
     permission_classes = [AllowAny]
     
+    @conditional_get(course_detail_version)
     def get(self, request, slug):
-        course = get_object_or_404(Course, slug=slug)
-        serializer = CourseDetailSerializer(course)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        course_id = course_id_for_slug(slug)
+        if course_id is None:
+            raise Http404
+        content = get_course_detail(course_id, getattr(request, 'resource_version', None))
+        return HttpResponse(content, content_type='application/json', status=status.HTTP_200_OK)
         
     
 class CourseBatchesListView(APIView):
@@ -100,6 +126,7 @@ class CourseBatchesListView(APIView):
     """
     permission_classes = [AllowAny]
 
+    @conditional_get(course_part_version)
     def get(self, request, id):
         course = get_object_or_404(Course, id=id)
         batches = course.batches.all()
@@ -126,6 +153,7 @@ class CourseBatchesListSlugView(APIView):
     """
     permission_classes = [AllowAny] 
     
+    @conditional_get(course_part_version)
     def get(self, request, slug):
         course = get_object_or_404(Course, slug=slug)
         batches = course.batches.all()
@@ -146,6 +174,7 @@ class CourseFormDetailsListView(APIView):
     """
     permission_classes = [AllowAny]
     
+    @conditional_get(course_part_version)
     def get(self, request, id):
         course = get_object_or_404(Course, id=id)
         form_fields = course.form_fields.all()
@@ -166,6 +195,7 @@ class CourseFormDetailsListSlugView(APIView):
     """
     permission_classes = [AllowAny]
     
+    @conditional_get(course_part_version)
     def get(self, request, slug):
         course = get_object_or_404(Course, slug=slug)
         form_fields = course.form_fields.all()
@@ -186,6 +216,7 @@ class CourseReqDocsListView(APIView):
     """
     permission_classes = [AllowAny]
     
+    @conditional_get(course_part_version)
     def get(self, request, id):
         course = get_object_or_404(Course, id=id)
         documents_required = course.documents_required.all()
@@ -206,6 +237,7 @@ class CourseReqDocsListSlugView(APIView):
     """
     permission_classes = [AllowAny]
     
+    @conditional_get(course_part_version)
     def get(self, request, slug):
         course = get_object_or_404(Course, slug=slug)
         documents_required = course.documents_required.all()
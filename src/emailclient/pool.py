@@ -0,0 +1,99 @@
+"""
+Process-wide pool of open SMTP connections.
+
+Opening a connection to the mail server costs a TCP + TLS handshake and an
+AUTH round trip, far more than sending a short message over it. The pool
+keeps a few Django email backend connections open and hands them out to one
+sender at a time. Connections idle for longer than `EMAIL_KEEPALIVE` are
+closed instead of reused, and one idle for longer than `EMAIL_PROBE_AFTER`
+is probed with a NOOP first, since mail servers drop idle clients without
+telling them; a connection released moments ago is reused without the extra
+round trip. Messages are sent
+one at a time; if the server drops the connection part way through a batch,
+the pool reconnects once and resumes from the message that failed, so the
+messages already accepted are not sent twice.
+"""
+import queue
+import smtplib
+import time
+from django.core.mail import get_connection
+import constants
+
+DISCONNECTED = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+class SMTPConnectionPool:
+    def __init__(self, size: int, keepalive, probe_after=constants.EMAIL_PROBE_AFTER):
+        self.keepalive = keepalive.total_seconds()
+        self.probe_after = probe_after.total_seconds()
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        while True:
+            try:
+                connection, last_used = self.idle.get_nowait()
+            except queue.Empty:
+                connection = get_connection(fail_silently=False)
+                connection.open()
+                return connection
+            idle = time.monotonic() - last_used
+            if idle < self.probe_after or (idle < self.keepalive and self.alive(connection)):
+                return connection
+            self.discard(connection)
+
+    def alive(self, connection) -> bool:
+        smtp = getattr(connection, 'connection', None)
+        if smtp is None:
+            # not an SMTP backend, nothing to probe
+            return True
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def release(self, connection):
+        try:
+            self.idle.put_nowait((connection, time.monotonic()))
+        except queue.Full:
+            self.discard(connection)
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except DISCONNECTED:
+            pass
+
+    def send_messages(self, messages) -> int:
+        """Send `messages` over one pooled connection, returning how many were sent."""
+        sent = 0
+        position = 0
+        reconnected = False
+        while position < len(messages):
+            connection = self.acquire()
+            try:
+                while position < len(messages):
+                    sent += connection.send_messages([messages[position]])
+                    position += 1
+            except DISCONNECTED:
+                # messages before `position` were accepted; carry on from the one that failed
+                self.discard(connection)
+                if reconnected:
+                    raise
+                reconnected = True
+                continue
+            except BaseException:
+                self.discard(connection)
+                raise
+            self.release(connection)
+        return sent
+
+    def close(self):
+        while True:
+            try:
+                connection, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(connection)
+
+
+smtp_pool = SMTPConnectionPool(constants.EMAIL_POOL_SIZE, constants.EMAIL_KEEPALIVE)
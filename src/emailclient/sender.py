@@ -1,5 +1,8 @@
-from django.core.mail import send_mail
 from django.conf import settings
+from django.core.mail import EmailMessage
+from notification.outbox import enqueue_email
+from .pool import smtp_pool
+import constants
 
 frontend_url = settings.FRONTEND_URL
 
@@ -40,13 +43,8 @@ def send_password_reset_email(user_email: str, username: str, reset_token: str):
     subject = "Reset Your Password"
     message = generate_reset_email(username, reset_link)
 
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [user_email],
-        fail_silently=False,
-    )
+    # the body carries a live reset link, so it is sealed while queued
+    enqueue_email(subject, message, [user_email], sealed_for=constants.FORGOT_PASSWORD_EXP_TIME)
     
 
 
@@ -55,10 +53,13 @@ def send_verification_email(user_email: str, username: str, verification_token:
     subject = "Verify Your Email Address"
     message = generate_verification_email(username, verification_link)
 
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [user_email],
-        fail_silently=False,
-    )
+    enqueue_email(subject, message, [user_email], sealed_for=constants.VERIFY_EMAIL_EXP_TIME)
+
+
+def send_emails(messages: list[EmailMessage]) -> int:
+    """
+    Send `messages` right away over a single pooled SMTP connection and return
+    how many were sent. Request handlers should enqueue instead; this is for
+    the outbox worker and bulk senders.
+    """
+    return smtp_pool.send_messages(messages)
@@ -1,3 +1,105 @@
-from django.test import TestCase
+import smtplib
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core.mail import EmailMessage
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import SimpleTestCase, override_settings
+from .pool import SMTPConnectionPool
+import constants
 
-# Create your tests here.
+
+class RecordingBackend(BaseEmailBackend):
+    opened = []
+    # how many of the next sends fail as if the server had dropped the connection
+    drops = 0
+    sent = []
+
+    def open(self):
+        self.opened.append(self)
+        self.closed = False
+        return True
+
+    def close(self):
+        self.closed = True
+
+    def send_messages(self, messages):
+        if RecordingBackend.drops:
+            RecordingBackend.drops -= 1
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        RecordingBackend.sent.extend(messages)
+        return len(messages)
+
+
+@override_settings(EMAIL_BACKEND='emailclient.tests.RecordingBackend')
+class SMTPConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        RecordingBackend.opened = []
+        RecordingBackend.drops = 0
+        RecordingBackend.sent = []
+        self.pool = SMTPConnectionPool(2, timedelta(minutes=2))
+        self.message = EmailMessage('Subject', 'Body', 'from@example.com', ['to@example.com'])
+
+    def test_connection_is_reused(self):
+        for _ in range(3):
+            self.assertEqual(self.pool.send_messages([self.message]), 1)
+        self.assertEqual(self.pool.send_messages([self.message] * 5), 5)
+
+        self.assertEqual(len(RecordingBackend.opened), 1)
+
+    def test_dropped_connection_is_replaced_and_retried_once(self):
+        self.pool.send_messages([self.message])
+        RecordingBackend.drops = 1
+
+        self.assertEqual(self.pool.send_messages([self.message]), 1)
+        first, second = RecordingBackend.opened
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+
+        RecordingBackend.drops = 2
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            self.pool.send_messages([self.message])
+
+    def test_batch_resumes_after_a_drop_without_resending(self):
+        messages = [EmailMessage(f'Subject {i}', 'Body', 'from@example.com', ['to@example.com']) for i in range(3)]
+        self.pool.send_messages(messages[:1])
+        RecordingBackend.sent = []
+
+        original = RecordingBackend.send_messages
+
+        def drop_after_first(backend, batch):
+            if len(RecordingBackend.sent) == 1 and len(RecordingBackend.opened) == 1:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            return original(backend, batch)
+
+        with mock.patch.object(RecordingBackend, 'send_messages', drop_after_first):
+            self.assertEqual(self.pool.send_messages(messages), 3)
+
+        self.assertEqual(RecordingBackend.sent, messages)
+
+    def test_idle_connection_is_probed_before_reuse(self):
+        self.pool.send_messages([self.message])
+        first = RecordingBackend.opened[0]
+        first.connection = mock.Mock(**{'noop.side_effect': smtplib.SMTPServerDisconnected("Connection unexpectedly closed")})
+
+        # just released: reused without a round trip
+        self.pool.send_messages([self.message])
+        first.connection.noop.assert_not_called()
+
+        later = time.monotonic() + constants.EMAIL_PROBE_AFTER.total_seconds() + 1
+        with mock.patch('emailclient.pool.time.monotonic', return_value=later):
+            self.pool.send_messages([self.message])
+
+        first.connection.noop.assert_called_once_with()
+        self.assertTrue(first.closed)
+        self.assertEqual(len(RecordingBackend.opened), 2)
+
+    def test_idle_connection_past_keepalive_is_closed(self):
+        self.pool.send_messages([self.message])
+
+        with mock.patch('emailclient.pool.time.monotonic', return_value=10 ** 9):
+            self.pool.send_messages([self.message])
+
+        first, second = RecordingBackend.opened
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
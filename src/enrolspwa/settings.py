@@ -42,7 +42,8 @@ DEBUG = env('DEBUG')
 
 SMS_TYPE = env('SMS_TYPE')
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# e.g. django.core.mail.backends.console.EmailBackend to print mails locally
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_USE_TLS = True
 EMAIL_PORT = 587
@@ -80,6 +81,9 @@ INSTALLED_APPS = [
     'application',
     'test',
     'advsearch',
+    'notification',
+    'mediaserver',
+    'blobstore',
     'drf_spectacular',
     'drf_spectacular_sidecar',
 ]
@@ -159,7 +163,7 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.AccountTokenObtainPairSerializer",
     "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
@@ -193,6 +197,19 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# CACHE_URL selects the backend, e.g. redis://redis:6379/1 (the redis service in
+# docker-compose.yaml) or pymemcache://memcached:11211. The per-process locmem
+# default only suits a single development server: version stamps, stored
+# rankings and rate limits must reach every gunicorn worker, so the system checks
+# of the apps relying on them fail in production without a shared backend.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -235,13 +252,30 @@ STATIC_ROOT = os.path.join(PUBLIC_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(PUBLIC_DIR, 'media')
+# media is served by the mediaserver app; behind nginx it only checks access and
+# hands the file to this internal location (see nginx.conf) with X-Accel-Redirect
+MEDIA_ACCEL_REDIRECT = env.bool('MEDIA_ACCEL_REDIRECT', default=not DEBUG)
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# chunked document uploads are assembled here until complete. It must be on the
+# same filesystem as MEDIA_ROOT for finished files to be renamed into storage
+# rather than copied; the mediaserver app never serves it (see mediaserver.access)
+UPLOAD_PARTIAL_ROOT = env('UPLOAD_PARTIAL_ROOT', default=os.path.join(MEDIA_ROOT, '.uploads'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Recommendation index snapshot, shared by all workers through mmap.
+# Set to an empty string to score recommendations in SQL instead.
+RECOMMENDATION_INDEX_PATH = env('RECOMMENDATION_INDEX_PATH', default=os.path.join(PARENT_DIR, 'data', 'index', 'courses.idx'))
+
+# Count course facets from the materialized advsearch.CourseFacet table
+COURSE_FACET_TABLE = env.bool('COURSE_FACET_TABLE', default=True)
+
 # Twiliio set up
 TWILIO_ACCOUNT_SID = env('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = env('TWILIO_AUTH_TOKEN', default='')
-TWILIO_PHONE_NUMBER = env('TWILIO_PHONE_NUMBER', default='')
\ No newline at end of file
+TWILIO_PHONE_NUMBER = env('TWILIO_PHONE_NUMBER', default='')
+# Point the Twilio client at another host (e.g. a local stub); empty uses api.twilio.com
+TWILIO_API_BASE_URL = env('TWILIO_API_BASE_URL', default='')
@@ -16,7 +16,6 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static 
 from django.conf import settings
 from django.shortcuts import redirect
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
@@ -31,6 +30,7 @@ urlpatterns = [
     path('api/applications/', include('application.urls')),
     path('api/adv-search/', include('advsearch.urls')),
     path('api/',include('preference.urls')),
+    path(settings.MEDIA_URL.lstrip('/'), include('mediaserver.urls')),
     
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -41,4 +41,3 @@ if settings.DEBUG:
     urlpatterns.append(
         path('test/', include('test.urls')),
     )
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
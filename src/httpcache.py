@@ -0,0 +1,91 @@
+"""
+Conditional GET support for read-mostly API resources.
+
+Every cacheable resource (e.g. `tag`, `course:42`) has a version stamp in the
+Django cache: the time it was last written. Signal receivers bump the stamp
+whenever the underlying rows change, so a view can compute its ETag and
+Last-Modified from a single cache lookup and answer `If-None-Match` /
+`If-Modified-Since` with a 304 before running any query or serializer.
+
+Stamps are bumped once the writing transaction commits, so a response built
+from rows that are not visible yet can never carry the new ETag, and they must
+live in a cache every worker shares (see `CACHE_URL`); a process-local cache
+fails the `course.E001` check in production.
+"""
+import hashlib
+import time
+from functools import wraps
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+import constants
+
+VERSION_KEY_PREFIX = 'resource-version:'
+
+
+def version_key(resource: str) -> str:
+    return f"{VERSION_KEY_PREFIX}{resource}"
+
+
+def get_versions(*resources) -> list:
+    """Version stamps of `resources`, starting a fresh stamp for unknown ones."""
+    keys = [version_key(resource) for resource in resources]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        # another process may have added the stamp first
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, time.time()) for key in keys]
+
+
+def bump_versions(*resources):
+    """Mark `resources` as modified when the current transaction commits (right away outside one)."""
+    keys = [version_key(resource) for resource in resources]
+    transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time()), timeout=None))
+
+
+def resource_version(*resources) -> tuple:
+    """Digest of the combined version of `resources` and its last-modified timestamp."""
+    versions = get_versions(*resources)
+    digest = hashlib.sha1(
+        '|'.join(f"{resource}={version!r}" for resource, version in zip(resources, versions)).encode()
+    ).hexdigest()
+    return digest[:32], int(max(versions))
+
+
+def conditional_get(resources):
+    """
+    Decorate an `APIView.get` with ETag / Last-Modified validation.
+
+    `resources(request, *args, **kwargs)` returns the names of the resources
+    the response is built from, or None when they cannot be resolved (the view
+    then runs unconditionally, e.g. to produce its 404). The version digest is
+    left on `request.resource_version` for views that cache their payload.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            names = resources(request, *args, **kwargs)
+            if names is None:
+                return method(view, request, *args, **kwargs)
+
+            request.resource_version, last_modified = resource_version(*names)
+            etag = f'"{request.resource_version}"'
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response.headers.setdefault('ETag', etag)
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+            patch_cache_control(response, public=True, max_age=int(constants.HTTP_CACHE_MAX_AGE.total_seconds()))
+            return response
+        return wrapper
+    return decorator
+
@@ -4,12 +4,38 @@ from .models import InstituteAdmin, Detail
 from django.utils.translation import gettext_lazy as _
 
 
+class InstituteScopedAdminMixin:
+    """
+    Limits institute admins to the rows of their own institute; superusers see
+    everything. `institute_lookup` goes from the model to the owning
+    institute's id (e.g. `course__offered_by_id`) so the filter is a plain join
+    on the indexed foreign key. Foreign key choices pointing at another scoped
+    model are limited the same way.
+    """
+    institute_lookup = None
+
+    def scope(self, request, queryset, lookup=None):
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(**{lookup or self.institute_lookup: request.user.pk})
+
+    def get_queryset(self, request):
+        return self.scope(request, super().get_queryset(request))
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        lookup = getattr(self.admin_site._registry.get(db_field.related_model), 'institute_lookup', None)
+        if formfield is not None and lookup:
+            formfield.queryset = self.scope(request, formfield.queryset, lookup)
+        return formfield
+
 
 class DetailAdminInline(admin.TabularInline):
     model = Detail 
     extra = 1
-class InstituteAdminAdmin(UserAdmin):
+class InstituteAdminAdmin(InstituteScopedAdminMixin, UserAdmin):
     list_display = ('email', 'name',)
+    institute_lookup = 'pk'
     list_filter = []
     inlines = [DetailAdminInline]
     
@@ -40,6 +40,8 @@ class InstituteAdmin(User):
     name = models.CharField(max_length=255, unique=False)
     description = models.TextField(blank=True, null=False, default="")
     logo = models.ImageField(upload_to=constants.IMAGE_UPLOAD_PATH, blank=True, null=True)
+    # resized copies of `logo`, see mediaserver.derivatives
+    logo_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     # details = models.JSONField(default=list, validators=[validate_details])
 
     
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from mediaserver.serializers import ImageSrcsetField
 from .models import InstituteAdmin, Detail
 
 class DetailSerializer(serializers.ModelSerializer):
@@ -12,6 +13,7 @@ class DetailSerializer(serializers.ModelSerializer):
 
 class InstituteAdminDetailSerializer(serializers.ModelSerializer):
     details = DetailSerializer(many=True)
+    logo_srcset = ImageSrcsetField('logo')
     class Meta:
         model = InstituteAdmin
         fields = [
@@ -20,6 +22,7 @@ class InstituteAdminDetailSerializer(serializers.ModelSerializer):
             'name', 
             'description', 
             'logo', ##
+            'logo_srcset',
             'account_type',
             'details'
         ]
@@ -1,6 +1,7 @@
 from django.shortcuts import render
 from rest_framework.views import APIView
 from course.serializers import CourseSerializer
+from course.pagination import CourseCursorPagination
 from .models import InstituteAdmin
 from .serializers import InstituteAdminDetailSerializer
 from rest_framework.response import Response
@@ -17,10 +18,14 @@ class InstituteCourseListView(APIView):
     - Only accessible to students (IsStudent).
 
     HTTP Method:
-    - GET: Returns a list of all courses offered by the specified institute.
+    - GET: Returns a cursor-paginated list of courses offered by the specified institute.
+
+    Query Parameters:
+    - cursor (str): Opaque cursor taken from a previous `next` / `previous` link.
+    - page_size (int): Number of courses per page (capped at `COURSE_MAX_PAGE_SIZE`).
 
     Response:
-    - 200 OK: Returns a JSON list of courses.
+    - 200 OK: Returns `next`, `previous` and a JSON list of courses in `results`.
     - 404 Not Found: If the institute with the given ID does not exist.
 
     Example Usage:
@@ -28,12 +33,15 @@ class InstituteCourseListView(APIView):
     """
     
     permission_classes = [IsStudent]
+    pagination_class = CourseCursorPagination
     
     def get(self, request, id):
         institute = get_object_or_404(InstituteAdmin,id=id)
-        obj = institute.offered_courses.all()
-        serializer = CourseSerializer(obj, many=True)
-        return Response(serializer.data,status=status.HTTP_200_OK)
+        obj = institute.offered_courses.cards()
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(obj, request, view=self)
+        serializer = CourseSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     
     
@@ -0,0 +1,31 @@
+"""
+Who may read which file under MEDIA_ROOT.
+
+Images (course banners, institute logos, preference images) and the syllabus /
+fee breakdown PDFs of courses are public. Documents uploaded with an
+application can only be read by the student who applied, the institute the
+application was sent to and superusers. Anything else is treated as missing,
+so a file's existence is not revealed to users who may not read it.
+"""
+from django.db.models import Q
+from application.models import DocumentUpload
+from course.models import Course
+import constants
+
+PUBLIC = 'public'
+PRIVATE = 'private'
+
+
+def visibility(user, name: str) -> str | None:
+    """ PUBLIC or PRIVATE if `user` may read the media file `name`, None if not (or if it is not ours) """
+    if name.startswith(constants.IMAGE_UPLOAD_PATH):
+        return PUBLIC
+    if Course.objects.filter(Q(syllabus=name) | Q(fee_breakdown=name)).exists():
+        return PUBLIC
+
+    if not user or not user.is_authenticated:
+        return None
+    documents = DocumentUpload.objects.filter(file=name)
+    if not user.is_superuser:
+        documents = documents.filter(Q(application__applied_by_id=user.pk) | Q(application__course__offered_by_id=user.pk))
+    return PRIVATE if documents.exists() else None
@@ -0,0 +1,196 @@
+"""
+Resized WebP / JPEG copies of uploaded images.
+
+Every image field in `REGISTRY` has a `<field>_derivatives` JSON column next
+to it. After an image is saved (and the transaction commits) a background
+thread decodes it once, scales it to each width in `IMAGE_DERIVATIVE_WIDTHS`
+(never upscaling) and stores a WebP and a JPEG of each under
+`IMAGE_DERIVATIVE_PATH`. File names are derived from a hash of the source
+bytes and the encoder settings, so a derivative never changes once written and
+can be cached forever. The column then records the source it was made from and
+the generated sizes:
+
+    {"source": "images/banner.png", "width": 2400, "height": 1200,
+     "sizes": [{"name": "thumb", "width": 160, "height": 80,
+                "webp": "images/derived/3f2a...-160.webp", "jpeg": "images/derived/3f2a...-160.jpg"}, ...]}
+
+Derivatives whose `source` is not the current file are stale and ignored by
+`ImageSrcsetField` until regenerated. `generate_image_derivatives` backfills
+existing rows and prunes files no row refers to any more.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+from course.models import Course
+from instituteadmin.models import InstituteAdmin
+from preference.models import EducationLevel, Interest, Location
+import constants
+
+logger = logging.getLogger(__name__)
+
+# (model, image field) pairs that get derivatives
+REGISTRY = [
+    (Course, 'image'),
+    (InstituteAdmin, 'logo'),
+    (Location, 'image'),
+    (Interest, 'image'),
+    (EducationLevel, 'image'),
+]
+# format -> (file extension, Pillow save options)
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': constants.IMAGE_DERIVATIVE_QUALITY['webp'], 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': constants.IMAGE_DERIVATIVE_QUALITY['jpeg'], 'optimize': True, 'progressive': True}),
+}
+
+ORIENTATION = 0x0112
+DERIVATIVES_SUFFIX = '_derivatives'
+
+executor = ThreadPoolExecutor(max_workers=constants.IMAGE_DERIVATIVE_WORKERS, thread_name_prefix='image-derivatives')
+
+
+def derivatives_field(field: str) -> str:
+    return f"{field}{DERIVATIVES_SUFFIX}"
+
+
+def only_derivatives(update_fields) -> bool:
+    """ Whether a save wrote nothing but derivative columns, as `generate` does """
+    return bool(update_fields) and all(name.endswith(DERIVATIVES_SUFFIX) for name in update_fields)
+
+
+def content_hash(data: bytes) -> str:
+    # encoder settings are part of the name so changing them produces new files
+    digest = hashlib.sha256(data)
+    digest.update(repr((sorted(constants.IMAGE_DERIVATIVE_WIDTHS.items()), constants.IMAGE_DERIVATIVE_QUALITY)).encode())
+    return digest.hexdigest()[:24]
+
+
+def target_sizes(width: int, height: int) -> list:
+    """ (name, width, height) of each derivative of a `width` x `height` image, without upscaling or repeats """
+    sizes, seen = [], set()
+    for name, target in sorted(constants.IMAGE_DERIVATIVE_WIDTHS.items(), key=lambda item: item[1]):
+        target = min(target, width)
+        if target not in seen:
+            seen.add(target)
+            sizes.append((name, target, max(round(height * target / width), 1)))
+    return sizes
+
+
+def flatten(image: Image.Image) -> Image.Image:
+    """ `image` as RGB, with any transparency composited onto white (JPEG has no alpha) """
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image: Image.Image, file_format: str) -> bytes:
+    _, options = FORMATS[file_format]
+    if file_format == 'jpeg':
+        image = flatten(image)
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def store(name: str, data: bytes) -> str:
+    # same name means same bytes, so an existing file is reused as is
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(data))
+
+
+def render(source: str) -> dict:
+    """ Generate and store the derivatives of the image file `source`, returning their description """
+    with default_storage.open(source, 'rb') as file:
+        data = file.read()
+    digest = content_hash(data)
+
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    # EXIF orientations 5-8 are rotated by 90 degrees
+    rotated = image.getexif().get(ORIENTATION, 1) > 4
+    if rotated:
+        width, height = height, width
+    sizes = target_sizes(width, height)
+    # let the JPEG decoder scale down while decoding instead of building the full-size bitmap
+    _, largest_width, largest_height = sizes[-1]
+    image.draft('RGB', (largest_height, largest_width) if rotated else (largest_width, largest_height))
+    image = ImageOps.exif_transpose(image)
+
+    generated = []
+    for name, target_width, target_height in sizes:
+        resized = image if image.size == (target_width, target_height) else image.resize(
+            (target_width, target_height), Image.Resampling.LANCZOS, reducing_gap=3.0,
+        )
+        entry = {'name': name, 'width': target_width, 'height': target_height}
+        for file_format, (extension, _) in FORMATS.items():
+            entry[file_format] = store(
+                f"{constants.IMAGE_DERIVATIVE_PATH}{digest}-{target_width}.{extension}", encode(resized, file_format),
+            )
+        generated.append(entry)
+    return {'source': source, 'width': width, 'height': height, 'sizes': generated}
+
+
+def is_current(instance, field: str) -> bool:
+    source = getattr(instance, field).name or ''
+    return (getattr(instance, derivatives_field(field)) or {}).get('source', '') == source
+
+
+def generate(model, pk, field: str) -> bool:
+    """ Bring the derivatives of `field` on one row up to date; False if there was nothing to do """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or is_current(instance, field):
+        return False
+
+    source = getattr(instance, field).name or ''
+    derivatives = {}
+    if source:
+        try:
+            derivatives = render(source)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as error:
+            logger.warning("Could not make derivatives of %s: %r", source, error)
+            # recorded without sizes so the same broken file is not retried on every save
+            derivatives = {'source': source, 'sizes': []}
+
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=pk).first()
+        # the image was replaced while rendering; its own job will follow
+        if instance is None or (getattr(instance, field).name or '') != source:
+            return False
+        setattr(instance, derivatives_field(field), derivatives)
+        # a regular save, so the usual post_save receivers refresh cached responses; the
+        # search and recommendation receivers skip it (see `only_derivatives`)
+        instance.save(update_fields=[derivatives_field(field)])
+    return True
+
+
+def run_job(model, pk, field: str):
+    try:
+        generate(model, pk, field)
+    except Exception:
+        logger.exception("Image derivative job for %s %s failed", model.__name__, pk)
+    finally:
+        close_old_connections()
+
+
+def schedule(model, pk, field: str):
+    """ Generate derivatives on the worker pool once the current transaction commits """
+    transaction.on_commit(lambda: executor.submit(run_job, model, pk, field))
+
+
+def referenced_files() -> set:
+    names = set()
+    for model, field in REGISTRY:
+        for derivatives in model.objects.exclude(**{derivatives_field(field): {}}).values_list(derivatives_field(field), flat=True).iterator():
+            for size in (derivatives or {}).get('sizes', []):
+                names.update(size[file_format] for file_format in FORMATS)
+    return names
@@ -0,0 +1,45 @@
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from mediaserver.derivatives import REGISTRY, derivatives_field, generate, referenced_files
+import constants
+
+# derivative files younger than this may belong to a job that has not saved its row yet
+PRUNE_GRACE = timedelta(hours=1)
+
+
+class Command(BaseCommand):
+    help = "Generate missing or stale image derivatives, optionally deleting derivative files no row uses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate the derivatives of every image")
+        parser.add_argument('--prune', action='store_true', help="Delete derivative files no row refers to")
+
+    def handle(self, *args, **options):
+        for model, field in REGISTRY:
+            processed = 0
+            rows = model.objects.values_list('pk', field, derivatives_field(field)).iterator()
+            for pk, source, derivatives in rows:
+                if options['force']:
+                    model.objects.filter(pk=pk).update(**{derivatives_field(field): {}})
+                elif (derivatives or {}).get('source', '') == (source or ''):
+                    continue
+                processed += generate(model, pk, field)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {processed} images processed")
+
+        if options['prune']:
+            self.prune()
+
+    def prune(self):
+        path = constants.IMAGE_DERIVATIVE_PATH
+        files = default_storage.listdir(path)[1] if default_storage.exists(path) else []
+        cutoff = timezone.now() - PRUNE_GRACE
+        referenced = referenced_files()
+        deleted = 0
+        for name in files:
+            name = path + name
+            if name not in referenced and default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+                deleted += 1
+        self.stdout.write(f"Deleted {deleted} unused derivative files")
@@ -0,0 +1,32 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from .derivatives import FORMATS, derivatives_field, is_current
+
+
+class ImageSrcsetField(serializers.Field):
+    """
+    `srcset` values for the derivatives of an image field, one per format:
+
+        {"webp": "https://.../3f2a...-160.webp 160w, https://.../3f2a...-480.webp 480w", "jpeg": "..."}
+
+    None while the derivatives are missing or were made from an older image.
+    """
+
+    def __init__(self, image_field: str = 'image', **kwargs):
+        self.image_field = image_field
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, instance):
+        derivatives = getattr(instance, derivatives_field(self.image_field)) or {}
+        if not derivatives.get('sizes') or not is_current(instance, self.image_field):
+            return None
+
+        request = self.context.get('request')
+        def url(name):
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            file_format: ', '.join(f"{url(size[file_format])} {size['width']}w" for size in derivatives['sizes'])
+            for file_format in FORMATS
+        }
@@ -0,0 +1,116 @@
+"""
+Responses for media files.
+
+Behind nginx (`MEDIA_ACCEL_REDIRECT`), Django only decides whether a file may
+be read and answers with an `X-Accel-Redirect` to the internal
+`MEDIA_ACCEL_PREFIX` location; nginx then sends the file itself with sendfile
+and handles Range / If-Range. Without nginx (local development, tests) the file
+is streamed from here, with support for a single byte range so that PDF
+viewers and resumable downloads behave the same.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+import constants
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# bytes read from disk per write of a partial response
+BLOCK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    The inclusive (first, last) byte of a single-range `Range` header, or None
+    to send the whole file (no header, a multi-range or unparseable request).
+    """
+    match = RANGE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    if size == 0:
+        # an empty file has no byte to send, not even for a suffix range
+        raise RangeNotSatisfiable
+    first, last = match.groups()
+    if not first:
+        # suffix range: the last N bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        raise RangeNotSatisfiable
+    if first > last:
+        return None
+    return first, last
+
+
+def read_range(path: str, first: int, last: int):
+    with open(path, 'rb') as file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining:
+            block = file.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def file_response(request, path: str) -> HttpResponse:
+    """ Send the file at `path` from Django, honouring a single-range request """
+    stat = os.stat(path)
+    last_modified = http_date(stat.st_mtime)
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    # a stale If-Range (the file changed since the client's copy) gets the whole file
+    if if_range is None or parse_http_date_safe(if_range) == int(stat.st_mtime):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{stat.st_size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'))
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(read_range(path, first, last), status=206)
+        response['Content-Range'] = f"bytes {first}-{last}/{stat.st_size}"
+        response['Content-Length'] = str(last - first + 1)
+        response['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def accel_response(name: str) -> HttpResponse:
+    """ Hand the file `name` to nginx's internal media location """
+    response = HttpResponse(content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+    response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+    return response
+
+
+def media_response(request, name: str, path: str, public: bool) -> HttpResponse:
+    response = accel_response(name) if settings.MEDIA_ACCEL_REDIRECT else file_response(request, path)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(os.path.basename(name))}"
+    response['X-Content-Type-Options'] = 'nosniff'
+    if name.startswith(constants.IMAGE_DERIVATIVE_PATH):
+        # content-hash names: a derivative never changes
+        patch_cache_control(response, public=True, immutable=True, max_age=int(constants.IMAGE_DERIVATIVE_MAX_AGE.total_seconds()))
+    elif public:
+        patch_cache_control(response, public=True, max_age=int(constants.MEDIA_PUBLIC_MAX_AGE.total_seconds()))
+    else:
+        # per-user documents must not be kept by shared caches
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
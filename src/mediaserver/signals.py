@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from .derivatives import REGISTRY, is_current, schedule
+
+
+def image_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for model, field in REGISTRY:
+        if sender is model and not is_current(instance, field):
+            schedule(model, instance.pk, field)
+
+
+for model, _ in REGISTRY:
+    post_save.connect(image_saved, sender=model, dispatch_uid=f"image_saved_{model.__name__}")
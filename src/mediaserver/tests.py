@@ -0,0 +1,230 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+from advsearch.store import get_catalogue_version
+from application.models import Application, DocumentUpload
+from course.cache import course_resource
+from course.models import Batch, Course, RequiredDocument
+from course.serializers import CourseSerializer
+from instituteadmin.models import InstituteAdmin
+from preference.models import EducationLevel, Location
+from preference.serializers import LocationSerializer
+from student.models import Student
+from user.models import User
+from user.tokens import AccountRefreshToken
+from httpcache import resource_version
+from . import derivatives
+import constants
+
+
+class MediaViewTest(TestCase):
+    CONTENT = bytes(range(256)) * 40
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        cls.other_institute = InstituteAdmin.objects.create(email='other@example.com', name='Other')
+        course = Course.objects.create(
+            offered_by=cls.institute, name='Course', slug='course', fee_amount=1000,
+            min_education_level=EducationLevel.objects.create(name='Graduate'), syllabus='docs/syllabus.pdf',
+        )
+        batch = Batch.objects.create(course=course, location=Location.objects.create(name='Pune'), commencement_date=date(2026, 1, 1))
+        cls.student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+        cls.other_student = Student.objects.create(email='other-student@example.com', full_name='Other', phone_number='+919876543211')
+        application = Application.objects.create(
+            full_name='Student', phone_number='+919876543210', email='student@example.com',
+            date_of_birth=date(2000, 1, 1), applied_by=cls.student, course=course, batch_selected=batch,
+        )
+        DocumentUpload.objects.create(
+            application=application, file='docs/marksheet.pdf',
+            document_details=RequiredDocument.objects.create(file_name='Marksheet', course=course),
+        )
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        media = override_settings(MEDIA_ROOT=root, MEDIA_ACCEL_REDIRECT=False)
+        media.enable()
+        self.addCleanup(media.disable)
+        for name in ('docs/marksheet.pdf', 'docs/syllabus.pdf', 'docs/orphan.pdf', 'images/logo.png'):
+            os.makedirs(os.path.join(root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(root, name), 'wb') as file:
+                file.write(self.CONTENT)
+
+    def get(self, name, user=None, headers=None):
+        client = APIClient()
+        if user:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccountRefreshToken.for_user(user).access_token}")
+        return client.get(f"/media/{name}", headers=headers)
+
+    def test_documents_are_only_served_to_the_applicant_and_institute(self):
+        for user in (self.student, self.institute):
+            response = self.get('docs/marksheet.pdf', user)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+            self.assertIn('private', response['Cache-Control'])
+
+        for user in (None, self.other_student, self.other_institute):
+            self.assertEqual(self.get('docs/marksheet.pdf', user).status_code, 404)
+
+        superuser = User.objects.create(email='root@example.com', is_staff=True, is_superuser=True)
+        client = APIClient()
+        client.force_login(superuser)
+        self.assertEqual(client.get('/media/docs/marksheet.pdf').status_code, 200)
+
+    def test_public_and_unknown_files(self):
+        for name in ('images/logo.png', 'docs/syllabus.pdf'):
+            response = self.get(name)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('public', response['Cache-Control'])
+
+        # on disk but not referenced by any course or application
+        self.assertEqual(self.get('docs/orphan.pdf', self.institute).status_code, 404)
+        self.assertEqual(self.get('images/../docs/marksheet.pdf').status_code, 404)
+        self.assertEqual(self.get('images/missing.png').status_code, 404)
+
+    def test_range_requests(self):
+        response = self.get('images/logo.png', headers={'Range': 'bytes=100-299'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f"bytes 100-299/{len(self.CONTENT)}")
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[100:300])
+
+        response = self.get('images/logo.png', headers={'Range': 'bytes=-10'})
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[-10:])
+
+        response = self.get('images/logo.png', headers={'Range': f"bytes={len(self.CONTENT)}-"})
+        self.assertEqual(response.status_code, 416)
+
+        open(os.path.join(settings.MEDIA_ROOT, 'images/empty.png'), 'wb').close()
+        for header in ('bytes=-10', 'bytes=0-'):
+            response = self.get('images/empty.png', headers={'Range': header})
+            self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */0'))
+
+        stale = self.get('images/logo.png', headers={'Range': 'bytes=0-9', 'If-Range': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        self.assertEqual(stale.status_code, 200)
+
+    def test_accel_redirect_leaves_the_bytes_to_nginx(self):
+        with self.settings(MEDIA_ACCEL_REDIRECT=True):
+            response = self.get('docs/marksheet.pdf', self.student)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/docs/marksheet.pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response.content, b'')
+
+
+class ImageDerivativeTest(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        # on-commit callbacks run here; keep the recommendation index out of them
+        media = override_settings(MEDIA_ROOT=root, MEDIA_ACCEL_REDIRECT=False, RECOMMENDATION_INDEX_PATH='')
+        media.enable()
+        self.addCleanup(media.disable)
+
+        # run jobs inline instead of on the worker threads
+        submit = mock.patch.object(derivatives.executor, 'submit', side_effect=lambda job, *args: derivatives.generate(*args))
+        self.submit = submit.start()
+        self.addCleanup(submit.stop)
+
+    def upload(self, name, size, mode='RGBA'):
+        buffer = io.BytesIO()
+        Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, format='PNG')
+        return default_storage.save(f"{constants.IMAGE_UPLOAD_PATH}{name}", ContentFile(buffer.getvalue()))
+
+    def create_location(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Location.objects.create(name='Pune', image=image)
+
+    def test_derivatives_are_generated_after_save(self):
+        location = self.create_location(self.upload('banner.png', (2000, 1000)))
+        location.refresh_from_db()
+
+        sizes = location.image_derivatives['sizes']
+        self.assertEqual([(size['name'], size['width'], size['height']) for size in sizes], [
+            ('thumb', 160, 80), ('card', 480, 240), ('hero', 1280, 640),
+        ])
+        for size in sizes:
+            for file_format, pillow_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+                self.assertTrue(size[file_format].startswith(constants.IMAGE_DERIVATIVE_PATH))
+                with default_storage.open(size[file_format]) as file:
+                    derived = Image.open(file)
+                    self.assertEqual((derived.format, derived.size), (pillow_format, (size['width'], size['height'])))
+
+        srcset = LocationSerializer(location).data['image_srcset']
+        self.assertEqual(srcset['webp'].count('w,'), 2)
+        self.assertIn(f"{sizes[0]['jpeg']} 160w", srcset['jpeg'])
+
+        # saving again without a new image does not redo the work
+        with self.captureOnCommitCallbacks(execute=True):
+            location.save()
+        self.assertEqual(self.submit.call_count, 1)
+
+    def test_small_images_are_not_upscaled_and_stale_derivatives_are_hidden(self):
+        location = self.create_location(self.upload('icon.png', (100, 40), mode='RGB'))
+        location.refresh_from_db()
+        self.assertEqual([size['width'] for size in location.image_derivatives['sizes']], [100])
+
+        with mock.patch.object(derivatives.executor, 'submit'):
+            location.image = self.upload('other.png', (300, 300))
+            location.save()
+        self.assertIsNone(LocationSerializer(location).data['image_srcset'])
+
+    def test_course_cards_need_no_extra_queries(self):
+        institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(
+                offered_by=institute, name='Course', slug='course', fee_amount=1000,
+                min_education_level=EducationLevel.objects.create(name='Graduate'), image=self.upload('course.png', (800, 400)),
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            data = CourseSerializer(Course.objects.cards(), many=True).data
+        self.assertEqual(len(queries), 1)
+        self.assertIn('480w', data[0]['image_srcset']['webp'])
+
+        response = APIClient().get(f"/media/{Course.objects.get().image_derivatives['sizes'][0]['webp']}")
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_derivative_saves_leave_search_and_recommendations_alone(self):
+        institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+        with mock.patch.object(derivatives.executor, 'submit'), self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(
+                offered_by=institute, name='Course', slug='course', fee_amount=1000,
+                min_education_level=EducationLevel.objects.create(name='Graduate'), image=self.upload('course.png', (800, 400)),
+            )
+        catalogue = get_catalogue_version()
+        version = resource_version(course_resource(course.pk))
+
+        with mock.patch('advsearch.signals.get_search_engine') as engine, self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(derivatives.generate(Course, course.pk, 'image'))
+
+        self.assertEqual(get_catalogue_version(), catalogue)
+        engine.assert_not_called()
+        # the course payloads carry the srcset, so their stamp still moves
+        self.assertNotEqual(resource_version(course_resource(course.pk)), version)
+
+    def test_prune_keeps_referenced_files(self):
+        location = self.create_location(self.upload('banner.png', (600, 300)))
+        location.refresh_from_db()
+        orphan = default_storage.save(f"{constants.IMAGE_DERIVATIVE_PATH}orphan-160.webp", ContentFile(b'old'))
+        for name in [orphan] + [size['webp'] for size in location.image_derivatives['sizes']]:
+            os.utime(default_storage.path(name), (0, 0))
+
+        call_command('generate_image_derivatives', '--prune', stdout=io.StringIO())
+
+        self.assertFalse(default_storage.exists(orphan))
+        for size in location.image_derivatives['sizes']:
+            self.assertTrue(default_storage.exists(size['webp']))
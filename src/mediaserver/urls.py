@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import MediaView
+
+# no format suffixes: file names have extensions of their own
+urlpatterns = [
+    path('<path:name>', MediaView.as_view(), name='media'),
+]
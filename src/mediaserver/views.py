@@ -0,0 +1,58 @@
+import os
+import posixpath
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from user.authentication import CustomJWTAuthentication
+from .access import PUBLIC, visibility
+from .serve import media_response
+
+
+class MediaView(APIView):
+    """
+    Endpoint serving uploaded files from MEDIA_ROOT after an access check.
+
+    - **GET**: The file, or a 404 if it does not exist or the user may not read it.
+
+    Permissions:
+        - Images and course syllabus / fee breakdown files: anyone.
+        - Application documents: the applicant, the institute applied to and superusers,
+          authenticated with a JWT or an admin session.
+    """
+    authentication_classes = [CustomJWTAuthentication, SessionAuthentication]
+    permission_classes = [AllowAny]
+
+    def get(self, request, name):
+        """
+        Serve a media file.
+
+        Path Parameters:
+            - `name` (str): Path of the file relative to MEDIA_ROOT, as stored in the file field.
+
+        Headers:
+            - `Range` (optional): A single byte range, e.g. `bytes=0-1023`.
+
+        Returns:
+            - **200 OK** / **206 Partial Content**: The file or the requested range.
+            - **404 Not Found**: If the file does not exist or the user may not read it.
+            - **416 Range Not Satisfiable**: If the range starts past the end of the file.
+
+        Example Usage:
+            GET /media/docs/marksheet.pdf
+        """
+        path = None
+        # access is decided on the name, so it must be the canonical one (no `..`, `.` or `//`)
+        if posixpath.normpath(name) == name and not name.startswith('/'):
+            try:
+                path = safe_join(settings.MEDIA_ROOT, name)
+            except SuspiciousFileOperation:
+                pass
+        access = visibility(request.user, name) if path else None
+        if access is None or not os.path.isfile(path):
+            return Response({ 'message': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        return media_response(request, name, path, public=access == PUBLIC)
@@ -0,0 +1,26 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Notification
+from .outbox import scrubbed
+
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('channel', 'status', 'attempts', 'created_at', 'available_at', 'sent_at')
+    list_filter = ('channel', 'status')
+    # the raw payload is never shown; `details` leaves out sealed secrets
+    exclude = ('payload',)
+    readonly_fields = ('channel', 'details', 'attempts', 'last_error', 'created_at', 'locked_at', 'sent_at')
+    actions = ['retry']
+
+    @admin.display(description="Payload")
+    def details(self, obj):
+        return scrubbed(obj.payload)
+
+    @admin.action(description="Retry selected notifications")
+    def retry(self, request, queryset):
+        queryset.exclude(status=Notification.Status.SENT).update(
+            status=Notification.Status.PENDING, attempts=0, available_at=timezone.now(), locked_at=None,
+        )
+
+
+admin.site.register(Notification, NotificationAdmin)
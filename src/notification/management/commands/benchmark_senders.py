@@ -0,0 +1,135 @@
+import json
+import socketserver
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from emailclient.pool import SMTPConnectionPool
+from smsclient.sender import build_twilio_client
+import constants
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for Django's backend: accepts and discards every message."""
+
+    def handle(self):
+        time.sleep(self.server.handshake)
+        self.reply('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.reply('250-stub', '250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 end with <CRLF>.<CRLF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 OK')
+
+    def reply(self, *lines):
+        self.wfile.write(''.join(f"{line}\r\n" for line in lines).encode())
+
+
+class TwilioStubHandler(BaseHTTPRequestHandler):
+    """Answers every POST like the Messages resource does."""
+
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes; with Nagle the body waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        time.sleep(self.server.handshake)
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'sid': 'SM' + '0' * 32, 'status': 'queued'}).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Command(BaseCommand):
+    help = "Compare per-message latency of fresh vs pooled SMTP / Twilio clients against local stub servers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument(
+            '--handshake-ms', type=float, default=20,
+            help="Delay the stubs add to every new connection, standing in for TCP + TLS setup",
+        )
+
+    def handle(self, *args, **options):
+        handshake = options['handshake_ms'] / 1000
+        smtp_server = self.serve(ThreadingSMTPServer(('127.0.0.1', 0), SMTPStubHandler), handshake)
+        http_server = self.serve(ThreadingHTTPServer(('127.0.0.1', 0), TwilioStubHandler), handshake)
+        count = options['messages']
+
+        email_settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=smtp_server.server_address[1],
+            EMAIL_USE_TLS=False, EMAIL_USE_SSL=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+        )
+        sms_settings = override_settings(TWILIO_ACCOUNT_SID='AC' + '0' * 32, TWILIO_AUTH_TOKEN='benchmark')
+        base_url = f"http://127.0.0.1:{http_server.server_address[1]}"
+
+        try:
+            with email_settings, sms_settings:
+                message = EmailMessage('Benchmark', 'Hello', 'from@example.com', ['to@example.com'])
+                pool = SMTPConnectionPool(constants.EMAIL_POOL_SIZE, constants.EMAIL_KEEPALIVE)
+                self.report('SMTP fresh connection', self.measure(count, lambda: get_connection().send_messages([message])))
+                self.report('SMTP pooled', self.measure(count, lambda: pool.send_messages([message])))
+                batch = [message] * count
+                self.report(f'SMTP pooled batch of {count}', self.measure(1, lambda: pool.send_messages(batch)), count)
+                pool.close()
+
+                def send_sms(client):
+                    client.messages.create(body='Your OTP is 123456.', from_='+15005550006', to='+919876543210')
+
+                self.report('Twilio fresh client', self.measure(count, lambda: send_sms(build_twilio_client(base_url))))
+                client = build_twilio_client(base_url)
+                self.report('Twilio shared client', self.measure(count, lambda: send_sms(client)))
+        finally:
+            smtp_server.shutdown()
+            http_server.shutdown()
+
+    def serve(self, server, handshake):
+        server.handshake = handshake
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def measure(self, count, send) -> list:
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            send()
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    def report(self, label, timings, per_call=1):
+        per_message = [timing / per_call for timing in timings]
+        p95 = sorted(per_message)[int(len(per_message) * 0.95)]
+        self.stdout.write(
+            f"{label:<28} mean {statistics.mean(per_message) * 1000:7.3f} ms/message"
+            f"   p95 {p95 * 1000:7.3f} ms"
+        )
@@ -0,0 +1,45 @@
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+from emailclient.pool import smtp_pool
+from notification.outbox import process_batch
+import constants
+
+
+class Command(BaseCommand):
+    help = "Deliver queued email / SMS notifications from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the due notifications once and exit")
+        parser.add_argument('--batch-size', type=int, default=constants.NOTIFICATION_BATCH_SIZE)
+        parser.add_argument(
+            '--interval', type=float, default=constants.NOTIFICATION_POLL_INTERVAL.total_seconds(),
+            help="Seconds to sleep when the outbox is empty",
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while self.running:
+            close_old_connections()
+            try:
+                claimed = process_batch(options['batch_size'])
+            except DatabaseError as error:
+                # e.g. the database is still starting up or migrating
+                self.stderr.write(f"Outbox unavailable: {error!r}")
+                claimed = 0
+                if options['once']:
+                    raise
+
+            if options['once'] and not claimed:
+                break
+            if not claimed:
+                time.sleep(options['interval'])
+
+        smtp_pool.close()
+
+    def stop(self, *args):
+        self.running = False
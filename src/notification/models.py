@@ -0,0 +1,35 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Notification(models.Model):
+    """ Outbound email / SMS waiting in the outbox for the notification worker """
+    class Meta:
+        verbose_name_plural = 'Notifications'
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='notification_due_idx'),
+        ]
+
+    class Channel(models.TextChoices):
+        EMAIL = 'EMAIL', 'email'
+        SMS = 'SMS', 'sms'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'pending'
+        SENDING = 'SENDING', 'sending'
+        SENT = 'SENT', 'sent'
+        DEAD = 'DEAD', 'dead'
+
+    channel = models.CharField(max_length=10, choices=Channel.choices)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_channel_display()} notification ({self.get_status_display()})"
@@ -0,0 +1,153 @@
+"""
+Transactional outbox for outbound email and SMS.
+
+Request handlers only insert a `Notification` row (inside their own
+transaction, so nothing is sent for rolled back work). The
+`run_notification_worker` command claims due rows with
+`SELECT ... FOR UPDATE SKIP LOCKED`, so several workers never pick the same
+row, and delivers them. Failures are retried with exponential backoff until
+`NOTIFICATION_MAX_ATTEMPTS`, after which the row is parked as DEAD for
+inspection in the admin.
+
+Secrets (OTPs, the body of emails carrying reset / verification links) are
+never stored in the clear: they are sealed into the payload with
+`tokenservice`, expiring with the secret itself, opened only by the worker at
+send time and dropped once the notification is SENT or DEAD.
+"""
+import random
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from emailclient.pool import smtp_pool
+from smsclient.sender import SmsClient
+from .models import Notification
+import constants
+import tokenservice
+
+
+def deliver_email(payload: dict):
+    message = EmailMessage(payload['subject'], payload['message'], payload['from_email'], payload['recipients'])
+    smtp_pool.send_messages([message])
+
+
+def deliver_sms(payload: dict):
+    SmsClient().send(phone_number=payload['phone_number'], otp=payload['otp'])
+
+
+HANDLERS = {
+    Notification.Channel.EMAIL: deliver_email,
+    Notification.Channel.SMS: deliver_sms,
+}
+
+SEALED_FIELD = 'sealed'
+# dropped from the payload once a notification is finished; `otp` is only
+# present in the clear on rows queued before secrets were sealed
+SCRUBBED_FIELDS = (SEALED_FIELD, 'otp')
+
+
+def seal(payload: dict, secrets: dict, lifetime) -> dict:
+    """`payload` with `secrets` encrypted into it, readable until `lifetime` from now"""
+    return {**payload, SEALED_FIELD: tokenservice.encode({**secrets, 'exp': timezone.now() + lifetime})}
+
+
+def unseal(payload: dict) -> dict:
+    """`payload` with its sealed secrets in the clear; raises `tokenservice.TokenError` once they expired"""
+    if SEALED_FIELD not in payload:
+        return payload
+    secrets = tokenservice.decode(payload[SEALED_FIELD])
+    secrets.pop('exp')
+    return {**{key: value for key, value in payload.items() if key != SEALED_FIELD}, **secrets}
+
+
+def enqueue_email(subject: str, message: str, recipients: list, from_email: str = None, sealed_for=None) -> Notification:
+    """Queue an email; pass `sealed_for` (a timedelta) when `message` carries a secret valid that long."""
+    payload = {
+        'subject': subject,
+        'from_email': from_email or settings.EMAIL_HOST_USER,
+        'recipients': list(recipients),
+    }
+    if sealed_for is None:
+        payload['message'] = message
+    else:
+        payload = seal(payload, {'message': message}, sealed_for)
+    return Notification.objects.create(channel=Notification.Channel.EMAIL, payload=payload)
+
+
+def enqueue_sms(phone_number: str, otp: str) -> Notification:
+    return Notification.objects.create(
+        channel=Notification.Channel.SMS,
+        payload=seal({'phone_number': phone_number}, {'otp': otp}, constants.OTP_EXP_TIME),
+    )
+
+
+def claim(batch_size: int) -> list:
+    """Lock up to `batch_size` due notifications for this worker."""
+    now = timezone.now()
+    due = Q(status=Notification.Status.PENDING, available_at__lte=now)
+    # rows of a worker that died mid-delivery
+    abandoned = Q(status=Notification.Status.SENDING, locked_at__lt=now - constants.NOTIFICATION_LOCK_TIMEOUT)
+
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(due | abandoned)
+            .order_by('available_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        Notification.objects.filter(id__in=ids).update(
+            status=Notification.Status.SENDING, locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(Notification.objects.filter(id__in=ids).order_by('available_at'))
+
+
+def backoff(attempts: int):
+    delay = min(constants.NOTIFICATION_RETRY_MAX, constants.NOTIFICATION_RETRY_BASE * 2 ** (attempts - 1))
+    # jitter so a burst of failures does not retry in lockstep
+    return delay * random.uniform(0.75, 1)
+
+
+def scrubbed(payload: dict) -> dict:
+    return {key: value for key, value in payload.items() if key not in SCRUBBED_FIELDS}
+
+
+def deliver(notification: Notification) -> bool:
+    """Send a claimed notification, recording the outcome. Returns whether it was sent."""
+    try:
+        payload = unseal(notification.payload)
+    except tokenservice.TokenError as error:
+        # the secret expired while queued; sending it now would be useless
+        Notification.objects.filter(id=notification.id).update(
+            status=Notification.Status.DEAD, locked_at=None, last_error=repr(error), payload=scrubbed(notification.payload),
+        )
+        return False
+
+    try:
+        HANDLERS[notification.channel](payload)
+    except Exception as error:
+        now = timezone.now()
+        failed = Notification.objects.filter(id=notification.id)
+        if notification.attempts >= constants.NOTIFICATION_MAX_ATTEMPTS:
+            failed.update(status=Notification.Status.DEAD, locked_at=None, last_error=repr(error), payload=scrubbed(notification.payload))
+        else:
+            failed.update(
+                status=Notification.Status.PENDING,
+                locked_at=None,
+                last_error=repr(error),
+                available_at=now + backoff(notification.attempts),
+            )
+        return False
+
+    Notification.objects.filter(id=notification.id).update(
+        status=Notification.Status.SENT, locked_at=None, sent_at=timezone.now(), last_error='', payload=scrubbed(notification.payload),
+    )
+    return True
+
+
+def process_batch(batch_size: int = constants.NOTIFICATION_BATCH_SIZE) -> int:
+    """Claim and deliver one batch; returns how many notifications were claimed."""
+    notifications = claim(batch_size)
+    for notification in notifications:
+        deliver(notification)
+    return len(notifications)
@@ -0,0 +1,86 @@
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from smsclient import sender
+from .models import Notification
+from .admin import NotificationAdmin
+from .outbox import enqueue_email, enqueue_sms, process_batch
+import constants
+
+
+@override_settings(SMS_TYPE='LOCMEM')
+class OutboxTest(TestCase):
+    def setUp(self):
+        sender.outbox.clear()
+
+    def test_queued_notifications_are_delivered_by_the_worker(self):
+        enqueue_email('Subject', 'Body', ['student@example.com'])
+        enqueue_sms('+919876543210', '123456')
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(process_batch(), 2)
+
+        self.assertEqual(mail.outbox[0].to, ['student@example.com'])
+        self.assertEqual(sender.outbox, [{'phone_number': '+919876543210', 'otp': '123456'}])
+        self.assertEqual(Notification.objects.filter(status=Notification.Status.SENT).count(), 2)
+        # the code is not kept once it has been sent
+        self.assertEqual(Notification.objects.get(channel=Notification.Channel.SMS).payload, {'phone_number': '+919876543210'})
+        self.assertEqual(process_batch(), 0)
+
+    def test_failures_back_off_then_dead_letter(self):
+        notification = enqueue_sms('+919876543210', '123456')
+
+        failing = mock.Mock(side_effect=ConnectionError('twilio down'))
+        with mock.patch.dict('notification.outbox.HANDLERS', {Notification.Channel.SMS: failing}):
+            for attempt in range(1, constants.NOTIFICATION_MAX_ATTEMPTS + 1):
+                self.assertEqual(process_batch(), 1)
+                notification.refresh_from_db()
+                self.assertEqual(notification.attempts, attempt)
+                if notification.status == Notification.Status.PENDING:
+                    self.assertGreater(notification.available_at, timezone.now())
+                    # not due yet
+                    self.assertEqual(process_batch(), 0)
+                    Notification.objects.filter(id=notification.id).update(available_at=timezone.now())
+
+        self.assertEqual(notification.status, Notification.Status.DEAD)
+        self.assertIn('twilio down', notification.last_error)
+        self.assertNotIn('sealed', notification.payload)
+
+    def test_abandoned_claims_are_picked_up_again(self):
+        notification = enqueue_email('Subject', 'Body', ['student@example.com'])
+        Notification.objects.filter(id=notification.id).update(
+            status=Notification.Status.SENDING, locked_at=timezone.now() - constants.NOTIFICATION_LOCK_TIMEOUT - timedelta(seconds=1),
+        )
+
+        self.assertEqual(process_batch(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_secrets_are_sealed_while_queued(self):
+        sms = enqueue_sms('+919876543210', '123456')
+        email = enqueue_email('Reset', 'https://example.com/reset/secret-token', ['student@example.com'], sealed_for=timedelta(minutes=5))
+        for notification in (sms, email):
+            notification.refresh_from_db()
+            self.assertNotIn('123456', str(notification.payload))
+            self.assertNotIn('secret-token', str(notification.payload))
+            self.assertNotIn('secret-token', str(NotificationAdmin.details(None, notification)))
+
+        self.assertEqual(process_batch(), 2)
+
+        self.assertEqual(mail.outbox[0].body, 'https://example.com/reset/secret-token')
+        self.assertEqual(sender.outbox, [{'phone_number': '+919876543210', 'otp': '123456'}])
+        email.refresh_from_db()
+        self.assertEqual(set(email.payload), {'subject', 'from_email', 'recipients'})
+
+    def test_expired_secrets_are_not_sent(self):
+        notification = enqueue_email('Reset', 'link', ['student@example.com'], sealed_for=timedelta(minutes=5))
+
+        with mock.patch('tokenservice.time.time', return_value=time.time() + 600):
+            self.assertEqual(process_batch(), 1)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.DEAD)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertNotIn('sealed', notification.payload)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PreferenceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'preference'
+
+    def ready(self):
+        from . import signals
@@ -74,6 +74,7 @@ class Location(models.Model):
         
     name = models.CharField(max_length=255, unique=True, null=False)
     image = models.ImageField(upload_to=constants.IMAGE_UPLOAD_PATH, blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     # students[]
     
     def __str__(self):
@@ -86,6 +87,7 @@ class Interest(models.Model):
         
     name = models.CharField(max_length=25, unique=True, null=False, default='default-interest')
     image = models.ImageField(upload_to=constants.IMAGE_UPLOAD_PATH, blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     # students[]
     # courses[]
     
@@ -99,6 +101,7 @@ class EducationLevel(models.Model):
         
     name = models.CharField(max_length=25, unique=True, null=False, default='default-edu-level')
     image = models.ImageField(upload_to=constants.IMAGE_UPLOAD_PATH, blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     # students[]
     # courses
     
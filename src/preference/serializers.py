@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from mediaserver.serializers import ImageSrcsetField
 from .models import Tag, Interest, Location, EducationLevel
 
 class TagSerialzer(serializers.ModelSerializer):
@@ -7,16 +8,22 @@ class TagSerialzer(serializers.ModelSerializer):
         fields = '__all__'
 
 class InterestSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField('image')
+
     class Meta:
         model = Interest
-        fields = '__all__'
+        exclude = ['image_derivatives']
 
 class LocationSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField('image')
+
     class Meta:
         model = Location
-        fields = '__all__'
+        exclude = ['image_derivatives']
 
 class EducationLevelSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField('image')
+
     class Meta:
         model = EducationLevel
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['image_derivatives']
\ No newline at end of file
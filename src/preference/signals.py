@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from httpcache import bump_versions
+from .models import Tag, Exam, Stream, Skill, Interest, Location, EducationLevel
+
+# version stamps of the list endpoints, see `httpcache.conditional_get`
+RESOURCES = {
+    Tag: 'tag',
+    Exam: 'tag',
+    Stream: 'tag',
+    Skill: 'tag',
+    Interest: 'interest',
+    Location: 'location',
+    EducationLevel: 'education-level',
+}
+
+
+def preference_changed(sender, **kwargs):
+    bump_versions(RESOURCES[sender])
+
+
+for model in RESOURCES:
+    post_save.connect(preference_changed, sender=model, dispatch_uid=f"preference_saved_{model.__name__}")
+    post_delete.connect(preference_changed, sender=model, dispatch_uid=f"preference_deleted_{model.__name__}")
@@ -5,6 +5,7 @@ from rest_framework.permissions import AllowAny
 from .models import Tag, Exam, Skill, Stream, Interest, Location, EducationLevel
 from .serializers import TagSerialzer, InterestSerializer, LocationSerializer, EducationLevelSerializer
 from rest_framework.status import HTTP_200_OK
+from httpcache import conditional_get
 # Create your views here.
 class TagListView(APIView):
     """
@@ -24,6 +25,8 @@ class TagListView(APIView):
     """
     
     permission_classes = [AllowAny]
+
+    @conditional_get(lambda request: ['tag'])
     def get(self, _):
         obj = Tag.objects.all()
         serializer = TagSerialzer(obj, many=True)
@@ -47,6 +50,8 @@ class TagStreamListView(APIView):
     """
     
     permission_classes = [AllowAny]
+
+    @conditional_get(lambda request: ['tag'])
     def get(self, _):
         obj = Stream.objects.all()
         serializer = TagSerialzer(obj, many=True)
@@ -70,6 +75,8 @@ class TagSkillListView(APIView):
     """
     
     permission_classes = [AllowAny]
+
+    @conditional_get(lambda request: ['tag'])
     def get(self, _):
         obj = Skill.objects.all()
         serializer = TagSerialzer(obj, many=True)
@@ -93,6 +100,8 @@ class TagExamListView(APIView):
     """
     
     permission_classes = [AllowAny]
+
+    @conditional_get(lambda request: ['tag'])
     def get(self, _):
         obj = Exam.objects.all()
         serializer = TagSerialzer(obj, many=True)
@@ -116,6 +125,8 @@ class InterestListView(APIView):
     """
     
     permission_classes = [AllowAny]
+
+    @conditional_get(lambda request: ['interest'])
     def get(self, _):
         obj = Interest.objects.all()
         serializer = InterestSerializer(obj, many=True)
@@ -139,6 +150,8 @@ class LocationListView(APIView):
     """
     
     permission_classes = [AllowAny]
+
+    @conditional_get(lambda request: ['location'])
     def get(self, _):
         obj = Location.objects.all()
         serializer = LocationSerializer(obj, many=True)
@@ -162,6 +175,8 @@ class EducationLevelListView(APIView):
     """
     
     permission_classes = [AllowAny]
+
+    @conditional_get(lambda request: ['education-level'])
     def get(self, _):
         obj = EducationLevel.objects.all()
         serializer = EducationLevelSerializer(obj, many=True)
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class SmsclientConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'smsclient'
+
+    def ready(self):
+        from utils import shared_cache_check
+        checks.register(shared_cache_check("OTP rate limits", 'smsclient.E001'))
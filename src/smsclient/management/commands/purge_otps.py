@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from smsclient.models import Otp
+import constants
+
+
+class Command(BaseCommand):
+    help = "Delete OTPs that expired or were used more than OTP_RETENTION ago (run hourly by the maintenance service)"
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - constants.OTP_RETENTION
+        deleted, _ = Otp.objects.filter(Q(expires_at__lt=cutoff) | Q(used_at__lt=cutoff)).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} OTPs"))
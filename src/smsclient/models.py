@@ -1,27 +1,66 @@
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
 import constants
 from utils import generate_otp
 from enum import Enum
+def otp_expiry():
+    return timezone.now() + constants.OTP_EXP_TIME
+
+
+def hash_otp(phone_number: str, code: str) -> str:
+    return salted_hmac('smsclient.Otp', f"{phone_number}:{code}", algorithm='sha256').hexdigest()
+
+
 class Otp(models.Model):
-    """ OTP Model"""
+    """ OTP Model, only a keyed hash of the code is stored """
     class Meta:
         verbose_name_plural = 'One Time Passwords'
+        indexes = [
+            models.Index(fields=['phone_number', 'created_at'], name='otp_phone_created_idx'),
+            models.Index(fields=['expires_at'], name='otp_expires_idx'),
+        ]
     
     phone_number = models.CharField(max_length=20, unique=False)
-    otp = models.CharField(max_length=6, unique=False, default=generate_otp)
+    code_hash = models.CharField(max_length=64)
+    attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(default=otp_expiry)
+    used_at = models.DateTimeField(null=True, blank=True)
+    
+    @classmethod
+    def issue(cls, phone_number: str) -> tuple:
+        """Create an OTP for `phone_number`, returning the row and the plain code to send."""
+        code = generate_otp()
+        otp = cls.objects.create(phone_number=phone_number, code_hash=hash_otp(phone_number, code))
+        return otp, code
+    
+    def verify(self, code: str) -> bool:
+        """
+        Check `code`, counting the attempt first so concurrent guesses cannot
+        exceed `OTP_MAX_ATTEMPTS`. A matching OTP is consumed.
+        """
+        now = timezone.now()
+        live = Otp.objects.filter(pk=self.pk, used_at=None, expires_at__gt=now)
+        if not live.filter(attempts__lt=constants.OTP_MAX_ATTEMPTS).update(attempts=F('attempts') + 1):
+            return False
+        if not constant_time_compare(self.code_hash, hash_otp(self.phone_number, code)):
+            return False
+        return live.update(used_at=now) == 1
+    
     def is_valid(self) -> bool:
-        return (timezone.now()) > self.created_at + constants.OTP_EXP_TIME
+        return self.used_at is None and self.attempts < constants.OTP_MAX_ATTEMPTS and timezone.now() < self.expires_at
         
     def get_expiration_time(self):
-        return self.created_at + constants.OTP_EXP_TIME
+        return self.expires_at
     
     def __str__(self):
-        return f"OTP: {self.phone_number}, {self.otp}, {'(expired)' if self.exp > timezone.now() else ''}"
+        return f"OTP: {self.phone_number}{'' if self.is_valid() else ' (expired)'}"
     
     
 class SmsType(Enum):
     TEST = 'TEST_FUNC'
     TWILIO = 'TWILIO'
-    FAST2SMS = 'FAST2SMS'
\ No newline at end of file
+    FAST2SMS = 'FAST2SMS'
+    LOCMEM = 'LOCMEM'
\ No newline at end of file
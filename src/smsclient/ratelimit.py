@@ -0,0 +1,96 @@
+"""
+Sliding-window rate limiting on top of the Django cache.
+
+Each identifier keeps a counter for the current and the previous fixed
+window; the previous count is weighted by how much of it still overlaps the
+sliding window. That approximates a true sliding log with two cache keys per
+identifier and works with any cache backend that supports `incr`.
+
+An attempt is counted with an atomic `incr` first and taken back if it turns
+out to be over the limit, so concurrent requests cannot both slip under it.
+The counters have to live in a cache shared by all workers (see `CACHE_URL`),
+or each worker enforces its own copy of the limit; a process-local cache fails
+the `smsclient.E001` check in production.
+"""
+import math
+import time
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+import constants
+
+
+class SlidingWindowRateLimiter:
+    def __init__(self, scope: str, limit: int, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window.total_seconds()
+
+    def key(self, identifier: str, index: int) -> str:
+        return f"ratelimit:{self.scope}:{identifier}:{index}"
+
+    def hit(self, identifier: str, now: float = None) -> float:
+        """
+        Record an attempt for `identifier`. Returns 0 when it is allowed, or the
+        number of seconds to wait when the limit is reached (the attempt is then
+        not counted).
+        """
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        current_key, previous_key = self.key(identifier, index), self.key(identifier, index - 1)
+
+        # kept for two windows so it still counts while it is the previous one
+        cache.add(current_key, 0, timeout=math.ceil(2 * self.window))
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # evicted between add and incr
+            cache.set(current_key, 1, timeout=math.ceil(2 * self.window))
+            current = 1
+        previous = cache.get(previous_key, 0)
+
+        elapsed = now % self.window
+        if previous * (1 - elapsed / self.window) + current > self.limit:
+            self.unhit(identifier, now)
+            return self.retry_after(elapsed, previous, current - 1)
+        return 0
+
+    def unhit(self, identifier: str, now: float):
+        """Take back an attempt recorded by `hit(identifier, now)`."""
+        try:
+            cache.decr(self.key(identifier, int(now // self.window)))
+        except ValueError:
+            pass
+
+    def retry_after(self, elapsed: float, previous: int, current: int) -> int:
+        """Seconds until the weighted count drops enough to allow one more attempt."""
+        room = self.limit - 1
+        if current <= room and previous:
+            return self.seconds((1 - (room - current) / previous) * self.window - elapsed)
+        # the current window has to turn into the previous one and decay from there
+        return self.seconds(self.window - elapsed + (1 - room / current) * self.window)
+
+    @staticmethod
+    def seconds(wait: float) -> int:
+        # round off float noise before rounding up to whole seconds
+        return max(1, math.ceil(round(wait, 6)))
+
+
+otp_send_per_phone = SlidingWindowRateLimiter('otp-send-phone', constants.OTP_PHONE_SEND_LIMIT, constants.OTP_SEND_WINDOW)
+otp_send_per_ip = SlidingWindowRateLimiter('otp-send-ip', constants.OTP_IP_SEND_LIMIT, constants.OTP_SEND_WINDOW)
+otp_verify_per_ip = SlidingWindowRateLimiter('otp-verify-ip', constants.OTP_IP_VERIFY_LIMIT, constants.OTP_VERIFY_WINDOW)
+
+
+def enforce(*checks):
+    """
+    Hit every `(limiter, identifier)` pair, raising `Throttled` (429) if any is
+    over its limit. A rejected request is not counted against any of them.
+    """
+    now = time.time()
+    counted = []
+    for limiter, identifier in checks:
+        wait = limiter.hit(identifier, now)
+        if wait:
+            for counted_limiter, counted_identifier in counted:
+                counted_limiter.unhit(counted_identifier, now)
+            raise Throttled(wait=wait)
+        counted.append((limiter, identifier))
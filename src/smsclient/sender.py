@@ -1,8 +1,48 @@
+import threading
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
+from urllib3.util.retry import Retry
 from django.conf import settings 
 import constants
 from .models import SmsType
 
+# messages sent with SMS_TYPE=LOCMEM, for tests (like django.core.mail.outbox)
+outbox = []
+
+_twilio_client = None
+_twilio_lock = threading.Lock()
+
+
+def build_twilio_client(base_url: str = '') -> Client:
+    """
+    A Twilio client whose HTTP session keeps its connections alive. Only
+    failures to connect are retried: a request that reached Twilio may have
+    sent the SMS already.
+    """
+    http_client = TwilioHttpClient(timeout=constants.SMS_HTTP_TIMEOUT.total_seconds())
+    adapter = HTTPAdapter(
+        pool_maxsize=constants.SMS_HTTP_POOL_SIZE,
+        max_retries=Retry(total=2, connect=2, read=0, status=0, other=0, allowed_methods=None),
+    )
+    http_client.session.mount('https://', adapter)
+    http_client.session.mount('http://', adapter)
+
+    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client)
+    if base_url:
+        client.api.base_url = base_url.rstrip('/')
+    return client
+
+
+def get_twilio_client() -> Client:
+    """The process-wide Twilio client, shared by all threads."""
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_lock:
+            if _twilio_client is None:
+                _twilio_client = build_twilio_client(settings.TWILIO_API_BASE_URL)
+    return _twilio_client
+
 
 class SmsClient:
     def __init__(self):
@@ -18,6 +58,8 @@ class SmsClient:
             return self.twilio(phone_number, otp)
         elif self.type == SmsType.FAST2SMS:
             return self.fast2sms(phone_number, otp)
+        elif self.type == SmsType.LOCMEM:
+            return self.locmem(phone_number, otp)
         else:
             return self.test_sms(phone_number, otp)
     
@@ -25,9 +67,12 @@ class SmsClient:
         print(f"Test SMS: {otp} (phone number: {phone_number})")
         return "test-sms"
     
+    def locmem(self, phone_number: str, otp: str) -> str:
+        outbox.append({'phone_number': phone_number, 'otp': otp})
+        return f"locmem-sms-{len(outbox)}"
+    
     def twilio(self, phone_number: str, otp: str) -> str:
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        message = client.messages.create(
+        message = get_twilio_client().messages.create(
             body=f"Your OTP is {otp}. It is valid for {self.timedelta_to_string(constants.OTP_EXP_TIME)}.",
             from_=settings.TWILIO_PHONE_NUMBER,
             to=phone_number    
@@ -40,6 +85,7 @@ class SmsClient:
         return "not-implemented"
     
     
+    @staticmethod
     def timedelta_to_string(td):
         seconds = int(td.total_seconds())
         minutes = (seconds // 60) % 60
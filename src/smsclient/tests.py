@@ -1,3 +1,133 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIClient
+from notification.models import Notification
+from notification.outbox import unseal
+from student.models import Student
+from .models import Otp
+from .ratelimit import SlidingWindowRateLimiter, enforce
+from . import sender
+import constants
 
-# Create your tests here.
+PHONE_NUMBER = '+919876543210'
+
+
+class OtpTest(TestCase):
+    def test_code_is_stored_hashed_and_consumed_once(self):
+        otp, code = Otp.issue(PHONE_NUMBER)
+
+        self.assertNotIn(code, otp.code_hash)
+        self.assertTrue(otp.verify(code))
+        self.assertFalse(otp.verify(code))
+
+    def test_attempts_are_capped(self):
+        otp, code = Otp.issue(PHONE_NUMBER)
+        wrong = '000000' if code != '000000' else '111111'
+
+        for _ in range(constants.OTP_MAX_ATTEMPTS):
+            self.assertFalse(otp.verify(wrong))
+
+        self.assertFalse(otp.verify(code))
+
+    def test_expired_code_is_rejected(self):
+        otp, code = Otp.issue(PHONE_NUMBER)
+        Otp.objects.filter(pk=otp.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertFalse(otp.verify(code))
+
+
+class SlidingWindowRateLimiterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_within_window(self):
+        limiter = SlidingWindowRateLimiter('test', 3, timedelta(minutes=10))
+        with mock.patch('smsclient.ratelimit.time.time', return_value=6000.0):
+            self.assertEqual([limiter.hit('a') for _ in range(3)], [0, 0, 0])
+            self.assertGreater(limiter.hit('a'), 0)
+            self.assertEqual(limiter.hit('b'), 0)
+
+    def test_previous_window_decays(self):
+        limiter = SlidingWindowRateLimiter('test', 3, timedelta(minutes=10))
+        with mock.patch('smsclient.ratelimit.time.time', return_value=6000.0):
+            for _ in range(3):
+                limiter.hit('a')
+
+        # early in the next window most of the old hits still count
+        with mock.patch('smsclient.ratelimit.time.time', return_value=6650.0):
+            self.assertEqual(limiter.hit('a'), 150)
+
+        # a third into it only two of them do
+        with mock.patch('smsclient.ratelimit.time.time', return_value=6800.0):
+            self.assertEqual(limiter.hit('a'), 0)
+
+    def test_rejected_requests_count_against_no_limit(self):
+        per_ip = SlidingWindowRateLimiter('test-ip', 5, timedelta(minutes=10))
+        per_phone = SlidingWindowRateLimiter('test-phone', 1, timedelta(minutes=10))
+        with mock.patch('smsclient.ratelimit.time.time', return_value=6000.0):
+            enforce((per_ip, 'ip'), (per_phone, 'phone'))
+            for _ in range(3):
+                with self.assertRaises(Throttled):
+                    enforce((per_ip, 'ip'), (per_phone, 'phone'))
+
+            # only the allowed request used up the address's budget
+            self.assertEqual([per_ip.hit('ip') for _ in range(4)], [0, 0, 0, 0])
+            self.assertGreater(per_ip.hit('ip'), 0)
+
+
+class OtpLoginViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Student.objects.create(email='student@example.com', full_name='Student', phone_number=PHONE_NUMBER)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def request_otp(self):
+        return self.client.post(reverse('token_obtain_otp'), {'phone_number': PHONE_NUMBER})
+
+    def test_login_with_sent_code(self):
+        response = self.request_otp()
+        code = unseal(Notification.objects.get(channel=Notification.Channel.SMS).payload)['otp']
+
+        response = self.client.post(reverse('verify_otp', args=[response.json()['token']]), {'otp': code})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access_token', response.json()['tokens'])
+
+    def test_sends_per_phone_are_limited(self):
+        for _ in range(constants.OTP_PHONE_SEND_LIMIT):
+            self.assertEqual(self.request_otp().status_code, 200)
+
+        response = self.request_otp()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response.has_header('Retry-After'))
+        self.assertEqual(Otp.objects.count(), constants.OTP_PHONE_SEND_LIMIT)
+        self.assertEqual(Notification.objects.count(), constants.OTP_PHONE_SEND_LIMIT)
+
+
+class TwilioClientTest(SimpleTestCase):
+    def tearDown(self):
+        sender._twilio_client = None
+
+    @override_settings(TWILIO_ACCOUNT_SID='AC' + '0' * 32, TWILIO_AUTH_TOKEN='token', TWILIO_API_BASE_URL='http://127.0.0.1:8025/')
+    def test_client_is_shared_and_reuses_its_session(self):
+        sender._twilio_client = None
+        client = sender.get_twilio_client()
+
+        self.assertIs(sender.get_twilio_client(), client)
+        self.assertEqual(client.api.base_url, 'http://127.0.0.1:8025')
+        adapter = client.http_client.session.get_adapter('https://api.twilio.com')
+        self.assertEqual(adapter._pool_maxsize, constants.SMS_HTTP_POOL_SIZE)
+        # only connection failures are retried, so an SMS is never sent twice
+        self.assertEqual(adapter.max_retries.read, 0)
+
+    def test_message_lifetime(self):
+        self.assertEqual(sender.SmsClient.timedelta_to_string(timedelta(hours=1, minutes=5)), "1 hours 5 minutes")
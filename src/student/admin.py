@@ -1,10 +1,11 @@
 from user.admin import UserAdmin
 from django.contrib import admin
+from course.admin import CourseChoicesMixin
 from .models import Student
 from utils import format_phone_number
 from django.utils.translation import gettext_lazy as _
 # Register your models here.
-class StudentAdmin(UserAdmin):
+class StudentAdmin(CourseChoicesMixin, UserAdmin):
     list_display = ('email', 'full_name', 'phone_number', 'is_active')
     
     fieldsets = UserAdmin.fieldsets + (
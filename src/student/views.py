@@ -74,7 +74,8 @@ class StudentEducationLevelView(APIView):
         
         education_level = get_object_or_404(EducationLevel, id=education_level_id)
         student.current_education_level = education_level
-        student.save()
+        # request.user may be a cached copy; only write the field this view owns
+        student.save(update_fields=['current_education_level'])
 
         return Response({'message': 'Education level added successfully'}, status=status.HTTP_201_CREATED)
     
@@ -368,7 +369,7 @@ class StudentWishListView(APIView):
 
     def get(self, request):
         student = request.user
-        courses = student.wishlist.all()
+        courses = student.wishlist.cards()
         serializer = self.response_serializer(courses, many=True)
         
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,125 @@
+"""
+Encrypted, expiring tokens for OTP login, password reset and email verification.
+
+Current tokens (`v2.`) are a single AES-GCM layer over compact claims: the
+expiry as an 8 byte integer followed by the remaining claims as minified
+JSON. Legacy tokens (a PyJWT HS256 token wrapped in Fernet) are still
+accepted by `decode` until the last of them has expired.
+"""
+import base64
+import binascii
+import json
+import os
+import struct
+import time
+from datetime import datetime
+import jwt
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken as InvalidFernetToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from django.conf import settings
+
+V2_PREFIX = 'v2.'
+NONCE_SIZE = 12
+EXPIRY = struct.Struct('>Q')
+
+
+class TokenError(Exception):
+    pass
+
+
+class InvalidToken(TokenError):
+    pass
+
+
+class ExpiredToken(TokenError):
+    pass
+
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def timestamp(exp) -> int:
+    return int(exp.timestamp()) if isinstance(exp, datetime) else int(exp)
+
+
+class AesGcmCodec:
+    """The `v2.` format. The key is derived from FERNET_KEY so no new secret is needed."""
+
+    def __init__(self, secret: str):
+        key = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b'enrols token v2').derive(secret.encode())
+        self.aead = AESGCM(key)
+        self.aad = V2_PREFIX.encode()
+
+    def encode(self, payload: dict) -> str:
+        claims = dict(payload)
+        exp = timestamp(claims.pop('exp'))
+        plaintext = EXPIRY.pack(exp) + json.dumps(claims, separators=(',', ':')).encode()
+        nonce = os.urandom(NONCE_SIZE)
+        return V2_PREFIX + b64encode(nonce + self.aead.encrypt(nonce, plaintext, self.aad))
+
+    def decode(self, token: str) -> dict:
+        try:
+            data = b64decode(token[len(V2_PREFIX):])
+            plaintext = self.aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], self.aad)
+        except (binascii.Error, ValueError, InvalidTag):
+            raise InvalidToken("Token could not be decrypted")
+
+        (exp,) = EXPIRY.unpack_from(plaintext)
+        if exp <= time.time():
+            raise ExpiredToken("Token has expired")
+        payload = json.loads(plaintext[EXPIRY.size:])
+        payload['exp'] = exp
+        return payload
+
+
+class LegacyCodec:
+    """PyJWT HS256 token encrypted with Fernet, the format used before `v2.`."""
+
+    def __init__(self, secret: str, fernet_key: str):
+        self.secret = secret
+        self.fernet = Fernet(fernet_key)
+
+    def encode(self, payload: dict) -> str:
+        token = jwt.encode(payload, self.secret, algorithm='HS256')
+        return self.fernet.encrypt(token.encode()).decode()
+
+    def decode(self, token: str) -> dict:
+        try:
+            signed = self.fernet.decrypt(token.encode()).decode()
+            return jwt.decode(signed, self.secret, algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            raise ExpiredToken("Token has expired")
+        except (InvalidFernetToken, jwt.InvalidTokenError, UnicodeError):
+            raise InvalidToken("Token could not be decrypted")
+
+
+_codecs = {}
+
+
+def get_codecs() -> tuple:
+    # building the ciphers (HKDF, key schedule) once per process, not per token
+    if not _codecs:
+        _codecs['v2'] = AesGcmCodec(settings.FERNET_KEY)
+        _codecs['legacy'] = LegacyCodec(settings.SECRET_KEY, settings.FERNET_KEY)
+    return _codecs['v2'], _codecs['legacy']
+
+
+def encode(payload: dict) -> str:
+    """Encrypt `payload`, which must carry an `exp` (datetime or unix timestamp)."""
+    return get_codecs()[0].encode(payload)
+
+
+def decode(token: str) -> dict:
+    """Decrypt a token of any supported format, raising a `TokenError` subclass on failure."""
+    v2, legacy = get_codecs()
+    if token.startswith(V2_PREFIX):
+        return v2.decode(token)
+    return legacy.decode(token)
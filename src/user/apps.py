@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from . import signals
+        from utils import shared_cache_check
+        checks.register(shared_cache_check("Access token revocation and cached users", 'user.E001'))
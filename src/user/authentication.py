@@ -1,8 +1,21 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from copy import copy
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
 from user.models import User
 from student.models import Student
 from instituteadmin.models import InstituteAdmin
 from rest_framework.permissions import BasePermission
+from .tokens import ACCOUNT_TYPE_CLAIM, SUPERUSER_CLAIM, PROFILE_VERSION_CLAIM
+import constants
 
 def get_specific_user(user):
     """Return the correct subclass instance based on account_type."""
@@ -20,15 +33,201 @@ def get_specific_user(user):
             return user
     return user
 
+def load_specific_user(user_id):
+    """
+    Load a user as its Student / InstituteAdmin subclass in a single query,
+    joining both subclass tables instead of fetching the base row first.
+    """
+    user = User.objects.select_related('student', 'instituteadmin').get(pk=user_id)
+    if user.account_type == User.Types.STUDENT and hasattr(user, 'student'):
+        return user.student
+    if user.account_type == User.Types.INSTITUTE_ADMIN and hasattr(user, 'instituteadmin'):
+        return user.instituteadmin
+    return user
+
+
+# shared by every worker through the default cache; `revision` changes on every save of the account
+AccountState = namedtuple('AccountState', ['profile_version', 'is_active', 'revision'])
+# profile version of a deleted account, which no token carries
+DELETED = -1
+
+
+def account_state_key(user_id) -> str:
+    return f"user-account-state:{user_id}"
+
+
+def new_account_state(profile_version, is_active) -> AccountState:
+    return AccountState(profile_version, is_active, uuid.uuid4().hex)
+
+
+def share_account_state(user_id, state: AccountState, replace: bool = True):
+    timeout = constants.AUTH_ACCOUNT_STATE_TTL.total_seconds()
+    if replace:
+        cache.set(account_state_key(user_id), state, timeout=timeout)
+    else:
+        cache.add(account_state_key(user_id), state, timeout=timeout)
+
+
+def current_account_state(user_id) -> AccountState:
+    """
+    The shared state of `user_id`. When no worker has published one (expired,
+    evicted, or never written) it is read from the database, so a missing
+    entry can never let a revoked token through.
+    """
+    state = cache.get(account_state_key(user_id))
+    if state is None:
+        row = User.objects.filter(pk=user_id).values_list('profile_version', 'is_active').first()
+        state = new_account_state(*row) if row is not None else new_account_state(DELETED, False)
+        # a save racing this read publishes its own state, which wins
+        share_account_state(user_id, state, replace=False)
+    return state
+
+
+class UserCache:
+    """
+    Short-lived per-process cache of authenticated users, keyed by user id and
+    token `jti`. Each entry remembers the shared `AccountState` it was loaded
+    under and is only served while that is still the current state, so a save
+    handled by any worker (which publishes a new state once it commits) makes
+    every worker load the user again.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl.total_seconds()
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, state):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, loaded_state, user = entry
+            if expires_at < time.monotonic() or loaded_state != state:
+                del self.entries[key]
+                return None
+        # every request gets its own instance so views cannot leak state into the cache
+        return copy(user)
+
+    def set(self, key, user, state):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, state, copy(user))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache(constants.AUTH_USER_CACHE_TTL, constants.AUTH_USER_CACHE_SIZE)
+
+
+def user_from_token(validated_token, state: AccountState = None):
+    """The concrete user behind `validated_token`, checked against the token claims."""
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    key = (user_id, validated_token.get(api_settings.JTI_CLAIM))
+    if state is None:
+        state = cache.get(account_state_key(user_id))
+    user = user_cache.get(key, state) if state is not None else None
+    if user is None:
+        try:
+            user = load_specific_user(user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if state is None:
+            # nothing published since the state expired; a save racing this load publishes its
+            # own state instead, which this entry then no longer matches
+            state = new_account_state(user.profile_version, user.is_active)
+            share_account_state(user_id, state, replace=False)
+        user_cache.set(key, user, state)
+
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+    if PROFILE_VERSION_CLAIM in validated_token and validated_token[PROFILE_VERSION_CLAIM] != user.profile_version:
+        raise AuthenticationFailed(_("The account has changed since the token was issued."), code="profile_changed")
+
+    return user
+
+
+class TokenAccount(SimpleLazyObject):
+    """
+    Authenticated user answered from the access token claims.
+
+    Identity and account type come straight from the token, so `IsStudent` /
+    `IsInstituteAdmin` and friends need no query. That is only sound because
+    `CustomJWTAuthentication` has checked the token's profile version against
+    the current `AccountState` first: any change to the claims, the password or
+    `is_active`, and deleting the account, moves that version. Any other
+    attribute loads the concrete Student / InstituteAdmin row through
+    `user_from_token`.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, validated_token, state: AccountState = None):
+        self.__dict__['token'] = validated_token
+        super().__init__(lambda: user_from_token(validated_token, state))
+
+    def __bool__(self):
+        return True
+
+    @property
+    def pk(self):
+        return self.token[api_settings.USER_ID_CLAIM]
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def account_type(self):
+        return self.token[ACCOUNT_TYPE_CLAIM]
+
+    @property
+    def is_superuser(self):
+        return self.token[SUPERUSER_CLAIM]
+
+    @property
+    def is_student(self):
+        return self.account_type == User.Types.STUDENT
+
+    @property
+    def is_institute(self):
+        return self.account_type == User.Types.INSTITUTE_ADMIN
+
+
 class CustomJWTAuthentication(JWTAuthentication):
-    def authenticate(self, request):
-        auth_result = super().authenticate(request)
-        if auth_result is None:
-            return None
-        user, token = auth_result
-
-        specific_user = get_specific_user(user)
-        return (specific_user, token)
+    def get_user(self, validated_token):
+        if ACCOUNT_TYPE_CLAIM not in validated_token:
+            # issued before account claims were added
+            return user_from_token(validated_token)
+
+        state = current_account_state(validated_token.get(api_settings.USER_ID_CLAIM))
+        if state.profile_version == DELETED:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not state.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if state.profile_version != validated_token.get(PROFILE_VERSION_CLAIM):
+            raise AuthenticationFailed(_("The account has changed since the token was issued."), code="profile_changed")
+
+        return TokenAccount(validated_token, state)
     
     
 class IsStudent(BasePermission):
@@ -0,0 +1,33 @@
+import timeit
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+import constants
+import tokenservice
+
+
+class Command(BaseCommand):
+    help = "Compare encode / decode throughput of the legacy and v2 token formats"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=5000, help="Operations per measurement")
+        parser.add_argument('--repeat', type=int, default=5, help="Measurements per case, the best one is reported")
+
+    def handle(self, *args, **options):
+        v2, legacy = tokenservice.get_codecs()
+        payload = {
+            'phone_number': '+919876543210',
+            'otp': '123456',
+            'exp': timezone.now() + constants.OTP_EXP_TIME,
+        }
+
+        self.stdout.write(f"{'format':<8} {'operation':<10} {'ops/s':>12} {'us/op':>10} {'length':>8}")
+        for name, codec in (('legacy', legacy), ('v2', v2)):
+            token = codec.encode(payload)
+            cases = (
+                ('encode', lambda: codec.encode(payload)),
+                ('decode', lambda: codec.decode(token)),
+            )
+            for operation, func in cases:
+                best = min(timeit.repeat(func, number=options['number'], repeat=options['repeat']))
+                per_op = best / options['number']
+                self.stdout.write(f"{name:<8} {operation:<10} {1 / per_op:>12,.0f} {per_op * 1e6:>10.1f} {len(token):>8}")
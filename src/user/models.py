@@ -48,9 +48,32 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_student = models.BooleanField(default=True)
     is_institute = models.BooleanField(default=False)
     
+    # bumped whenever a field carried in (or guarding) the access token claims changes
+    profile_version = models.PositiveIntegerField(default=0)
+    
     objects = UserManager()
     
     USERNAME_FIELD = 'email'
+    PROFILE_FIELDS = ('password', 'account_type', 'is_active', 'is_superuser')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_profile = instance.profile_state()
+        return instance
+
+    def profile_state(self) -> tuple:
+        # read from __dict__ so deferred fields are not fetched
+        return tuple(self.__dict__.get(field) for field in self.PROFILE_FIELDS)
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_profile', None)
+        if loaded is not None and loaded != self.profile_state():
+            self.profile_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'profile_version'}
+        super().save(*args, **kwargs)
+        self._loaded_profile = self.profile_state()
 
     def __str__(self):
         return f"User: {self.email}"
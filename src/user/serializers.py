@@ -1,8 +1,14 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 import string
 import secrets
 from utils import format_phone_number
 from student.models import Student
+from .tokens import AccountRefreshToken
+
+
+class AccountTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = AccountRefreshToken
 
 class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.CharField(max_length=100)
@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from student.models import Student
+from instituteadmin.models import InstituteAdmin
+from .models import User
+from .authentication import DELETED, user_cache, new_account_state, share_account_state
+
+def publish_account_state(user_id, profile_version, is_active):
+    """ Tell every worker about the account's new state once the write commits """
+    state = new_account_state(profile_version, is_active)
+    transaction.on_commit(lambda: share_account_state(user_id, state))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=InstituteAdmin)
+def user_saved(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    publish_account_state(instance.pk, instance.profile_version, instance.is_active)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=InstituteAdmin)
+def user_deleted(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    # matches no token, so outstanding ones are refused without a lookup
+    publish_account_state(instance.pk, DELETED, False)
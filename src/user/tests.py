@@ -1,3 +1,185 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+from instituteadmin.models import InstituteAdmin
+from preference.models import EducationLevel
+from student.models import Student
+from test.views import StudentOnlyTestView, InstituteOnlyTestView
+from .authentication import user_cache, account_state_key, new_account_state
+from utils import decrypt_token
+from .tokens import AccountRefreshToken
+import tokenservice
 
-# Create your tests here.
+
+class CustomJWTAuthenticationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+
+    def setUp(self):
+        user_cache.clear()
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def get(self, user):
+        token = RefreshToken.for_user(user).access_token
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        return StudentOnlyTestView.as_view()(request)
+
+    def test_subclass_resolved_in_one_query_then_cached(self):
+        token = RefreshToken.for_user(self.student).access_token
+
+        for expected_queries in (1, 0):
+            request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+            with self.assertNumQueries(expected_queries):
+                response = StudentOnlyTestView.as_view()(request)
+            self.assertEqual(response.status_code, 200)
+            self.assertIsInstance(request.user, Student)
+
+    def test_institute_resolved_as_institute(self):
+        response = self.get(self.institute)
+        self.assertEqual(response.status_code, 403)
+
+    def test_save_invalidates_cached_user(self):
+        token = RefreshToken.for_user(self.student).access_token
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        StudentOnlyTestView.as_view()(request)
+
+        self.student.is_active = False
+        self.student.save()
+
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(StudentOnlyTestView.as_view()(request).status_code, 401)
+
+    def test_save_in_another_worker_reloads_cached_user(self):
+        token = RefreshToken.for_user(self.student).access_token
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        StudentOnlyTestView.as_view()(request)
+        self.assertFalse(request.user.email_verified)
+
+        # another worker verifies the email: its signal publishes a new state, this worker's cache is untouched
+        Student.objects.filter(pk=self.student.pk).update(email_verified=True)
+        cache.set(account_state_key(self.student.pk), new_account_state(self.student.profile_version, True))
+
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        StudentOnlyTestView.as_view()(request)
+        self.assertTrue(request.user.email_verified)
+
+    def test_writes_through_cached_user_keep_other_fields(self):
+        level = EducationLevel.objects.create(name='Graduate')
+        token = RefreshToken.for_user(self.student).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        client.get(reverse('student-education-level'))
+
+        # verified by another worker, which this worker's cached copy has not seen
+        Student.objects.filter(pk=self.student.pk).update(email_verified=True)
+        response = client.post(reverse('student-education-level'), {'education_level_id': level.id})
+
+        self.assertEqual(response.status_code, 201)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.email_verified)
+        self.assertEqual(self.student.current_education_level, level)
+
+
+class TokenAccountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create(email='student@example.com', full_name='Student', phone_number='+919876543210')
+        cls.institute = InstituteAdmin.objects.create(email='institute@example.com', name='Institute')
+
+    def setUp(self):
+        user_cache.clear()
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def request(self, user, view=StudentOnlyTestView):
+        token = AccountRefreshToken.for_user(user).access_token
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        return request, view.as_view()(request)
+
+    def test_permission_only_views_need_no_queries(self):
+        # the first request of each account reads its state from the database
+        self.request(self.student)
+        self.request(self.institute)
+
+        with self.assertNumQueries(0):
+            _, response = self.request(self.student)
+            self.assertEqual(response.status_code, 200)
+            _, response = self.request(self.institute, InstituteOnlyTestView)
+            self.assertEqual(response.status_code, 200)
+            _, response = self.request(self.institute)
+            self.assertEqual(response.status_code, 403)
+
+    def test_model_fields_load_the_concrete_user(self):
+        request, _ = self.request(self.student)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(request.user.full_name, 'Student')
+        self.assertIsInstance(request.user, Student)
+
+    def test_password_change_rejects_outstanding_tokens(self):
+        token = AccountRefreshToken.for_user(self.student).access_token
+
+        self.student.set_password('new-password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.save()
+
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(StudentOnlyTestView.as_view()(request).status_code, 401)
+
+        # without a published state (another worker's save, an evicted key) it is read from the database
+        cache.clear()
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(StudentOnlyTestView.as_view()(request).status_code, 401)
+
+    def test_deactivated_and_deleted_accounts_are_refused_without_published_state(self):
+        institute_token = AccountRefreshToken.for_user(self.institute).access_token
+        student_token = AccountRefreshToken.for_user(self.student).access_token
+        for token, view in ((institute_token, InstituteOnlyTestView), (student_token, StudentOnlyTestView)):
+            request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(view.as_view()(request).status_code, 200)
+
+        # saved in another worker, and the published states are gone
+        InstituteAdmin.objects.filter(pk=self.institute.pk).update(is_active=False)
+        Student.objects.filter(pk=self.student.pk).delete()
+        cache.clear()
+
+        for token, view in ((institute_token, InstituteOnlyTestView), (student_token, StudentOnlyTestView)):
+            request = self.factory.get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(view.as_view()(request).status_code, 401)
+
+
+class TokenServiceTest(SimpleTestCase):
+    def payload(self, lifetime=timedelta(minutes=5)):
+        return {'email': 'student@example.com', 'exp': timezone.now() + lifetime}
+
+    def test_v2_round_trip(self):
+        token = tokenservice.encode(self.payload())
+
+        self.assertTrue(token.startswith(tokenservice.V2_PREFIX))
+        self.assertEqual(tokenservice.decode(token)['email'], 'student@example.com')
+
+    def test_legacy_tokens_still_decode(self):
+        _, legacy = tokenservice.get_codecs()
+        token = legacy.encode(self.payload())
+
+        self.assertEqual(decrypt_token(token)['payload']['email'], 'student@example.com')
+
+    def test_expired_and_tampered_tokens_are_rejected(self):
+        _, legacy = tokenservice.get_codecs()
+        for token in (tokenservice.encode(self.payload(-timedelta(seconds=1))), legacy.encode(self.payload(-timedelta(seconds=1)))):
+            with self.assertRaises(tokenservice.ExpiredToken):
+                tokenservice.decode(token)
+
+        token = tokenservice.encode(self.payload())
+        tampered = token[:-2] + ('A' if token[-2] != 'A' else 'B') + token[-1]
+        for token in (tampered, 'v2.not-base64!', 'garbage'):
+            with self.assertRaises(tokenservice.InvalidToken):
+                tokenservice.decode(token)
+            self.assertEqual(decrypt_token(token), {'status': False})
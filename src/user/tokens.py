@@ -0,0 +1,21 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+ACCOUNT_TYPE_CLAIM = 'account_type'
+SUPERUSER_CLAIM = 'is_superuser'
+PROFILE_VERSION_CLAIM = 'profile_version'
+
+
+class AccountRefreshToken(RefreshToken):
+    """
+    Refresh token that also states what kind of account holds it. The claims are
+    copied into every access token minted from it, which lets permission checks
+    run without loading the user (see `authentication.TokenAccount`).
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ACCOUNT_TYPE_CLAIM] = user.account_type
+        token[SUPERUSER_CLAIM] = user.is_superuser
+        token[PROFILE_VERSION_CLAIM] = user.profile_version
+        return token
@@ -6,15 +6,16 @@ from instituteadmin.serializers import InstituteAdminDetailSerializer
 from django.shortcuts import get_object_or_404
 from student.models import Student
 from .models import User
-from utils import create_token, decrypt_token
+from utils import create_token, decrypt_token, client_ip
 from rest_framework.response import Response
 from rest_framework import status
 from emailclient.sender import send_password_reset_email, send_verification_email
 import constants
 from django.utils import timezone
 from smsclient.models import Otp
-from smsclient.sender import SmsClient
-from rest_framework_simplejwt.tokens import RefreshToken
+from notification.outbox import enqueue_sms
+from smsclient.ratelimit import enforce, otp_send_per_phone, otp_send_per_ip, otp_verify_per_ip
+from .tokens import AccountRefreshToken
 
 class ProfileView(APIView):
     """
@@ -66,9 +67,8 @@ class ForgotPasswordView(APIView):
         - email (str): The email address associated with the user's account.
 
     Responses:
-        - 200 OK: Password reset email sent successfully.
+        - 200 OK: Password reset email queued for delivery.
         - 404 Not Found: If the provided email is not associated with any user.
-        - 500 Internal Server Error: If the mail server is down.
 
     Example Usage:
         POST /api/auth/forgot-password/
@@ -90,10 +90,7 @@ class ForgotPasswordView(APIView):
         })
         
         
-        try:
-            send_password_reset_email(user.email, user.full_name, token)
-        except:
-            return Response({"error": "Mail server down"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        send_password_reset_email(user.email, user.full_name, token)
         return Response({ 'message': 'mail sent successfully' })
         
         
@@ -157,8 +154,7 @@ class VerifyEmailView(APIView):
         - GET: Sends a verification email to the authenticated user.
 
     Responses:
-        - 200 OK: Email sent successfully.
-        - 500 Internal Server Error: If the mail server is down.
+        - 200 OK: Verification email queued for delivery.
 
     Example Usage:
         GET /api/auth/send-verify-email/
@@ -171,10 +167,7 @@ class VerifyEmailView(APIView):
             'exp': timezone.now() + constants.VERIFY_EMAIL_EXP_TIME
         })
         
-        try:
-            send_verification_email(user.email, user.full_name, token)
-        except:
-            return Response({"message": "Mail server down"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        send_verification_email(user.email, user.full_name, token)
         return Response({ 'message': 'mail sent successfully' })
 
 
@@ -235,6 +228,7 @@ class LoginOtpView(APIView):
     Responses:
         - 200 OK: OTP sent successfully along with a verification token.
         - 404 Not Found: If the phone number is not registered.
+        - 429 Too Many Requests: Too many OTPs sent to this phone number or from this IP.
 
     Example Usage:
         POST /api/auth/student/login/otp/
@@ -247,18 +241,18 @@ class LoginOtpView(APIView):
         serializer.is_valid(raise_exception=True)
         
         phone_number = serializer.validated_data['phone_number']
+        enforce((otp_send_per_ip, client_ip(request)), (otp_send_per_phone, phone_number))
         get_object_or_404(Student, phone_number=phone_number)
         
-        otp = Otp(phone_number=phone_number)
+        otp, code = Otp.issue(phone_number)
         
         token = create_token({
             'phone_number': phone_number,
-            'otp': otp.otp,
+            'otp_id': otp.id,
             'exp': otp.get_expiration_time(),
         })
         
-        sms_client = SmsClient()
-        sms_client.send(phone_number=phone_number, otp=otp.otp)
+        enqueue_sms(phone_number=phone_number, otp=code)
         
         return Response({ 'token': token })
         
@@ -279,6 +273,7 @@ class LoginOtpVerifyView(APIView):
     Responses:
         - 200 OK: OTP verified successfully. Returns access and refresh tokens.
         - 403 Forbidden: If the OTP is invalid or expired.
+        - 429 Too Many Requests: Too many verification attempts from this IP.
 
     Example Usage:
         POST /api/auth/student/login/otp/<token>/
@@ -290,20 +285,21 @@ class LoginOtpVerifyView(APIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        otp = serializer.validated_data['otp']
+        code = serializer.validated_data['otp']
+        enforce((otp_verify_per_ip, client_ip(request)))
         
         data = decrypt_token(token)
-        if data['status'] is False:
-            return Response({ 'message': "Token not valid" }, status=status.HTTP_403)
+        if data['status'] is False or 'otp_id' not in data['payload']:
+            return Response({ 'message': "Token not valid" }, status=status.HTTP_403_FORBIDDEN)
         
         payload = data['payload']
-        decoded_otp = payload['otp']
         phone_number = payload['phone_number']
+        otp = Otp.objects.filter(id=payload['otp_id'], phone_number=phone_number).first()
         
         user = get_object_or_404(Student, phone_number=phone_number)
         
-        if (decoded_otp == otp):
-            refresh_token = RefreshToken.for_user(user=user)
+        if otp is not None and otp.verify(code):
+            refresh_token = AccountRefreshToken.for_user(user=user)
             access_token = refresh_token.access_token
             response_serializer = StudentSerializer(user, many=False)
             return Response({
@@ -372,6 +368,7 @@ class RegisterOtpView(APIView):
     Responses:
         - 201 Created: User created successfully and OTP sent.
         - 400 Bad Request: Validation errors.
+        - 429 Too Many Requests: Too many OTPs sent to this phone number or from this IP.
 
     Example Usage:
         POST /api/auth/student/register/otp/
@@ -381,20 +378,20 @@ class RegisterOtpView(APIView):
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
+        enforce((otp_send_per_ip, client_ip(request)), (otp_send_per_phone, serializer.validated_data['phone_number']))
         
         student = serializer.save()
         phone_number = student.phone_number
         
-        otp = Otp(phone_number=phone_number)
+        otp, code = Otp.issue(phone_number)
         
         token = create_token({
             'phone_number': phone_number,
-            'otp': otp.otp,
+            'otp_id': otp.id,
             'exp': otp.get_expiration_time(),
         })
         
-        sms_client = SmsClient()
-        sms_client.send(phone_number=phone_number, otp=otp.otp)
+        enqueue_sms(phone_number=phone_number, otp=code)
         
         
         return Response({ 'message': 'User created successfully', 'token': token }, status=status.HTTP_201_CREATED)
@@ -416,6 +413,7 @@ class PhoneNumberVerifyView(APIView):
     Responses:
         - 200 OK: Phone number verified successfully.
         - 403 Forbidden: If the OTP is invalid or expired.
+        - 429 Too Many Requests: Too many verification attempts from this IP.
 
     Example Usage:
         POST /api/auth/student/register/otp/<str:token>'
@@ -427,23 +425,24 @@ class PhoneNumberVerifyView(APIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        otp = serializer.validated_data['otp']
+        code = serializer.validated_data['otp']
+        enforce((otp_verify_per_ip, client_ip(request)))
         
         data = decrypt_token(token)
-        if data['status'] is False:
-            return Response({ 'message': "Token not valid" }, status=status.HTTP_403)
+        if data['status'] is False or 'otp_id' not in data['payload']:
+            return Response({ 'message': "Token not valid" }, status=status.HTTP_403_FORBIDDEN)
         
         payload = data['payload']
-        decoded_otp = payload['otp']
         phone_number = payload['phone_number']
+        otp = Otp.objects.filter(id=payload['otp_id'], phone_number=phone_number).first()
         
         user = get_object_or_404(Student, phone_number=phone_number)
         
-        if (decoded_otp == otp):
+        if otp is not None and otp.verify(code):
             user.phone_number_verified = True
             user.save()
             
-            refresh_token = RefreshToken.for_user(user=user)
+            refresh_token = AccountRefreshToken.for_user(user=user)
             access_token = refresh_token.access_token
             response_serializer = StudentSerializer(user, many=False)
             return Response({
@@ -1,26 +1,23 @@
-from cryptography.fernet import Fernet
-import jwt
-from django.conf import settings
 from random import randint
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 import constants
 import phonenumbers
+import tokenservice
 from rest_framework.exceptions import ValidationError
 
-JWT_SECRET = settings.SECRET_KEY
-cipher_suite = Fernet(settings.FERNET_KEY)
 
 def create_token(payload: dict) -> str:
-    token = jwt.encode(payload, JWT_SECRET, algorithm='HS256')
-    encrypted_token = cipher_suite.encrypt(token.encode()).decode()
-    return encrypted_token
+    return tokenservice.encode(payload)
 
 
 def decrypt_token(enc_token: str) -> dict:
     try:
-        dec_token = cipher_suite.decrypt(enc_token.encode()).decode()
-        payload = jwt.decode(dec_token, JWT_SECRET, algorithms=['HS256'])
-        return {'payload': payload, 'status': True}
-    except:
+        return {'payload': tokenservice.decode(enc_token), 'status': True}
+    except tokenservice.TokenError:
         return {'status': False}
     
     
@@ -52,4 +49,31 @@ def validate_details(details):
         if 'detail' not in item or 'info' not in item:
             raise ValidationError("Each dictionary must contain 'detail' and 'info' keys.")
         if not isinstance(item['detail'], str) or not isinstance(item['info'], str):
-            raise ValidationError("'detail' and 'info' must be strings.")
\ No newline at end of file
+            raise ValidationError("'detail' and 'info' must be strings.")
+
+
+def client_ip(request) -> str:
+    # nginx passes the peer address in X-Real-IP
+    return request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR', '')
+
+
+def process_local_cache(alias: str = 'default') -> bool:
+    """ Whether the cache `alias` lives inside this process only, so other workers never see its writes """
+    return isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def shared_cache_check(feature: str, check_id: str):
+    """
+    A system check failing in production when `feature`, which keeps state in
+    the default cache that every gunicorn worker must see, runs on a
+    process-local cache.
+    """
+    def check(app_configs=None, **kwargs):
+        if settings.DJANGO_ENV != 'production' or not process_local_cache():
+            return []
+        return [checks.Error(
+            f"{feature} need a cache shared by all workers, but the default cache is process-local.",
+            hint="Set CACHE_URL to a shared backend, e.g. redis://redis:6379/1.",
+            id=check_id,
+        )]
+    return check